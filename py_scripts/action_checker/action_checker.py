@@ -6,42 +6,142 @@
 import json.decoder
 import time
 import subprocess
-from typing import TypedDict, List
+import sys
+from typing import Dict, List, Optional, Set, Tuple
 import json
 import os
-from datetime import datetime
 from pathlib import Path
 
+# Run as a file (uv run action_checker.py): make the repository importable
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-class Check(TypedDict):
-    name: str
-    result: str
-    duration: str
-    url: str
+from py_scripts.action_checker.checks import (
+    PENDING_RESULTS,
+    CheckRun,
+    changed_checks,
+    describe_change,
+    format_duration,
+    parse_time,
+)
+from py_scripts.action_checker.schedule import PollScheduler, backoff_delay
+from py_scripts.http_cache.github import GitHubAPI, GitHubAPIError, current_repo
+from py_scripts.startup.lazy import lazy_import
 
+# Only needed to register a PR or run the monitor service, not for --monitor
+monitor = lazy_import("py_scripts.action_checker.monitor")
+# SQLite store of past check durations, opened when checks are monitored
+duration_history = lazy_import("py_scripts.action_checker.history")
 
-def notification_msg(pr_checks: List[Check]) -> str:
-    repository_name = ""
-    for check in pr_checks:
-        try:  # find repository name
-            repository_name = check["url"].split("/")[4]
-            break
-        except IndexError:
-            continue
+MONITOR_SERVICE = "action-checker-monitor.service"
+
+
+def notification_msg(
+    pr_checks: List[CheckRun], repository_name: Optional[str] = None, notes: Optional[Dict[str, str]] = None
+) -> str:
+    """Notification text; notes adds a remark after the result of some checks, by check name"""
+    notes = notes or {}
+    if repository_name is None:
+        repository_name = ""
+        for check in pr_checks:
+            try:  # find repository name
+                repository_name = check["url"].split("/")[4]
+                break
+            except IndexError:
+                continue
 
     return f"\nPR checks finished for {repository_name}\n" + "\n".join(
-        [f"{i['name']}: {i['result']}" for i in pr_checks]
+        [f"{i['name']}: {i['result']}{notes.get(i['name'], '')}" for i in pr_checks]
     )
 
 
 def dt_diff(dt1: str, dt2: str) -> str:
-    return str(datetime.strptime(dt1, "%Y-%m-%dT%H:%M:%SZ") - datetime.strptime(dt2, "%Y-%m-%dT%H:%M:%SZ"))
+    """Time from dt2 to dt1, "" when either is empty or the zero time of a check still running."""
+    end, start = parse_time(dt1), parse_time(dt2)
+    return format_duration(None if end is None or start is None else round(end - start))
+
+
+_github_api: Optional[GitHubAPI] = None
+
+
+def github_api() -> GitHubAPI:
+    """Shared client; its on-disk cache turns repeated polls into free 304s"""
+    global _github_api
+    if _github_api is None:
+        _github_api = GitHubAPI()
+    return _github_api
+
+
+def check_state(run: dict) -> str:
+    """Map a check run to the state names of `gh pr checks`"""
+    if run["status"] == "completed":
+        return (run.get("conclusion") or "neutral").upper()
+    return "IN_PROGRESS" if run["status"] == "in_progress" else "QUEUED"
+
+
+def get_all_pages(api: GitHubAPI, path: str, key: str, per_page: int = 100) -> List[dict]:
+    """Every entry of the list under key in the pages of path, up to the total_count GitHub reports."""
+    entries: List[dict] = []
+    page = 1
+    while True:
+        body = api.get_json(path, {"per_page": per_page, "page": page})
+        batch = body[key]
+        entries.extend(batch)
+        if len(batch) < per_page or len(entries) >= body.get("total_count", 0):
+            return entries
+        page += 1
+
 
+def api_pr_checks() -> Optional[List[CheckRun]]:
+    """Checks of the current branch's PR via the REST API, None if that is not possible here."""
+    repo = current_repo()
+    api = github_api()
+    if repo is None or not api.token:
+        return None
+    try:
+        branch = subprocess.run(
+            ["git", "rev-parse", "--abbrev-ref", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    owner, name = repo
+    try:
+        pulls = api.get_json(f"/repos/{owner}/{name}/pulls", {"head": f"{owner}:{branch}", "state": "open"})
+        if not pulls:
+            return None  # let gh report it (or find a PR from a fork)
+        sha = pulls[0]["head"]["sha"]
+        # A PR must not look finished because its remaining checks are on a later page
+        runs = get_all_pages(api, f"/repos/{owner}/{name}/commits/{sha}/check-runs", "check_runs")
+        statuses = get_all_pages(api, f"/repos/{owner}/{name}/commits/{sha}/status", "statuses")
+    except (GitHubAPIError, KeyError, IndexError, TypeError):
+        return None
 
-def pr_checker() -> List[Check]:
+    checks = [
+        CheckRun(run["name"], check_state(run), run.get("html_url"), run.get("started_at"), run.get("completed_at"))
+        for run in runs
+    ]
+    checks.extend(
+        CheckRun(
+            status["context"],
+            status["state"].upper(),
+            status.get("target_url"),
+            status["created_at"],
+            status.get("updated_at"),
+        )
+        for status in statuses
+    )
+    return checks
+
+
+def pr_checker() -> List[CheckRun]:
     """Returns list of PR checks."""
 
-    for _ in range(0, 10):
+    checks = api_pr_checks()
+    if checks is not None:
+        return checks
+
+    for attempt in range(0, 10):
         try:
             result = subprocess.run(
                 ["gh", "pr", "checks", "--json=name,state,link,startedAt,completedAt"],
@@ -50,43 +150,62 @@ def pr_checker() -> List[Check]:
                 check=True,
             )
             output = json.loads(result.stdout)
-            return [
-                {
-                    "name": c["name"],
-                    "result": c["state"],
-                    "url": c["link"],
-                    "duration": dt_diff(c["completedAt"], c["startedAt"]),
-                }
-                for c in output
-            ]
+            return [CheckRun(c["name"], c["state"], c["link"], c["startedAt"], c["completedAt"]) for c in output]
 
         except subprocess.CalledProcessError as e:
             if "no pull request found" in e.stderr.lower():
                 raise SystemExit(1, "No pull request found in current directory")
-            time.sleep(1)
+            time.sleep(backoff_delay(attempt))
             continue
         except json.decoder.JSONDecodeError:
-            time.sleep(1)
+            time.sleep(backoff_delay(attempt))
             continue
 
     raise SystemExit(1, "Cannot parse gh pr checks output")
 
 
-def setup_systemd_service() -> None:
-    """Create and start a systemd user service to monitor PR checks."""
+def current_pull_request() -> Optional["monitor.PullRequest"]:
+    """The pull request of the current directory's branch, as gh sees it"""
+    try:
+        result = subprocess.run(["gh", "pr", "view", "--json=url"], capture_output=True, text=True, check=True)
+        return monitor.PullRequest.parse(json.loads(result.stdout)["url"])
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_webhook_env(webhook: str, secret: str) -> Path:
+    """Write the webhook settings of the service to a file only the user can read, and return its path."""
+    env_file = Path.home() / ".config" / "action-checker" / "webhook.env"
+    env_file.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(env_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        os.fchmod(fd, 0o600)  # an older file may have been readable by others
+        f.write(f"ACTION_CHECKER_WEBHOOK={webhook}\nACTION_CHECKER_WEBHOOK_SECRET={secret}\n")
+    return env_file
+
+
+def install_monitor_service() -> None:
+    """Write the systemd user service running the monitor for every watched PR."""
     script_path = os.path.abspath(__file__)
+    # The monitor listens for webhook events only when the service is told where to, and only signed ones
+    webhook = os.environ.get("ACTION_CHECKER_WEBHOOK")
+    secret = os.environ.get("ACTION_CHECKER_WEBHOOK_SECRET")
+    webhook_env = ""
+    if webhook and not secret:
+        print("ACTION_CHECKER_WEBHOOK_SECRET is not set, the monitor will not listen for webhook events")
+    elif webhook:
+        webhook_env = f"EnvironmentFile={write_webhook_env(webhook, secret)}\n"
     service_content = f"""[Unit]
 Description=GitHub PR Check Monitor
 After=network.target
 
 [Service]
-Type=oneshot
-RemainAfterExit=no
+Type=simple
 Environment=HOME={os.environ["HOME"]}
 Environment=PATH=/home/{os.environ.get("USER", "user")}/.local/bin:/usr/local/bin:/usr/bin:/bin
-WorkingDirectory={os.getcwd()}
-ExecStart=/usr/bin/env uv run {script_path} --monitor
-TimeoutStartSec=1800
+{webhook_env}ExecStart=/usr/bin/env uv run {script_path} --serve
+Restart=on-failure
+RestartSec=30
 StandardOutput=journal
 StandardError=journal
 """
@@ -95,38 +214,143 @@ StandardError=journal
     systemd_dir = Path.home() / ".config" / "systemd" / "user"
     systemd_dir.mkdir(parents=True, exist_ok=True)
 
-    # Write service file
-    service_file = systemd_dir / "pr-check-monitor.service"
-    service_file.write_text(service_content)
+    # Write service file, reloading the daemon only if it changed
+    service_file = systemd_dir / MONITOR_SERVICE
+    if not service_file.exists() or service_file.read_text() != service_content:
+        service_file.write_text(service_content)
+        subprocess.run(["systemctl", "--user", "daemon-reload"], check=True)
 
-    # Check if there's a PR first
-    try:
-        subprocess.run(["gh", "pr", "view", "--json=url"], capture_output=True, text=True, check=True)
-    except subprocess.CalledProcessError:
+
+def setup_systemd_service() -> None:
+    """Add the current directory's PR to the monitor, starting the monitor service if none is running."""
+    pr = current_pull_request()
+    if pr is None:
         print("No pull request found in current directory")
         print("Navigate to a directory with an open PR before running this script")
         return
 
-    # Reload daemon only if needed and start service
-    subprocess.run(["systemctl", "--user", "daemon-reload"], check=True)
-    subprocess.run(
-        ["systemctl", "--user", "start", "--no-block", "pr-check-monitor.service"],
-        check=True,
+    client = monitor.MonitorClient()
+    for attempt in range(0, 10):
+        try:
+            added = client.watch(pr)
+        except monitor.MonitorError:
+            if client.ping():  # a monitor that is just shutting down: wait for it to go
+                time.sleep(backoff_delay(attempt, base=0.2, cap=2.0))
+                continue
+            break
+        print(f"{'Added' if added else 'Already watching'} {pr.slug} in the running monitor")
+        return
+
+    # No monitor: it picks the PR up from the watch list when it starts
+    monitor.WatchList().add(pr)
+    install_monitor_service()
+    subprocess.run(["systemctl", "--user", "start", "--no-block", MONITOR_SERVICE], check=True)
+
+    print(f"Monitoring {pr.slug} in background...")
+    print(f"View logs: journalctl --user -u {MONITOR_SERVICE} -f")
+
+
+def notify_pr_finished(
+    pr: "monitor.PullRequest", pr_checks: List[CheckRun], history: Optional["duration_history.DurationStore"] = None
+) -> None:
+    notes = history.notes(pr.repo, pr_checks) if history is not None else None
+    subprocess.call(["notify-send", notification_msg(pr_checks, repository_name=pr.slug, notes=notes)])
+
+
+def serve_monitor() -> int:
+    """Run the monitor for every watched PR until none is left.
+
+    With $ACTION_CHECKER_WEBHOOK set, check events posted to that port
+    update the watched PRs between polls. Deliveries must be signed with
+    $ACTION_CHECKER_WEBHOOK_SECRET; without one the monitor only polls.
+    """
+    from py_scripts.action_checker import webhook
+    from py_scripts.http_cache.github import GitHubGraphQL
+
+    history = duration_history.DurationStore()
+    pr_monitor = monitor.Monitor(
+        monitor.WatchList(),
+        query=GitHubGraphQL().query,
+        notify=lambda pr, pr_checks: notify_pr_finished(pr, pr_checks, history),
+        history=history,
     )
+    listener = None
+    address = webhook.default_webhook_address()
+    try:
+        if address is not None and not os.environ.get("ACTION_CHECKER_WEBHOOK_SECRET"):
+            print("Not listening for webhook events: ACTION_CHECKER_WEBHOOK_SECRET is not set")
+        elif address is not None:
+            listener = webhook.WebhookListener(pr_monitor.push_event, address)
+            listener.start()
+            print(f"Listening for webhook events on http://{address[0]}:{listener.port}/")
+        pr_monitor.run()
+    except (monitor.MonitorError, OSError) as e:
+        print(f"Error: {e}")
+        return 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if listener is not None:
+            listener.close()
+    return 0
+
+
+def list_watched() -> int:
+    """Print the PRs the monitor is watching."""
+    try:
+        watched = monitor.MonitorClient().watched()
+    except monitor.MonitorError:
+        watched = [pr.slug for pr in monitor.WatchList()]
+    print("\n".join(watched) if watched else "No pull requests are being watched")
+    return 0
 
-    print("Monitoring PR checks in background...")
-    print("View logs: journalctl --user -u pr-check-monitor.service -f")
 
+def show_durations() -> int:
+    """Print the duration percentiles of every recorded check."""
+    summary = duration_history.DurationStore().summary()
+    if not summary:
+        print("No check durations recorded yet")
+        return 0
+    fmt = duration_history.format_seconds
+    print(f"{'repository':<30} {'check':<40} {'runs':>5} {'p50':>8} {'p90':>8} {'last':>8}")
+    for repo, name, stats in summary:
+        print(f"{repo:<30} {name:<40} {stats.count:>5} {fmt(stats.p50):>8} {fmt(stats.p90):>8} {fmt(stats.last):>8}")
+    return 0
+
+
+def pending_checks(pr_checks: List[CheckRun]) -> List[CheckRun]:
+    return [check for check in pr_checks if check["result"] in PENDING_RESULTS]
 
-def monitor_checks() -> int:
-    """Monitor PR checks and send notification when done."""
+
+def monitor_checks(
+    scheduler: Optional[PollScheduler] = None, history: Optional["duration_history.DurationStore"] = None
+) -> int:
+    """Monitor PR checks and send notification when done.
+
+    Polls rarely while the running checks are far from done and more often
+    as they get close, see PollScheduler. Finished checks are added to the
+    duration history, which predicts how long the running ones take. Only
+    the checks that changed since the previous poll are recorded and logged.
+    """
+    history = history if history is not None else duration_history.DurationStore()
+    scheduler = scheduler if scheduler is not None else PollScheduler(expected_duration=history.expected)
+    repo = "/".join(current_repo() or ())
+    warned: Set[Tuple[str, str, str]] = set()
     try:
         pr_checks = pr_checker()
-        while {"IN_PROGRESS", "QUEUED"}.intersection([i["result"] for i in pr_checks]):
-            pr_checks = pr_checker()
-            time.sleep(3)
+        history.record(repo, pr_checks)
+        changed = pr_checks
+        while pending := pending_checks(pr_checks):
+            if changed:
+                print("\n".join(duration_history.progress_report(history, repo, repo or "PR", pending, warned)))
+            time.sleep(scheduler.next_delay(pending, repo=repo))
+            previous, pr_checks = pr_checks, pr_checker()
+            changed = changed_checks(previous, pr_checks)
+            for check in changed:
+                print(describe_change(check))
+            history.record(repo, changed)
 
-        subprocess.call(["notify-send", notification_msg(pr_checks)])
+        subprocess.call(["notify-send", notification_msg(pr_checks, notes=history.notes(repo, pr_checks))])
         return 0
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -135,10 +359,14 @@ def monitor_checks() -> int:
 
 def main() -> int:
     """Entry point for the action-checker command-line tool."""
-    import sys
-
     if len(sys.argv) > 1 and sys.argv[1] == "--monitor":
         return monitor_checks()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        return serve_monitor()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--list":
+        return list_watched()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--durations":
+        return show_durations()
     else:
         setup_systemd_service()
         return 0
@@ -0,0 +1,124 @@
+"""The checks of a pull request, as every action-checker source reports them.
+
+A CheckRun parses its timestamps once, when it is built from the REST API,
+``gh pr checks`` or GraphQL, instead of on every poll that looks at it. A
+check still running has no completion time: the empty or zero-valued
+(``0001-01-01T00:00:00Z``) ``completedAt`` GitHub reports for it leaves the
+duration empty rather than failing to parse. CheckRun reads like the dicts
+checks used to be (``check["result"]``), so code that takes plain dicts
+takes CheckRuns as well.
+
+Polls of a large pull request mostly return the same checks again;
+changed_checks picks out the few that are new or changed, so only those
+are recorded and logged.
+"""
+
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Results of checks that have not finished yet
+PENDING_RESULTS = ("IN_PROGRESS", "QUEUED", "PENDING")
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds of a GitHub timestamp, None when it is empty or the zero time of a pending check"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed.timestamp() if parsed.year > 1 else None
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """H:MM:SS, as str(timedelta) has it, "" for None"""
+    return "" if seconds is None else str(timedelta(seconds=seconds))
+
+
+class CheckRun(Mapping):
+    """One check of a pull request: a check run or a commit status
+
+    started and completed are epoch seconds, None while not known; a check
+    that has not finished has no completion time whatever GitHub sent.
+    """
+
+    __slots__ = ("name", "result", "url", "started_at", "started", "completed")
+
+    # What reading it as a mapping shows, the keys of the dicts pr_checker used to return
+    KEYS = ("name", "result", "url", "started_at", "duration")
+
+    def __init__(self, name: str, result: str, url: str = "", started_at: str = "", completed_at: Optional[str] = None):
+        self.name = name
+        self.result = result
+        self.url = url or ""
+        self.started_at = started_at or ""
+        self.started = parse_time(started_at)
+        self.completed = None if result in PENDING_RESULTS else parse_time(completed_at)
+
+    @classmethod
+    def from_node(cls, node: Dict[str, Any]) -> "CheckRun":
+        """From a statusCheckRollup context node of the GraphQL API"""
+        if node.get("__typename") == "StatusContext":
+            state = node.get("state") or "PENDING"
+            return cls(
+                node["context"],
+                "PENDING" if state == "EXPECTED" else state,
+                node.get("targetUrl") or "",
+                node.get("createdAt") or "",
+            )
+        status = node.get("status")
+        if status == "COMPLETED":
+            result = node.get("conclusion") or "NEUTRAL"
+        else:
+            result = "IN_PROGRESS" if status == "IN_PROGRESS" else "QUEUED"
+        return cls(
+            node["name"], result, node.get("detailsUrl") or "", node.get("startedAt") or "", node.get("completedAt")
+        )
+
+    @property
+    def pending(self) -> bool:
+        return self.result in PENDING_RESULTS
+
+    @property
+    def seconds(self) -> Optional[int]:
+        """Whole seconds the check took, None until it has finished"""
+        if self.started is None or self.completed is None:
+            return None
+        return round(self.completed - self.started)
+
+    @property
+    def duration(self) -> str:
+        return format_duration(self.seconds)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        return f"CheckRun({self.name!r}, {self.result!r}, started_at={self.started_at!r}, duration={self.duration!r})"
+
+
+def started_time(check: Mapping) -> Optional[float]:
+    """Epoch seconds check started at; parsed already for a CheckRun, from started_at for a dict"""
+    return check.started if isinstance(check, CheckRun) else parse_time(check.get("started_at"))
+
+
+def changed_checks(previous: Iterable[Mapping], current: List[Mapping]) -> List[Mapping]:
+    """The checks of current that are new since previous, or have another result or start since"""
+    seen = {check["name"]: (check["result"], check.get("started_at")) for check in previous}
+    return [check for check in current if seen.get(check["name"]) != (check["result"], check.get("started_at"))]
+
+
+def describe_change(check: Mapping) -> str:
+    """Log line of a check that changed: "tests: SUCCESS (0:04:30)" """
+    duration = check.get("duration")
+    return f"{check['name']}: {check['result']}" + (f" ({duration})" if duration else "")
@@ -0,0 +1,247 @@
+"""Durations of finished CI checks, per repository and check name.
+
+Every check action-checker sees finish is recorded once in a SQLite
+database (``$XDG_STATE_HOME/action-checker/durations.sqlite3``). The median
+of the most recent runs of a check is its expected duration: it predicts
+when running checks will be done, which the poll scheduler and the ETAs in
+the monitor's output use, and a check running longer than the 90th
+percentile is reported as slower than usual. ``action-checker --durations``
+prints the percentiles of every check, to spot CI getting slower across
+pull requests.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from py_scripts.action_checker.checks import PENDING_RESULTS, CheckRun, started_time
+
+# Most recent runs of a check its statistics are computed from
+WINDOW = 50
+# Runs of a check needed before it gets an expected duration or slow warnings
+MIN_RUNS = 3
+
+# str(timedelta): "0:04:30", "1 day, 2:00:00"
+DURATION = re.compile(r"^(?:(?P<days>\d+) days?, )?(?P<hours>\d+):(?P<minutes>\d\d):(?P<seconds>\d\d)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS durations (
+    repo TEXT NOT NULL,
+    name TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (repo, name, started_at)
+)
+"""
+
+
+def default_history_path() -> Path:
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return Path(base) / "action-checker" / "durations.sqlite3"
+
+
+def parse_duration(text: str) -> Optional[float]:
+    """Seconds of a duration as pr_checker formats it, None when empty or invalid"""
+    match = DURATION.match(text.strip())
+    if not match:
+        return None
+    days = int(match.group("days") or 0)
+    return (
+        days * 86400 + int(match.group("hours")) * 3600 + int(match.group("minutes")) * 60 + int(match.group("seconds"))
+    )
+
+
+def format_seconds(seconds: float) -> str:
+    seconds = max(0, round(seconds))
+    return (
+        f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        if seconds >= 3600
+        else f"{seconds // 60}:{seconds % 60:02d}"
+    )
+
+
+def format_eta(seconds: float) -> str:
+    return "<1 min" if seconds < 60 else f"~{round(seconds / 60)} min"
+
+
+@dataclass(frozen=True)
+class DurationStats:
+    """Percentiles, in seconds, of the recent runs of one check"""
+
+    count: int
+    p50: float
+    p90: float
+    last: float
+
+
+def compute_stats(durations: List[float]) -> DurationStats:
+    """Stats of durations, most recent first"""
+    ordered = sorted(durations)
+    return DurationStats(
+        count=len(durations),
+        p50=ordered[len(ordered) // 2],
+        p90=ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))],
+        last=durations[0],
+    )
+
+
+class DurationStore:
+    """Recorded check durations and their per-check statistics"""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        window: int = WINDOW,
+        min_runs: int = MIN_RUNS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path if path is not None else default_history_path()
+        self.window = window
+        self.min_runs = min_runs
+        self._clock = clock
+        self._db: Optional[sqlite3.Connection] = None
+        # (repo, name) -> stats, dropped when a run of that check is recorded
+        self._stats: Dict[Tuple[str, str], Optional[DurationStats]] = {}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # The monitor service and a foreground --monitor may write at the same time
+            self._db = sqlite3.connect(self.path, timeout=5.0)
+            self._db.execute(SCHEMA)
+        return self._db
+
+    def record(self, repo: str, checks: Iterable[Mapping[str, str]]) -> int:
+        """Store the duration of every finished check not stored yet; return how many were new"""
+        rows = []
+        for check in checks:
+            seconds = check.seconds if isinstance(check, CheckRun) else parse_duration(check.get("duration") or "")
+            if check["result"] in PENDING_RESULTS or seconds is None or not check.get("started_at"):
+                continue
+            rows.append((repo, check["name"], check["started_at"], seconds, self._clock()))
+        if not rows:
+            return 0
+        try:
+            with self.db:
+                before = self.db.total_changes
+                self.db.executemany("INSERT OR IGNORE INTO durations VALUES (?, ?, ?, ?, ?)", rows)
+                added = self.db.total_changes - before
+        except (OSError, sqlite3.Error):
+            return 0  # history makes predictions better, never a reason to stop monitoring
+        for row in rows:
+            self._stats.pop((repo, row[1]), None)
+        return added
+
+    def stats(self, repo: str, name: str, before: Optional[str] = None) -> Optional[DurationStats]:
+        """Stats of the last window runs of a check, None with fewer than min_runs
+
+        With before, only runs started before that time count, so a run can
+        be compared with the ones that came before it.
+        """
+        key = (repo, name)
+        if before is None and key in self._stats:
+            return self._stats[key]
+        condition, params = "repo = ? AND name = ?", [repo, name]
+        if before is not None:
+            condition += " AND started_at < ?"
+            params.append(before)
+        try:
+            rows = self.db.execute(
+                f"SELECT seconds FROM durations WHERE {condition} ORDER BY started_at DESC LIMIT ?",
+                (*params, self.window),
+            ).fetchall()
+        except (OSError, sqlite3.Error):
+            rows = []
+        durations = [row[0] for row in rows]
+        stats = compute_stats(durations) if len(durations) >= self.min_runs else None
+        if before is None:
+            self._stats[key] = stats
+        return stats
+
+    def expected(self, repo: str, name: str) -> Optional[float]:
+        """Usual duration of a check, for PollScheduler"""
+        stats = self.stats(repo, name)
+        return stats.p50 if stats is not None else None
+
+    def eta(self, repo: str, running: Iterable[Mapping[str, str]], now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the last of the running checks is expected to finish, None if any is unpredictable"""
+        now = self._clock() if now is None else now
+        remaining = 0.0
+        for check in running:
+            started = started_time(check)
+            expected = self.expected(repo, check["name"])
+            if started is None or expected is None:
+                return None
+            remaining = max(remaining, started + expected - now)
+        return remaining
+
+    def slow_checks(
+        self, repo: str, checks: Iterable[Mapping[str, str]], now: Optional[float] = None
+    ) -> List[Tuple[Mapping[str, str], float, DurationStats]]:
+        """(check, seconds taken so far, stats) of each check past the p90 of the runs before it"""
+        now = self._clock() if now is None else now
+        slow = []
+        for check in checks:
+            if check["result"] in PENDING_RESULTS:
+                stats = self.stats(repo, check["name"])
+                started = started_time(check)
+                seconds = now - started if started is not None else None
+            else:
+                stats = self.stats(repo, check["name"], before=check.get("started_at") or None)
+                seconds = check.seconds if isinstance(check, CheckRun) else parse_duration(check.get("duration") or "")
+            if stats is not None and seconds is not None and seconds > stats.p90:
+                slow.append((check, seconds, stats))
+        return slow
+
+    def notes(self, repo: str, checks: Iterable[Mapping[str, str]]) -> Dict[str, str]:
+        """Check name -> " (12:00, slower than p90 9:00)" for the finished checks that took unusually long"""
+        return {
+            check["name"]: f" ({format_seconds(seconds)}, slower than p90 {format_seconds(stats.p90)})"
+            for check, seconds, stats in self.slow_checks(repo, checks)
+        }
+
+    def summary(self) -> List[Tuple[str, str, DurationStats]]:
+        """(repo, name, stats) of every check with enough runs, by repository and name"""
+        try:
+            keys = self.db.execute("SELECT DISTINCT repo, name FROM durations ORDER BY repo, name").fetchall()
+        except (OSError, sqlite3.Error):
+            return []
+        rows = [(repo, name, self.stats(repo, name)) for repo, name in keys]
+        return [(repo, name, stats) for repo, name, stats in rows if stats is not None]
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def progress_report(
+    store: DurationStore,
+    repo: str,
+    label: str,
+    running: List[Mapping[str, str]],
+    warned: Set[Tuple[str, str, str]],
+) -> List[str]:
+    """Lines on the running checks of label: when they should be done, and which became slower than usual
+
+    A slow check is reported once; warned keeps the (repo, name, started_at)
+    of those already reported.
+    """
+    eta = store.eta(repo, running)
+    lines = [f"{label}: {len(running)} running" + (f", done in {format_eta(eta)}" if eta is not None else "")]
+    for check, seconds, stats in store.slow_checks(repo, running):
+        key = (repo, check["name"], check.get("started_at") or "")
+        if key in warned:
+            continue
+        warned.add(key)
+        lines.append(
+            f"{label}: {check['name']} is slower than usual "
+            f"({format_seconds(seconds)} so far, p90 {format_seconds(stats.p90)})"
+        )
+    return lines
@@ -0,0 +1,568 @@
+"""One monitor process for every pull request action-checker watches.
+
+``action-checker`` run next to an open pull request registers it with the
+monitor over a Unix socket (``$XDG_RUNTIME_DIR/action-checker.sock``, or
+``$ACTION_CHECKER_SOCKET``), starting the monitor first when none answers.
+The monitor keeps the watched pull requests, from any repository, in a
+state file so a restart picks them up again. Each poll asks for the checks
+of all of them in one GraphQL query, and each pull request gets its own
+notification once its checks are done. The monitor exits when nothing is
+left to watch. Webhook events, when a listener is set up (see webhook.py),
+update the checks between polls.
+
+The socket protocol is the one of the cmd-picker daemon: one JSON object
+per line, requests carry an ``op`` ("ping", "watch" or "list"), answers
+``ok`` plus the result or an ``error`` message.
+"""
+
+import json
+import os
+import re
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+from py_scripts.action_checker.checks import PENDING_RESULTS, CheckRun, changed_checks, describe_change
+from py_scripts.action_checker.history import progress_report
+from py_scripts.action_checker.schedule import MAX_INTERVAL, PollScheduler, backoff_delay
+from py_scripts.http_cache.github import GitHubGraphQLError
+
+if TYPE_CHECKING:
+    from py_scripts.action_checker.history import DurationStore
+    from py_scripts.action_checker.webhook import CheckEvent
+
+# Pull requests asked about per GraphQL query
+BATCH_SIZE = 25
+# Check runs and statuses read per pull request and query; more are read page by page
+CONTEXTS_PER_PR = 100
+# GraphQL error types of a pull request or repository that was deleted or is out of reach
+GONE_ERRORS = ("NOT_FOUND", "FORBIDDEN")
+# Seconds a pull request may show no checks at all before that counts as done
+NO_CHECKS_GRACE = 120.0
+# Wait between polls while webhook events of the repository keep coming, as a fallback for lost ones
+EVENT_FALLBACK_INTERVAL = 300.0
+# Seconds without webhook events after which a repository is polled as usual again
+EVENT_QUIET = 600.0
+
+PR_URL = re.compile(r"^https?://[^/]+/(?P<owner>[^/]+)/(?P<name>[^/]+)/pull/(?P<number>\d+)")
+PR_SLUG = re.compile(r"^(?P<owner>[^/\s]+)/(?P<name>[^/#\s]+)#(?P<number>\d+)$")
+
+# Selection of a statusCheckRollup contexts connection
+CONTEXT_FIELDS = (
+    "pageInfo { hasNextPage endCursor } nodes { __typename"
+    " ... on CheckRun { name status conclusion startedAt completedAt detailsUrl }"
+    " ... on StatusContext { context state targetUrl createdAt } }"
+)
+
+CHECKS_FRAGMENT = """
+fragment PullRequestChecks on PullRequest {
+  state
+  url
+  commits(last: 1) {
+    nodes {
+      commit {
+        oid
+        statusCheckRollup {
+          contexts(first: %d) { %s }
+        }
+      }
+    }
+  }
+}
+""" % (CONTEXTS_PER_PR, CONTEXT_FIELDS)
+
+# The contexts after the first page, for pull requests with more than CONTEXTS_PER_PR
+MORE_CONTEXTS_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String!) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      commits(last: 1) {
+        nodes {
+          commit {
+            oid
+            statusCheckRollup {
+              contexts(first: %d, after: $cursor) { %s }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+""" % (CONTEXTS_PER_PR, CONTEXT_FIELDS)
+
+
+def default_socket_path() -> str:
+    if os.environ.get("ACTION_CHECKER_SOCKET"):
+        return os.environ["ACTION_CHECKER_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "action-checker.sock")
+    return f"/tmp/action-checker-{os.getuid()}.sock"
+
+
+def default_state_path() -> Path:
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return Path(base) / "action-checker" / "watched.json"
+
+
+class MonitorError(Exception):
+    """The monitor could not be reached or could not answer"""
+
+
+@dataclass(frozen=True)
+class PullRequest:
+    owner: str
+    name: str
+    number: int
+
+    @property
+    def repo(self) -> str:
+        return f"{self.owner}/{self.name}"
+
+    @property
+    def slug(self) -> str:
+        return f"{self.repo}#{self.number}"
+
+    @classmethod
+    def parse(cls, text: str) -> Optional["PullRequest"]:
+        """PullRequest from a pull request URL or an owner/name#number slug"""
+        match = PR_URL.match(text.strip()) or PR_SLUG.match(text.strip())
+        if not match:
+            return None
+        return cls(match.group("owner"), match.group("name"), int(match.group("number")))
+
+
+def to_checks(contexts: List[Dict[str, Any]]) -> List[CheckRun]:
+    """Checks, in the shape pr_checker returns, from statusCheckRollup context nodes"""
+    return [CheckRun.from_node(node) for node in contexts]
+
+
+def merge_check(checks: List[CheckRun], check: CheckRun) -> List[CheckRun]:
+    """checks with check in place of the one of the same name, or added at the end
+
+    An event that arrives late, saying a run that already finished is still
+    running, leaves the finished one.
+    """
+    merged = []
+    for old in checks:
+        if old["name"] != check["name"]:
+            merged.append(old)
+        elif (
+            old["result"] not in PENDING_RESULTS
+            and check["result"] in PENDING_RESULTS
+            and check.get("started_at", "") <= old.get("started_at", "")
+        ):
+            merged.append(old)
+        else:
+            merged.append(check)
+    if all(old["name"] != check["name"] for old in checks):
+        merged.append(check)
+    return merged
+
+
+def checks_query(prs: List[PullRequest]) -> str:
+    """One query asking for the checks of every pull request in prs, aliased pr0, pr1, …"""
+    variables = ", ".join(f"$owner{i}: String!, $name{i}: String!, $number{i}: Int!" for i in range(len(prs)))
+    fields = "\n".join(
+        f"  pr{i}: repository(owner: $owner{i}, name: $name{i}) "
+        f"{{ pullRequest(number: $number{i}) {{ ...PullRequestChecks }} }}"
+        for i in range(len(prs))
+    )
+    return f"query({variables}) {{\n{fields}\n}}\n{CHECKS_FRAGMENT}"
+
+
+def last_commit_contexts(node: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """(oid, contexts connection) of the last commit of a pullRequest node"""
+    commits = (node.get("commits") or {}).get("nodes") or []
+    commit = commits[-1]["commit"] if commits else {}
+    return commit.get("oid") or "", (commit.get("statusCheckRollup") or {}).get("contexts") or {}
+
+
+def remaining_contexts(
+    pr: PullRequest, oid: str, cursor: str, query: Callable[[str, Dict[str, Any]], Dict[str, Any]]
+) -> Optional[List[Dict[str, Any]]]:
+    """The context nodes of commit oid of pr after cursor, None when the pull request got a new head meanwhile"""
+    nodes: List[Dict[str, Any]] = []
+    while True:
+        variables = {"owner": pr.owner, "name": pr.name, "number": pr.number, "cursor": cursor}
+        node = (query(MORE_CONTEXTS_QUERY, variables).get("repository") or {}).get("pullRequest") or {}
+        page_oid, contexts = last_commit_contexts(node)
+        if page_oid != oid:
+            return None
+        nodes.extend(contexts.get("nodes") or [])
+        page = contexts.get("pageInfo") or {}
+        if not page.get("hasNextPage"):
+            return nodes
+        cursor = page["endCursor"]
+
+
+def fetch_checks(
+    prs: List[PullRequest], query: Callable[[str, Dict[str, Any]], Dict[str, Any]], batch_size: int = BATCH_SIZE
+) -> Dict[PullRequest, Optional[Dict[str, Any]]]:
+    """State, head commit and checks of each pull request, None for the ones that do not exist (any more)
+
+    Runs one query per batch_size pull requests, and one more per further
+    page of checks of a pull request with more than CONTEXTS_PER_PR. GitHub answers a deleted
+    or inaccessible pull request with an error about its alias next to the
+    data of the others: that pull request is None, and one whose alias had
+    any other error is left out of this round. Errors not about a single
+    alias propagate.
+    """
+    results: Dict[PullRequest, Optional[Dict[str, Any]]] = {}
+    for start in range(0, len(prs), batch_size):
+        batch = prs[start : start + batch_size]
+        variables: Dict[str, Any] = {}
+        for i, pr in enumerate(batch):
+            variables.update({f"owner{i}": pr.owner, f"name{i}": pr.name, f"number{i}": pr.number})
+        try:
+            data = query(checks_query(batch), variables)
+            failed: Dict[str, str] = {}
+        except GitHubGraphQLError as e:
+            if e.data is None or not e.errors or not all(error.get("path") for error in e.errors):
+                raise
+            failed = {str(error["path"][0]): error.get("type", "") for error in e.errors}
+            data = e.data
+        for i, pr in enumerate(batch):
+            if f"pr{i}" in failed and failed[f"pr{i}"] not in GONE_ERRORS:
+                continue
+            node = ((data.get(f"pr{i}") or {}).get("pullRequest")) or None
+            if node is None:
+                results[pr] = None
+                continue
+            oid, contexts = last_commit_contexts(node)
+            nodes = contexts.get("nodes") or []
+            page = contexts.get("pageInfo") or {}
+            if page.get("hasNextPage"):
+                # Judging a pull request by its first page of checks could call it done too early
+                try:
+                    more = remaining_contexts(pr, oid, page["endCursor"], query)
+                except GitHubGraphQLError:
+                    more = None
+                if more is None:
+                    continue  # asked again next poll
+                nodes = nodes + more
+            results[pr] = {
+                "state": node.get("state", "OPEN"),
+                "url": node.get("url", ""),
+                "head_sha": oid,
+                "checks": to_checks(nodes),
+            }
+    return results
+
+
+class WatchList:
+    """The watched pull requests, saved to path on every change"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path if path is not None else default_state_path()
+        self._prs: List[PullRequest] = []
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as f:
+                slugs = json.load(f)["watched"]
+        except (OSError, ValueError, KeyError, TypeError):
+            slugs = []
+        prs = [PullRequest.parse(slug) for slug in slugs if isinstance(slug, str)]
+        self._prs = [pr for pr in prs if pr is not None]
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"watched": [pr.slug for pr in self._prs]}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # still watched for as long as this process runs
+
+    def add(self, pr: PullRequest) -> bool:
+        """Watch pr; False if it already is"""
+        if pr in self._prs:
+            return False
+        self._prs.append(pr)
+        self.save()
+        return True
+
+    def remove(self, pr: PullRequest) -> None:
+        if pr in self._prs:
+            self._prs.remove(pr)
+            self.save()
+
+    def __iter__(self):
+        return iter(list(self._prs))
+
+    def __len__(self) -> int:
+        return len(self._prs)
+
+    def __contains__(self, pr: object) -> bool:
+        return pr in self._prs
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                response = self.server.monitor.handle(json.loads(line))
+            except ValueError:
+                response = {"ok": False, "error": "malformed request"}
+            try:
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+            except OSError:
+                return
+
+
+class Monitor:
+    """Polls the checks of every watched pull request and notifies as each one finishes
+
+    query runs a GraphQL query and returns its data, notify is called with
+    a pull request and its final checks. With a history, finished checks
+    are recorded in it, and its expected durations drive the poll schedule
+    and the progress the monitor prints. Webhook events handed to
+    push_event update the checks of the last poll between polls.
+    """
+
+    def __init__(
+        self,
+        watchlist: WatchList,
+        query: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+        notify: Callable[[PullRequest, List[CheckRun]], None],
+        scheduler: Optional[PollScheduler] = None,
+        socket_path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+        history: Optional["DurationStore"] = None,
+    ):
+        self.watchlist = watchlist
+        self.query = query
+        self.notify = notify
+        self.history = history
+        if scheduler is None:
+            expected = history.expected if history is not None else (lambda repo, name: None)
+            scheduler = PollScheduler(expected_duration=expected, clock=clock)
+        self.scheduler = scheduler
+        self.socket_path = socket_path or default_socket_path()
+        self._clock = clock
+        self.failures = 0
+        # When each pull request was first seen without any checks
+        self._no_checks_since: Dict[PullRequest, float] = {}
+        # Checks already reported as slower than usual
+        self._warned: Set[Tuple[str, str, str]] = set()
+        # Head commit and checks of each pull request as last polled, kept up to date by events
+        self._seen: Dict[PullRequest, Dict[str, Any]] = {}
+        self._events: List["CheckEvent"] = []
+        # Lowercase repository -> when its last webhook event arrived
+        self._last_event: Dict[str, float] = {}
+        self._poll_now = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.stopping = False
+        self.server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "list":
+            with self._lock:
+                return {"ok": True, "watched": [pr.slug for pr in self.watchlist]}
+        if op != "watch":
+            return {"ok": False, "error": f"unknown op {op!r}"}
+        pr = PullRequest.parse(str(request.get("pr", "")))
+        if pr is None:
+            return {"ok": False, "error": f"not a pull request: {request.get('pr')!r}"}
+        with self._lock:
+            if self.stopping:
+                return {"ok": False, "error": "the monitor is shutting down"}
+            added = self.watchlist.add(pr)
+        self._poll_now = True
+        self._wake.set()  # poll the new pull request now rather than after the current wait
+        return {"ok": True, "added": added}
+
+    def poll(self) -> float:
+        """Look at every watched pull request once; return the seconds to wait before the next poll"""
+        with self._lock:
+            prs = list(self.watchlist)
+        if not prs:
+            return 0.0
+        try:
+            results = fetch_checks(prs, self.query)
+        except Exception as e:
+            self.failures += 1
+            print(f"Polling {len(prs)} pull requests failed: {e}")
+            return backoff_delay(self.failures - 1, cap=MAX_INTERVAL)
+        self.failures = 0
+
+        delays: List[float] = []
+        for pr, result in results.items():
+            if result is None or result["state"] != "OPEN":
+                print(f"{pr.slug} is {'gone' if result is None else result['state'].lower()}, no longer watched")
+                self.forget(pr)
+                continue
+            previous = self._seen.get(pr, {}).get("checks", [])
+            self._seen[pr] = {"head_sha": result["head_sha"], "checks": result["checks"]}
+            delay = self._update(pr, result["checks"], previous)
+            if delay is not None:
+                delays.append(delay)
+        return min(delays, default=self.scheduler.min_interval)
+
+    def _update(self, pr: PullRequest, checks: List[CheckRun], previous: List[CheckRun]) -> Optional[float]:
+        """Take in the current checks of pr: the wait before looking again, None once notified
+
+        Only the checks that changed since previous are recorded and logged.
+        """
+        changed = changed_checks(previous, checks)
+        if changed and self.history is not None:
+            self.history.record(pr.repo, changed)
+        running = [check for check in checks if check.pending]
+        if running or self._waiting_for_checks(pr, checks):
+            if previous:
+                for check in changed:
+                    print(f"{pr.slug}: {describe_change(check)}")
+            if changed and running and self.history is not None:
+                print("\n".join(progress_report(self.history, pr.repo, pr.slug, running, self._warned)))
+            delay = self.scheduler.next_delay(running, repo=pr.repo)
+            if self._clock() - self._last_event.get(pr.repo.lower(), float("-inf")) < EVENT_QUIET:
+                delay = max(delay, EVENT_FALLBACK_INTERVAL)
+            return delay
+        print(f"{pr.slug}: checks finished")
+        self.forget(pr)
+        self.notify(pr, checks)
+        return None
+
+    def push_event(self, event: "CheckEvent") -> None:
+        """Queue a webhook event for the polling thread, see WebhookListener"""
+        with self._lock:
+            self._events.append(event)
+            self._last_event[event.repo.lower()] = self._clock()
+        self._wake.set()
+
+    def apply_events(self) -> None:
+        """Apply the queued events to the checks of the pull requests they are about"""
+        with self._lock:
+            events, self._events = self._events, []
+        for event in events:
+            with self._lock:
+                prs = list(self.watchlist)
+            for pr in prs:
+                seen = self._seen.get(pr)
+                head_sha = seen["head_sha"] if seen is not None else None
+                if event.numbers:
+                    about = pr.number in event.numbers
+                else:  # statuses, and checks of pull requests from forks, name only the commit
+                    about = bool(event.head_sha) and event.head_sha == head_sha
+                if not about or pr.repo.lower() != event.repo.lower():
+                    continue
+                if event.check is None or seen is None or event.head_sha != head_sha:
+                    # A finished check suite, a pull request not polled yet or a new push: ask for every check
+                    self._poll_now = True
+                    continue
+                previous, seen["checks"] = seen["checks"], merge_check(seen["checks"], event.check)
+                self._update(pr, seen["checks"], previous)
+
+    def _waiting_for_checks(self, pr: PullRequest, checks: List[CheckRun]) -> bool:
+        """No checks yet shortly after a push usually means they have not been created yet"""
+        if checks:
+            self._no_checks_since.pop(pr, None)
+            return False
+        since = self._no_checks_since.setdefault(pr, self._clock())
+        return self._clock() - since < NO_CHECKS_GRACE
+
+    def forget(self, pr: PullRequest) -> None:
+        with self._lock:
+            self.watchlist.remove(pr)
+        self._no_checks_since.pop(pr, None)
+        self._seen.pop(pr, None)
+
+    def bind(self) -> None:
+        """Listen on socket_path, replacing a stale socket but never a live monitor"""
+        if os.path.exists(self.socket_path):
+            if MonitorClient(self.socket_path, timeout=1.0).ping():
+                raise MonitorError(f"a monitor is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, _RequestHandler, bind_and_activate=False)
+        server.daemon_threads = True
+        server.monitor = self
+        old_umask = os.umask(0o177)
+        try:
+            server.server_bind()
+        finally:
+            os.umask(old_umask)
+        server.server_activate()
+        self.server = server
+        threading.Thread(target=server.serve_forever, args=(0.2,), name="monitor-socket", daemon=True).start()
+
+    def run(self) -> None:
+        """Poll, and apply events as they come, until nothing is left to watch"""
+        if self.server is None:
+            self.bind()
+        next_poll = 0.0
+        try:
+            while True:
+                self._wake.clear()
+                self.apply_events()
+                if self._poll_now or time.monotonic() >= next_poll:
+                    self._poll_now = False
+                    next_poll = time.monotonic() + self.poll()
+                with self._lock:
+                    if not self.watchlist:
+                        self.stopping = True
+                        return
+                self._wake.wait(max(0.0, next_poll - time.monotonic()))
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+
+class MonitorClient:
+    """Registers pull requests with a running Monitor"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 10.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and return the answer; raises MonitorError on failure or error answers"""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(json.dumps(payload).encode() + b"\n")
+                with sock.makefile("rb") as reader:
+                    line = reader.readline()
+            if not line:
+                raise ConnectionResetError("monitor closed the connection")
+            response = json.loads(line)
+        except (OSError, ValueError) as e:
+            raise MonitorError(f"cannot reach the action-checker monitor at {self.socket_path}: {e}") from e
+        if not response.get("ok"):
+            raise MonitorError(response.get("error", "request failed"))
+        return response
+
+    def ping(self) -> bool:
+        try:
+            self.request({"op": "ping"})
+            return True
+        except MonitorError:
+            return False
+
+    def watch(self, pr: PullRequest) -> bool:
+        """Add pr to the monitor; False if it was already watched"""
+        return self.request({"op": "watch", "pr": pr.slug})["added"]
+
+    def watched(self) -> List[str]:
+        return self.request({"op": "list"})["watched"]
@@ -0,0 +1,84 @@
+"""When action-checker looks at the checks of a pull request next.
+
+Instead of asking every few seconds, PollScheduler looks at the checks that
+are still running. A check expected to take ten minutes is looked at rarely
+while it has minutes left and more and more often as its predicted end
+approaches, halving the wait each time. Without an expected duration the
+wait grows with the time the check has been running, since a check that has
+run for twenty minutes is unlikely to finish in the next three seconds. As
+nothing says when such a check, or one running past its predicted end, will
+finish, its wait stays under a lower cap so its notification is late by at
+most that much. Failed polls are retried with exponential backoff instead.
+"""
+
+import random
+import time
+from typing import Callable, Iterable, Mapping, Optional
+
+from py_scripts.action_checker.checks import started_time
+
+# Bounds of the wait between two polls, in seconds
+MIN_INTERVAL = 3.0
+MAX_INTERVAL = 60.0
+# Longest wait while a check has no predicted end, or has run past it
+OPEN_ENDED_INTERVAL = 20.0
+# Wait while a check is queued and has no start time to predict from
+QUEUED_INTERVAL = 10.0
+# First and longest wait before retrying a poll that failed
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+
+def backoff_delay(
+    attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP, jitter: Callable[[], float] = random.random
+) -> float:
+    """Seconds to wait before retry number attempt (from 0) of a failed call
+
+    Doubles per attempt up to cap; the jitter keeps several monitors from
+    retrying in step.
+    """
+    delay = min(cap, base * 2**attempt)
+    return delay / 2 + jitter() * delay / 2
+
+
+class PollScheduler:
+    """Picks the wait before the next poll from the checks still pending
+
+    expected_duration returns how many seconds the check of a repository
+    ("owner/name") with the given name usually takes, None when that is not
+    known, e.g. DurationStore.expected.
+    """
+
+    def __init__(
+        self,
+        expected_duration: Callable[[str, str], Optional[float]] = lambda repo, name: None,
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        clock: Callable[[], float] = time.time,
+        open_ended_interval: float = OPEN_ENDED_INTERVAL,
+    ):
+        self.expected_duration = expected_duration
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.open_ended_interval = open_ended_interval
+        self._clock = clock
+
+    def check_delay(self, check: Mapping[str, str], now: float, repo: str = "") -> float:
+        """Wait that still catches this check finishing soon after it does"""
+        started = started_time(check)
+        if started is None:
+            return QUEUED_INTERVAL
+        expected = self.expected_duration(repo, check["name"])
+        if expected is None:
+            return min(self.open_ended_interval, max(0.0, now - started) / 4)
+        remaining = started + expected - now
+        if remaining > 0:
+            return remaining / 2
+        # Running longer than usual: the prediction was wrong, so back off again
+        return min(self.open_ended_interval, -remaining / 4)
+
+    def next_delay(self, pending: Iterable[Mapping[str, str]], repo: str = "") -> float:
+        """Seconds until the next poll, given the checks of repo that have not finished"""
+        now = self._clock()
+        delays = [self.check_delay(check, now, repo) for check in pending]
+        return max(self.min_interval, min(self.max_interval, min(delays, default=self.min_interval)))
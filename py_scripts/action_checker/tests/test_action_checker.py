@@ -3,6 +3,8 @@ import json
 import os
 import sys
 
+import pytest
+
 # Add the parent directory to the path so we can import action_checker
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -19,6 +21,12 @@ action_checker_module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(action_checker_module)
 
 
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Keep the watch list and duration history of the tests out of the real state directory"""
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+
+
 def test_notification_msg():
     pr_checks = [
         {"name": "test1", "result": "success", "url": "https://github.com/user/repo/check/123"},
@@ -46,8 +54,15 @@ def test_dt_diff():
     assert result == "0:30:00"
 
 
+def test_dt_diff_of_a_running_check():
+    # gh reports the zero time, or nothing, as the completion of a check still running
+    assert action_checker_module.dt_diff("0001-01-01T00:00:00Z", "2023-01-01T12:00:00Z") == ""
+    assert action_checker_module.dt_diff("", "2023-01-01T12:00:00Z") == ""
+
+
+@patch.object(action_checker_module, "api_pr_checks", return_value=None)
 @patch.object(action_checker_module, "subprocess")
-def test_pr_checker_success(mock_subprocess):
+def test_pr_checker_success(mock_subprocess, mock_api_pr_checks):
     mock_output = [
         {
             "name": "test1",
@@ -69,6 +84,114 @@ def test_pr_checker_success(mock_subprocess):
     assert result[0]["duration"] == "0:30:00"
 
 
+class FakeGitHubAPI:
+    token = "secret"
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.paths = []
+
+    def get_json(self, path, params=None):
+        self.paths.append(path)
+        return self.responses[path]
+
+
+API_RESPONSES = {
+    "/repos/user/repo/pulls": [{"number": 5, "head": {"sha": "abc123"}}],
+    "/repos/user/repo/commits/abc123/check-runs": {
+        "check_runs": [
+            {
+                "name": "build",
+                "status": "completed",
+                "conclusion": "success",
+                "html_url": "https://github.com/user/repo/runs/1",
+                "started_at": "2023-01-01T12:00:00Z",
+                "completed_at": "2023-01-01T12:05:00Z",
+            },
+            {
+                "name": "tests",
+                "status": "in_progress",
+                "conclusion": None,
+                "html_url": "https://github.com/user/repo/runs/2",
+                "started_at": "2023-01-01T12:00:00Z",
+                "completed_at": None,
+            },
+            {"name": "deploy", "status": "queued", "conclusion": None, "started_at": None, "completed_at": None},
+        ]
+    },
+    "/repos/user/repo/commits/abc123/status": {
+        "statuses": [
+            {
+                "context": "ci/legacy",
+                "state": "failure",
+                "target_url": "https://ci.example.com/1",
+                "created_at": "2023-01-01T12:00:00Z",
+                "updated_at": "2023-01-01T12:01:00Z",
+            }
+        ]
+    },
+}
+
+
+@patch.object(action_checker_module, "current_repo", return_value=("user", "repo"))
+@patch.object(action_checker_module, "subprocess")
+def test_pr_checker_uses_api(mock_subprocess, mock_current_repo):
+    mock_subprocess.run.return_value = MagicMock(stdout="feature\n")
+    api = FakeGitHubAPI(API_RESPONSES)
+
+    with patch.object(action_checker_module, "github_api", return_value=api):
+        result = action_checker_module.pr_checker()
+
+    assert [(c["name"], c["result"], c["duration"]) for c in result] == [
+        ("build", "SUCCESS", "0:05:00"),
+        ("tests", "IN_PROGRESS", ""),
+        ("deploy", "QUEUED", ""),
+        ("ci/legacy", "FAILURE", "0:01:00"),
+    ]
+    # gh is not involved, only git for the branch name
+    assert [c.args[0][0] for c in mock_subprocess.run.call_args_list] == ["git"]
+
+
+@patch.object(action_checker_module, "current_repo", return_value=("user", "repo"))
+@patch.object(action_checker_module, "subprocess")
+def test_pr_checker_reads_every_page(mock_subprocess, mock_current_repo):
+    mock_subprocess.run.return_value = MagicMock(stdout="feature\n")
+    done = dict(API_RESPONSES["/repos/user/repo/commits/abc123/check-runs"]["check_runs"][0])
+    runs = [dict(done, name=f"test ({n})") for n in range(250)]
+    runs[230] = dict(runs[230], status="in_progress", conclusion=None, completed_at=None)
+
+    class PagedGitHubAPI(FakeGitHubAPI):
+        def get_json(self, path, params=None):
+            self.paths.append((path, (params or {}).get("page")))
+            if path.endswith("/check-runs"):
+                start = (params["page"] - 1) * params["per_page"]
+                return {"total_count": len(runs), "check_runs": runs[start : start + params["per_page"]]}
+            return self.responses[path]
+
+    api = PagedGitHubAPI(API_RESPONSES)
+    with patch.object(action_checker_module, "github_api", return_value=api):
+        result = action_checker_module.pr_checker()
+
+    assert len(result) == 251
+    assert action_checker_module.pending_checks(result) == [result[230]]
+    assert [page for path, page in api.paths if path.endswith("/check-runs")] == [1, 2, 3]
+
+
+@patch.object(action_checker_module, "current_repo", return_value=("user", "repo"))
+@patch.object(action_checker_module, "subprocess")
+def test_pr_checker_falls_back_to_gh(mock_subprocess, mock_current_repo):
+    mock_subprocess.run.side_effect = [
+        MagicMock(stdout="feature\n"),
+        MagicMock(stdout=json.dumps([])),
+    ]
+    api = FakeGitHubAPI({"/repos/user/repo/pulls": []})
+
+    with patch.object(action_checker_module, "github_api", return_value=api):
+        assert action_checker_module.pr_checker() == []
+
+    assert mock_subprocess.run.call_args_list[-1].args[0][0] == "gh"
+
+
 @patch.object(action_checker_module, "pr_checker")
 @patch.object(action_checker_module, "subprocess")
 @patch.object(action_checker_module, "time")
@@ -101,6 +224,27 @@ def test_monitor_checks_success(mock_time, mock_subprocess, mock_pr_checker):
     mock_subprocess.call.assert_called_once()
 
 
+@patch.object(action_checker_module, "pr_checker")
+@patch.object(action_checker_module, "subprocess")
+@patch.object(action_checker_module, "time")
+def test_monitor_checks_logs_only_changes(mock_time, mock_subprocess, mock_pr_checker):
+    CheckRun = action_checker_module.CheckRun
+    started = "2023-01-01T12:00:00Z"
+    build = CheckRun("build", "SUCCESS", "https://github.com/user/repo/runs/1", started, "2023-01-01T12:05:00Z")
+    tests = CheckRun("tests", "IN_PROGRESS", "https://github.com/user/repo/runs/2", started, "0001-01-01T00:00:00Z")
+    tests_done = CheckRun("tests", "FAILURE", tests.url, started, "2023-01-01T12:07:00Z")
+    mock_pr_checker.side_effect = [[build, tests], [build, tests], [build, tests_done]]
+
+    with patch("builtins.print") as mock_print:
+        assert action_checker_module.monitor_checks() == 0
+
+    printed = [call.args[0] for call in mock_print.call_args_list]
+    assert "tests: FAILURE (0:07:00)" in printed
+    assert not any(line.startswith("build:") for line in printed)
+    # The unchanged second poll prints nothing
+    assert sum("1 running" in line for line in printed) == 1
+
+
 @patch.object(action_checker_module, "pr_checker")
 def test_monitor_checks_exception(mock_pr_checker):
     mock_pr_checker.side_effect = Exception("Test error")
@@ -112,6 +256,35 @@ def test_monitor_checks_exception(mock_pr_checker):
     mock_print.assert_called_once_with("Error: Test error")
 
 
+@patch.object(action_checker_module.subprocess, "run")
+def test_service_reads_webhook_secret_from_private_file(mock_run, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("ACTION_CHECKER_WEBHOOK", "8765")
+    monkeypatch.setenv("ACTION_CHECKER_WEBHOOK_SECRET", "s3cret")
+
+    action_checker_module.install_monitor_service()
+
+    env_file = tmp_path / ".config" / "action-checker" / "webhook.env"
+    service = (tmp_path / ".config" / "systemd" / "user" / action_checker_module.MONITOR_SERVICE).read_text()
+    assert f"EnvironmentFile={env_file}\n" in service
+    assert "s3cret" not in service
+    assert env_file.read_text() == "ACTION_CHECKER_WEBHOOK=8765\nACTION_CHECKER_WEBHOOK_SECRET=s3cret\n"
+    assert env_file.stat().st_mode & 0o777 == 0o600
+
+
+@patch.object(action_checker_module.subprocess, "run")
+def test_service_without_webhook_secret_does_not_listen(mock_run, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("ACTION_CHECKER_WEBHOOK", "8765")
+    monkeypatch.delenv("ACTION_CHECKER_WEBHOOK_SECRET", raising=False)
+
+    action_checker_module.install_monitor_service()
+
+    service = (tmp_path / ".config" / "systemd" / "user" / action_checker_module.MONITOR_SERVICE).read_text()
+    assert "ACTION_CHECKER_WEBHOOK" not in service
+    assert not (tmp_path / ".config" / "action-checker").exists()
+
+
 @patch.object(action_checker_module, "setup_systemd_service")
 def test_main_default(mock_setup):
     with patch("sys.argv", ["action_checker.py"]):
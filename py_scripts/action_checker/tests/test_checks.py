@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.action_checker.checks import CheckRun, changed_checks, describe_change, started_time
+from py_scripts.action_checker.history import DurationStore
+from py_scripts.action_checker.schedule import PollScheduler
+
+STARTED_AT = "2025-03-01T12:00:00Z"
+START = datetime(2025, 3, 1, 12, tzinfo=timezone.utc).timestamp()
+ZERO_TIME = "0001-01-01T00:00:00Z"
+
+
+def gh_checks(count, running_every=3, finished_at="2025-03-01T12:04:30Z"):
+    """`gh pr checks --json=name,state,link,startedAt,completedAt` output of a monorepo pull request"""
+    return [
+        {
+            "name": f"test ({i})",
+            "state": "IN_PROGRESS" if i % running_every == 0 else "SUCCESS",
+            "link": f"https://github.com/user/monorepo/actions/runs/1/job/{i}",
+            "startedAt": STARTED_AT,
+            "completedAt": ZERO_TIME if i % running_every == 0 else finished_at,
+        }
+        for i in range(count)
+    ]
+
+
+def parse(output):
+    return [CheckRun(c["name"], c["state"], c["link"], c["startedAt"], c["completedAt"]) for c in output]
+
+
+class TestCheckRun:
+    def test_finished_check(self):
+        check = CheckRun("build", "SUCCESS", "https://github.com/user/api/runs/1", STARTED_AT, "2025-03-01T12:04:30Z")
+        assert check.started == START
+        assert check.seconds == 270
+        assert check.duration == "0:04:30"
+        assert not check.pending
+
+    @pytest.mark.parametrize("completed_at", [None, "", ZERO_TIME, "2025-03-01T12:04:30Z"])
+    def test_pending_check_has_no_duration(self, completed_at):
+        check = CheckRun("tests", "IN_PROGRESS", "", STARTED_AT, completed_at)
+        assert check.pending
+        assert check.completed is None
+        assert check.duration == ""
+
+    def test_queued_check_has_no_start(self):
+        check = CheckRun("deploy", "QUEUED", None, None, None)
+        assert check.started is None and check.url == "" and check.started_at == ""
+
+    def test_reads_like_a_dict(self):
+        check = CheckRun("build", "SUCCESS", "https://github.com/user/api/runs/1", STARTED_AT, "2025-03-01T12:04:30Z")
+        as_dict = {
+            "name": "build",
+            "result": "SUCCESS",
+            "url": "https://github.com/user/api/runs/1",
+            "started_at": STARTED_AT,
+            "duration": "0:04:30",
+        }
+        assert check == as_dict
+        assert dict(check) == as_dict
+        assert check["result"] == "SUCCESS" and check.get("missing") is None
+        with pytest.raises(KeyError):
+            check["started"]
+        with pytest.raises(AttributeError):
+            check.extra = 1  # __slots__, no per-check __dict__
+
+    def test_started_time_of_dicts_and_check_runs(self):
+        assert started_time(CheckRun("build", "QUEUED", "", STARTED_AT)) == START
+        assert started_time({"name": "build", "started_at": STARTED_AT}) == START
+        assert started_time({"name": "build"}) is None
+
+
+class TestChangedChecks:
+    def test_only_new_and_changed_checks(self):
+        before = parse(gh_checks(6))
+        output = gh_checks(6)
+        output[0].update(state="FAILURE", completedAt="2025-03-01T12:06:00Z")
+        output.append(dict(output[1], name="lint"))
+
+        changed = changed_checks(before, parse(output))
+
+        assert [(check.name, check.result) for check in changed] == [("test (0)", "FAILURE"), ("lint", "SUCCESS")]
+        assert describe_change(changed[0]) == "test (0): FAILURE (0:06:00)"
+        assert changed_checks(before, parse(gh_checks(6))) == []
+
+    def test_rerun_is_a_change(self):
+        before = parse(gh_checks(1, running_every=2))
+        rerun = parse(gh_checks(1, running_every=2))
+        rerun[0] = CheckRun(rerun[0].name, "IN_PROGRESS", "", "2025-03-01T13:00:00Z")
+        assert changed_checks(before, rerun) == rerun
+
+
+class TestCheckBenchmark:
+    def test_500_check_poll_under_5ms(self):
+        """Parsing, diffing and scheduling one poll of a 500-check pull request"""
+        previous = parse(gh_checks(500))
+        output = gh_checks(500)
+        output[3].update(state="SUCCESS", completedAt="2025-03-01T12:09:00Z")
+        scheduler = PollScheduler(clock=lambda: START + 300)
+
+        # Best of several runs, so scheduler noise does not fail the build
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            checks = parse(output)
+            changed = changed_checks(previous, checks)
+            scheduler.next_delay([check for check in checks if check.pending])
+            best = min(best, time.perf_counter() - start)
+
+        assert len(changed) == 1
+        assert best < 0.005, f"{best * 1000:.2f}ms"
+
+    def test_unchanged_polls_record_nothing(self, tmp_path):
+        store = DurationStore(tmp_path / "durations.sqlite3")
+        previous = parse(gh_checks(500))
+        assert store.record("user/monorepo", previous) == 333
+
+        checks = parse(gh_checks(500))
+        assert store.record("user/monorepo", changed_checks(previous, checks)) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
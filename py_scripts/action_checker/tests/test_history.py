@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.action_checker import action_checker
+from py_scripts.action_checker.history import (
+    DurationStore,
+    compute_stats,
+    format_seconds,
+    parse_duration,
+    progress_report,
+)
+
+NOW = datetime(2025, 3, 1, 13, 0, tzinfo=timezone.utc).timestamp()
+REPO = "user/api"
+
+
+def finished(name, minutes, day):
+    return {
+        "name": name,
+        "result": "SUCCESS",
+        "url": "",
+        "started_at": f"2025-02-{day:02d}T12:00:00Z",
+        "duration": f"0:{minutes:02d}:00",
+    }
+
+
+def running(name, minutes_ago):
+    started = datetime.fromtimestamp(NOW - minutes_ago * 60, tz=timezone.utc)
+    return {
+        "name": name,
+        "result": "IN_PROGRESS",
+        "url": "",
+        "started_at": started.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "duration": "",
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DurationStore(tmp_path / "durations.sqlite3", clock=lambda: NOW)
+    # tests took 10 minutes on most runs, 20 on the slowest
+    store.record(REPO, [finished("tests", minutes, day) for day, minutes in enumerate([10, 9, 11, 10, 20], 1)])
+    yield store
+    store.close()
+
+
+class TestParsing:
+    @pytest.mark.parametrize(
+        "text,seconds", [("0:04:30", 270), ("12:00:00", 43200), ("1 day, 2:00:00", 93600), ("", None), ("x", None)]
+    )
+    def test_parse_duration(self, text, seconds):
+        assert parse_duration(text) == seconds
+
+    def test_format_seconds(self):
+        assert format_seconds(270) == "4:30"
+        assert format_seconds(3725) == "1:02:05"
+
+    def test_compute_stats(self):
+        stats = compute_stats([5.0, 1.0, 2.0, 3.0, 4.0])
+        assert (stats.count, stats.p50, stats.p90, stats.last) == (5, 3.0, 5.0, 5.0)
+
+
+class TestDurationStore:
+    def test_each_run_is_recorded_once(self, store):
+        assert store.record(REPO, [finished("tests", 10, 1), finished("tests", 12, 6)]) == 1
+        assert store.stats(REPO, "tests").count == 6
+
+    def test_unfinished_checks_are_not_recorded(self, store):
+        assert store.record(REPO, [running("tests", 3), dict(finished("lint", 1, 1), started_at="")]) == 0
+
+    def test_stats_need_a_few_runs_and_use_the_recent_window(self, tmp_path, store):
+        assert store.stats(REPO, "lint") is None
+        assert store.stats("other/repo", "tests") is None
+        assert store.expected(REPO, "tests") == 600
+
+        recent = DurationStore(tmp_path / "durations.sqlite3", window=2, min_runs=2)
+        assert recent.stats(REPO, "tests").p50 == 1200  # only days 4 and 5
+
+    def test_eta_of_running_checks(self, store):
+        assert store.eta(REPO, [running("tests", 4)]) == pytest.approx(360)
+        assert store.eta(REPO, [running("tests", 4), running("lint", 1)]) is None
+
+    def test_slow_checks_and_notes(self, store):
+        slow = store.slow_checks(REPO, [running("tests", 25), running("tests", 5)])
+        assert [(check["started_at"], seconds) for check, seconds, _ in slow] == [
+            (running("tests", 25)["started_at"], 1500)
+        ]
+
+        notes = store.notes(REPO, [finished("tests", 25, 7), dict(finished("lint", 30, 7))])
+        assert notes == {"tests": " (25:00, slower than p90 20:00)"}
+
+    def test_summary(self, store):
+        store.record(REPO, [finished("lint", 1, 1)])
+        assert [(repo, name, stats.count) for repo, name, stats in store.summary()] == [(REPO, "tests", 5)]
+
+    def test_unwritable_store_is_not_fatal(self, tmp_path):
+        (tmp_path / "file").write_text("")
+        store = DurationStore(tmp_path / "file" / "durations.sqlite3")
+        assert store.record(REPO, [finished("tests", 10, 1)]) == 0
+        assert store.expected(REPO, "tests") is None
+
+
+class TestProgressReport:
+    def test_eta_and_slow_warning_once(self, store):
+        warned = set()
+        checks = [running("tests", 25)]
+
+        lines = progress_report(store, REPO, "user/api#1", checks, warned)
+        assert lines == [
+            "user/api#1: 1 running, done in <1 min",
+            "user/api#1: tests is slower than usual (25:00 so far, p90 20:00)",
+        ]
+        assert progress_report(store, REPO, "user/api#1", checks, warned) == lines[:1]
+
+    def test_eta_in_minutes(self, store):
+        assert progress_report(store, REPO, "PR", [running("tests", 2)], set()) == ["PR: 1 running, done in ~8 min"]
+
+
+class TestMonitorChecksWithHistory:
+    def test_durations_are_recorded_and_slow_checks_noted(self, store):
+        polls = [[running("tests", 25)], [finished("tests", 26, 8)]]
+        with (
+            patch.object(action_checker, "current_repo", return_value=("user", "api")),
+            patch.object(action_checker, "pr_checker", side_effect=polls),
+            patch.object(action_checker.time, "sleep"),
+            patch.object(action_checker.subprocess, "call") as mock_notify,
+            patch("builtins.print") as mock_print,
+        ):
+            assert action_checker.monitor_checks(history=store) == 0
+
+        assert store.stats(REPO, "tests").count == 6
+        assert "tests: SUCCESS (26:00, slower than p90 20:00)" in mock_notify.call_args.args[0][1]
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        assert "slower than usual" in printed[0]
+
+    def test_show_durations(self, store, capsys):
+        with patch.object(action_checker.duration_history, "DurationStore", return_value=store):
+            assert action_checker.show_durations() == 0
+        assert "user/api" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.action_checker import action_checker
+from py_scripts.action_checker.monitor import (
+    Monitor,
+    MonitorClient,
+    MonitorError,
+    PullRequest,
+    WatchList,
+    checks_query,
+    fetch_checks,
+    to_checks,
+)
+from py_scripts.action_checker.history import DurationStore
+from py_scripts.action_checker.schedule import PollScheduler
+from py_scripts.http_cache.github import GitHubGraphQLError
+
+HEAD = "8b3c0f5e2d1a4c6b9e7f0a1b2c3d4e5f6a7b8c9d"
+
+# statusCheckRollup context nodes as GitHub returns them
+BUILD_DONE = {
+    "__typename": "CheckRun",
+    "name": "build",
+    "status": "COMPLETED",
+    "conclusion": "SUCCESS",
+    "startedAt": "2025-03-01T12:00:00Z",
+    "completedAt": "2025-03-01T12:04:30Z",
+    "detailsUrl": "https://github.com/user/api/actions/runs/1/job/1",
+}
+TESTS_RUNNING = {
+    "__typename": "CheckRun",
+    "name": "tests",
+    "status": "IN_PROGRESS",
+    "conclusion": None,
+    "startedAt": "2025-03-01T12:00:00Z",
+    "completedAt": None,
+    "detailsUrl": "https://github.com/user/api/actions/runs/1/job/2",
+}
+LEGACY_EXPECTED = {
+    "__typename": "StatusContext",
+    "context": "ci/legacy",
+    "state": "EXPECTED",
+    "targetUrl": None,
+    "createdAt": "2025-03-01T12:00:00Z",
+}
+
+
+def pr_node(contexts, state="OPEN"):
+    return {
+        "state": state,
+        "url": "https://github.com/user/api/pull/1",
+        "commits": {"nodes": [{"commit": {"statusCheckRollup": {"contexts": {"nodes": contexts}}}}]},
+    }
+
+
+class FakeGraphQL:
+    """Answers checks queries from a slug -> pullRequest node mapping
+
+    Like GitHubGraphQL.query, a pull request missing from nodes is reported
+    with a NOT_FOUND error next to the data of the others.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.queries = []
+        self.fail = False
+        # slug -> error type GitHub reports for its alias instead of NOT_FOUND
+        self.errors = {}
+
+    def __call__(self, query, variables):
+        self.queries.append((query, variables))
+        if self.fail:
+            raise OSError("network is unreachable")
+        data, errors = {}, []
+        i = 0
+        while f"owner{i}" in variables:
+            slug = f"{variables[f'owner{i}']}/{variables[f'name{i}']}#{variables[f'number{i}']}"
+            node = self.nodes.get(slug)
+            if slug in self.errors or node is None:
+                kind = self.errors.get(slug, "NOT_FOUND")
+                errors.append({"type": kind, "path": [f"pr{i}", "pullRequest"], "message": f"{kind}: {slug}"})
+            data[f"pr{i}"] = {"pullRequest": node if slug not in self.errors else None}
+            i += 1
+        if errors:
+            raise GitHubGraphQLError("; ".join(error["message"] for error in errors), data=data, errors=errors)
+        return data
+
+
+@pytest.fixture
+def short_tmp():
+    # Unix socket paths are limited to about 100 bytes, too short for pytest's tmp_path
+    path = tempfile.mkdtemp(prefix="ac-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def make_monitor(tmp, nodes, prs=()):
+    watchlist = WatchList(Path(tmp) / "watched.json")
+    for pr in prs:
+        watchlist.add(PullRequest.parse(pr))
+    notified = []
+    query = FakeGraphQL(nodes)
+    monitor = Monitor(
+        watchlist,
+        query=query,
+        notify=lambda pr, checks: notified.append((pr.slug, [c["result"] for c in checks])),
+        scheduler=PollScheduler(min_interval=0.01, max_interval=0.05),
+        socket_path=os.path.join(tmp, "monitor.sock"),
+    )
+    return monitor, query, notified
+
+
+class TestPullRequest:
+    def test_parse_url_and_slug(self):
+        expected = PullRequest("user", "api", 12)
+        assert PullRequest.parse("https://github.com/user/api/pull/12") == expected
+        assert PullRequest.parse("https://github.com/user/api/pull/12/files") == expected
+        assert PullRequest.parse("user/api#12") == expected
+        assert expected.slug == "user/api#12"
+
+    @pytest.mark.parametrize("text", ["", "user/api", "https://github.com/user/api/issues/3"])
+    def test_parse_rejects_other_text(self, text):
+        assert PullRequest.parse(text) is None
+
+
+class TestFetchChecks:
+    def test_to_checks(self):
+        assert to_checks([BUILD_DONE, TESTS_RUNNING, LEGACY_EXPECTED]) == [
+            {
+                "name": "build",
+                "result": "SUCCESS",
+                "url": BUILD_DONE["detailsUrl"],
+                "started_at": "2025-03-01T12:00:00Z",
+                "duration": "0:04:30",
+            },
+            {
+                "name": "tests",
+                "result": "IN_PROGRESS",
+                "url": TESTS_RUNNING["detailsUrl"],
+                "started_at": "2025-03-01T12:00:00Z",
+                "duration": "",
+            },
+            {"name": "ci/legacy", "result": "PENDING", "url": "", "started_at": "2025-03-01T12:00:00Z", "duration": ""},
+        ]
+
+    def test_pull_requests_of_several_repos_in_one_query(self):
+        query = FakeGraphQL({"user/api#1": pr_node([BUILD_DONE]), "other/web#7": pr_node([TESTS_RUNNING])})
+        prs = [PullRequest.parse(slug) for slug in ("user/api#1", "other/web#7", "user/api#404")]
+
+        results = fetch_checks(prs, query)
+
+        assert len(query.queries) == 1
+        assert results[prs[0]]["checks"][0]["result"] == "SUCCESS"
+        assert results[prs[1]]["checks"][0]["result"] == "IN_PROGRESS"
+        assert results[prs[2]] is None
+
+    def test_checks_past_the_first_page(self, short_tmp):
+        # A monorepo pull request with 250 checks, one of them on the last page still running
+        contexts = [dict(BUILD_DONE, name=f"test ({n})") for n in range(250)]
+        contexts[240] = dict(TESTS_RUNNING, name="test (240)")
+        head = [HEAD]
+
+        def query(text, variables):
+            after = int(variables.get("cursor") or 0)
+            connection = {
+                "pageInfo": {"hasNextPage": after + 100 < len(contexts), "endCursor": str(after + 100)},
+                "nodes": contexts[after : after + 100],
+            }
+            commit = {"oid": head[0], "statusCheckRollup": {"contexts": connection}}
+            node = dict(pr_node([]), commits={"nodes": [{"commit": commit}]})
+            return {"repository": {"pullRequest": node}} if "cursor" in variables else {"pr0": {"pullRequest": node}}
+
+        pr = PullRequest("user", "api", 1)
+        checks = fetch_checks([pr], query)[pr]["checks"]
+        assert len(checks) == 250
+        assert checks[240]["result"] == "IN_PROGRESS"
+
+        monitor, _, notified = make_monitor(short_tmp, {}, ["user/api#1"])
+        monitor.query = query
+        with patch("builtins.print"):
+            monitor.poll()
+        assert notified == []
+
+        # Pushed to between the pages: nothing is judged from the mix, the next poll asks again
+        pages = []
+
+        def pushed(text, variables):
+            pages.append(variables.get("cursor"))
+            head[0] = HEAD if len(pages) == 1 else "f" * 40
+            return query(text, variables)
+
+        assert fetch_checks([pr], pushed) == {}
+
+    def test_batches(self):
+        query = FakeGraphQL({})
+        prs = [PullRequest("user", "api", n) for n in range(5)]
+        fetch_checks(prs, query, batch_size=2)
+        assert len(query.queries) == 3
+
+    def test_query_uses_variables_not_inlined_names(self):
+        query = checks_query([PullRequest("user", 'api") { evil }', 1)])
+        assert "evil" not in query
+        assert "pr0: repository(owner: $owner0, name: $name0)" in query
+
+
+class TestWatchList:
+    def test_survives_a_restart(self, tmp_path):
+        watchlist = WatchList(tmp_path / "state" / "watched.json")
+        assert watchlist.add(PullRequest("user", "api", 1))
+        assert not watchlist.add(PullRequest("user", "api", 1))
+        watchlist.add(PullRequest("other", "web", 2))
+        watchlist.remove(PullRequest("user", "api", 1))
+
+        assert list(WatchList(tmp_path / "state" / "watched.json")) == [PullRequest("other", "web", 2)]
+
+    def test_corrupt_file_is_an_empty_list(self, tmp_path):
+        (tmp_path / "watched.json").write_text("{not json")
+        assert len(WatchList(tmp_path / "watched.json")) == 0
+
+
+class TestMonitor:
+    def test_each_pull_request_is_notified_as_it_finishes(self, short_tmp):
+        nodes = {"user/api#1": pr_node([BUILD_DONE]), "other/web#7": pr_node([BUILD_DONE, TESTS_RUNNING])}
+        monitor, query, notified = make_monitor(short_tmp, nodes, ["user/api#1", "other/web#7"])
+
+        monitor.poll()
+        assert notified == [("user/api#1", ["SUCCESS"])]
+        assert [pr.slug for pr in monitor.watchlist] == ["other/web#7"]
+
+        nodes["other/web#7"] = pr_node([BUILD_DONE, dict(TESTS_RUNNING, status="COMPLETED", conclusion="FAILURE")])
+        monitor.poll()
+        assert notified[1] == ("other/web#7", ["SUCCESS", "FAILURE"])
+        assert len(monitor.watchlist) == 0
+        assert len(query.queries) == 2
+
+    def test_closed_and_missing_pull_requests_are_dropped_silently(self, short_tmp):
+        nodes = {"user/api#1": pr_node([TESTS_RUNNING], state="MERGED")}
+        monitor, query, notified = make_monitor(short_tmp, nodes, ["user/api#1", "user/api#2"])
+
+        monitor.poll()
+
+        assert notified == []
+        assert len(monitor.watchlist) == 0
+
+    def test_deleted_pull_request_does_not_block_the_others(self, short_tmp):
+        nodes = {"user/api#1": pr_node([BUILD_DONE])}
+        monitor, query, notified = make_monitor(short_tmp, nodes, ["user/gone#3", "user/api#1"])
+
+        with patch("builtins.print"):
+            monitor.poll()
+
+        assert monitor.failures == 0
+        assert notified == [("user/api#1", ["SUCCESS"])]
+        assert len(monitor.watchlist) == 0
+
+    def test_other_alias_errors_skip_only_that_pull_request(self, short_tmp):
+        nodes = {"user/api#1": pr_node([TESTS_RUNNING]), "other/web#7": pr_node([BUILD_DONE])}
+        monitor, query, notified = make_monitor(short_tmp, nodes, ["user/api#1", "other/web#7"])
+        query.errors["user/api#1"] = "SERVICE_UNAVAILABLE"
+
+        monitor.poll()
+
+        assert notified == [("other/web#7", ["SUCCESS"])]
+        assert [pr.slug for pr in monitor.watchlist] == ["user/api#1"]
+
+    def test_errors_about_the_whole_query_fail_the_poll(self):
+        def query(text, variables):
+            raise GitHubGraphQLError("API rate limit exceeded", data=None, errors=[{"type": "RATE_LIMITED"}])
+
+        with pytest.raises(GitHubGraphQLError):
+            fetch_checks([PullRequest("user", "api", 1)], query)
+
+    def test_no_checks_yet_is_not_done(self, short_tmp):
+        monitor, query, notified = make_monitor(short_tmp, {"user/api#1": pr_node([])}, ["user/api#1"])
+        monitor.poll()
+        assert notified == []
+        assert len(monitor.watchlist) == 1
+
+    def test_failed_polls_back_off(self, short_tmp):
+        monitor, query, notified = make_monitor(short_tmp, {}, ["user/api#1"])
+        query.fail = True
+
+        delays = [monitor.poll() for _ in range(4)]
+
+        assert monitor.failures == 4
+        assert delays[3] > delays[0]
+        assert len(monitor.watchlist) == 1
+
+    def test_registered_pull_request_is_polled_at_once(self, short_tmp):
+        nodes = {"user/api#1": pr_node([TESTS_RUNNING])}
+        monitor, query, notified = make_monitor(short_tmp, nodes, ["user/api#1"])
+        monitor.scheduler = PollScheduler(min_interval=30, max_interval=30)
+        thread = threading.Thread(target=monitor.run, daemon=True)
+        monitor.bind()
+        thread.start()
+        client = MonitorClient(monitor.socket_path, timeout=2)
+
+        nodes["other/web#7"] = pr_node([BUILD_DONE])
+        assert client.watch(PullRequest("other", "web", 7))
+        assert not client.watch(PullRequest("user", "api", 1))
+
+        deadline = time.monotonic() + 2
+        while not notified and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert notified == [("other/web#7", ["SUCCESS"])]
+        assert client.watched() == ["user/api#1"]
+
+        nodes["user/api#1"] = pr_node([BUILD_DONE])
+        client.watch(PullRequest("user", "api", 1))  # wakes it up; the PR was already watched
+        thread.join(2)
+        assert not thread.is_alive()
+        assert not client.ping()
+
+    def test_history_records_finished_checks_and_predicts_the_next_poll(self, short_tmp):
+        history = DurationStore(Path(short_tmp) / "durations.sqlite3", min_runs=1)
+        history.record(
+            "user/api", [dict(to_checks([BUILD_DONE])[0], started_at=f"2025-02-0{day}T12:00:00Z") for day in (1, 2)]
+        )
+        started = datetime.fromtimestamp(time.time() - 30, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        nodes = {"user/api#1": pr_node([dict(TESTS_RUNNING, name="build", startedAt=started)])}
+        watchlist = WatchList(Path(short_tmp) / "watched.json")
+        watchlist.add(PullRequest("user", "api", 1))
+        monitor = Monitor(watchlist, query=FakeGraphQL(nodes), notify=lambda pr, checks: None, history=history)
+
+        with patch("builtins.print") as mock_print:
+            delay = monitor.poll()
+
+        # build usually takes 4:30 and has run for 30 seconds: half the remaining 4 minutes, capped at a minute
+        assert delay == pytest.approx(60)
+        assert "user/api#1: 1 running, done in ~4 min" in mock_print.call_args.args[0]
+
+        nodes["user/api#1"] = pr_node([BUILD_DONE])
+        monitor.poll()
+        assert history.stats("user/api", "build").count == 3
+
+    def test_bad_requests(self, short_tmp):
+        monitor, query, notified = make_monitor(short_tmp, {})
+        assert monitor.handle({"op": "watch", "pr": "nonsense"})["ok"] is False
+        assert monitor.handle({"op": "nope"})["ok"] is False
+        monitor.stopping = True
+        assert monitor.handle({"op": "watch", "pr": "user/api#1"})["ok"] is False
+
+    def test_client_without_monitor(self, short_tmp):
+        with pytest.raises(MonitorError):
+            MonitorClient(os.path.join(short_tmp, "none.sock")).watch(PullRequest("user", "api", 1))
+
+
+class TestRegisterFromCLI:
+    PR = PullRequest("user", "api", 1)
+
+    def test_running_monitor_gets_the_pull_request(self):
+        with (
+            patch.object(action_checker, "current_pull_request", return_value=self.PR),
+            patch.object(action_checker.monitor.MonitorClient, "watch", return_value=True) as mock_watch,
+            patch.object(action_checker.subprocess, "run") as mock_run,
+        ):
+            action_checker.setup_systemd_service()
+
+        mock_watch.assert_called_once_with(self.PR)
+        mock_run.assert_not_called()
+
+    def test_monitor_is_started_when_none_answers(self, tmp_path):
+        with (
+            patch.dict(os.environ, {"XDG_STATE_HOME": str(tmp_path), "ACTION_CHECKER_SOCKET": str(tmp_path / "s")}),
+            patch.object(action_checker, "current_pull_request", return_value=self.PR),
+            patch.object(action_checker, "install_monitor_service"),
+            patch.object(action_checker.subprocess, "run") as mock_run,
+        ):
+            action_checker.setup_systemd_service()
+            assert list(WatchList()) == [self.PR]
+
+        assert mock_run.call_args.args[0] == [
+            "systemctl",
+            "--user",
+            "start",
+            "--no-block",
+            action_checker.MONITOR_SERVICE,
+        ]
+
+    def test_no_pull_request(self):
+        with (
+            patch.object(action_checker, "current_pull_request", return_value=None),
+            patch.object(action_checker.monitor.MonitorClient, "watch") as mock_watch,
+        ):
+            action_checker.setup_systemd_service()
+        mock_watch.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.action_checker import action_checker
+from py_scripts.action_checker.checks import parse_time
+from py_scripts.action_checker.schedule import (
+    MAX_INTERVAL,
+    MIN_INTERVAL,
+    OPEN_ENDED_INTERVAL,
+    PollScheduler,
+    backoff_delay,
+)
+
+START = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc).timestamp()
+STARTED_AT = "2025-03-01T12:00:00Z"
+
+
+def check(name="tests", result="IN_PROGRESS", started_at=STARTED_AT):
+    return {
+        "name": name,
+        "result": result,
+        "url": "https://github.com/user/repo/runs/1",
+        "duration": "",
+        "started_at": started_at,
+    }
+
+
+class FakeCI:
+    """A pull request whose only check finishes finish_after seconds after START"""
+
+    def __init__(self, finish_after):
+        self.now = START
+        self.finish_after = finish_after
+        self.polls = 0
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def pr_checker(self):
+        self.polls += 1
+        done = self.now - START >= self.finish_after
+        return [check(result="SUCCESS" if done else "IN_PROGRESS")]
+
+    def monitor(self, scheduler):
+        with (
+            patch.object(action_checker, "pr_checker", side_effect=self.pr_checker),
+            patch.object(action_checker.time, "sleep", side_effect=self.sleep),
+            patch.object(action_checker.subprocess, "call") as mock_notify,
+        ):
+            assert action_checker.monitor_checks(scheduler) == 0
+        mock_notify.assert_called_once()
+        # Seconds between the check finishing and the notification
+        return self.now - START - self.finish_after
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Keep the duration history of the tests out of the real state directory"""
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+
+
+class TestParseTime:
+    def test_github_timestamps(self):
+        assert parse_time(STARTED_AT) == START
+
+    @pytest.mark.parametrize("value", ["", None, "0001-01-01T00:00:00Z", "soon"])
+    def test_not_started(self, value):
+        assert parse_time(value) is None
+
+
+class TestBackoffDelay:
+    def test_doubles_up_to_the_cap(self):
+        delays = [backoff_delay(attempt, base=1, cap=30, jitter=lambda: 1.0) for attempt in range(7)]
+        assert delays == [1, 2, 4, 8, 16, 30, 30]
+
+    def test_jitter_stays_within_half_the_delay(self):
+        assert backoff_delay(3, base=1, jitter=lambda: 0.0) == 4
+
+
+class TestPollScheduler:
+    def scheduler(self, now, expected=None):
+        return PollScheduler(expected_duration=lambda repo, name: expected, clock=lambda: START + now)
+
+    def test_known_duration_halves_the_wait_towards_the_end(self):
+        assert self.scheduler(0, expected=600).next_delay([check()]) == MAX_INTERVAL
+        assert self.scheduler(560, expected=600).next_delay([check()]) == 20
+        assert self.scheduler(598, expected=600).next_delay([check()]) == MIN_INTERVAL
+
+    def test_overdue_check_backs_off_again(self):
+        assert self.scheduler(601, expected=600).next_delay([check()]) == MIN_INTERVAL
+        assert self.scheduler(660, expected=600).next_delay([check()]) == 15
+        assert self.scheduler(1200, expected=600).next_delay([check()]) == OPEN_ENDED_INTERVAL
+
+    def test_unknown_duration_waits_longer_the_longer_it_runs(self):
+        assert self.scheduler(4).next_delay([check()]) == MIN_INTERVAL
+        assert self.scheduler(60).next_delay([check()]) == 15
+        assert self.scheduler(1800).next_delay([check()]) == OPEN_ENDED_INTERVAL
+
+    def test_queued_checks_and_the_soonest_check_wins(self):
+        queued = check(name="deploy", result="QUEUED", started_at="0001-01-01T00:00:00Z")
+        assert self.scheduler(400).next_delay([queued]) == 10
+        assert self.scheduler(400).next_delay([queued, check()]) == 10
+
+
+class TestMonitorPolling:
+    def test_long_check_with_known_duration_takes_a_few_polls(self):
+        ci = FakeCI(finish_after=20 * 60)
+        lateness = ci.monitor(PollScheduler(expected_duration=lambda repo, name: 20 * 60, clock=lambda: ci.now))
+
+        # A 3 second interval needed 400 polls for this
+        assert ci.polls <= 30
+        assert lateness <= MIN_INTERVAL
+
+    def test_long_check_without_history_polls_several_times_less(self):
+        ci = FakeCI(finish_after=30 * 60)
+        lateness = ci.monitor(PollScheduler(clock=lambda: ci.now))
+
+        # A 3 second interval needed 600 polls for this
+        assert ci.polls <= 120
+        assert lateness <= OPEN_ENDED_INTERVAL
+
+    def test_check_finishing_early_is_noticed_within_the_current_wait(self):
+        ci = FakeCI(finish_after=5 * 60)
+        lateness = ci.monitor(PollScheduler(expected_duration=lambda repo, name: 20 * 60, clock=lambda: ci.now))
+
+        assert lateness <= MAX_INTERVAL
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.action_checker.monitor import (
+    EVENT_FALLBACK_INTERVAL,
+    Monitor,
+    PullRequest,
+    WatchList,
+    merge_check,
+)
+from py_scripts.action_checker.schedule import PollScheduler
+from py_scripts.action_checker.webhook import CheckEvent, WebhookListener, default_webhook_address, parse_event
+
+HEAD = "8b3c0f5e2d1a4c6b9e7f0a1b2c3d4e5f6a7b8c9d"
+
+# Deliveries as GitHub sends them, trimmed to the fields that matter
+CHECK_RUN_COMPLETED = {
+    "action": "completed",
+    "check_run": {
+        "id": 4,
+        "name": "tests",
+        "head_sha": HEAD,
+        "status": "completed",
+        "conclusion": "failure",
+        "started_at": "2025-03-01T12:00:00Z",
+        "completed_at": "2025-03-01T12:06:10Z",
+        "html_url": "https://github.com/user/api/runs/4",
+        "details_url": "https://github.com/user/api/actions/runs/1/job/4",
+        "pull_requests": [
+            {"number": 1, "head": {"ref": "feature", "sha": HEAD}, "base": {"ref": "main", "sha": "0" * 40}}
+        ],
+    },
+    "repository": {"full_name": "user/api", "name": "api", "owner": {"login": "user"}},
+}
+CHECK_RUN_STARTED = {
+    **CHECK_RUN_COMPLETED,
+    "action": "created",
+    "check_run": {
+        **CHECK_RUN_COMPLETED["check_run"],
+        "status": "in_progress",
+        "conclusion": None,
+        "completed_at": None,
+    },
+}
+CHECK_SUITE_COMPLETED = {
+    "action": "completed",
+    "check_suite": {
+        "id": 9,
+        "head_sha": HEAD,
+        "status": "completed",
+        "conclusion": "success",
+        "pull_requests": [{"number": 1}],
+    },
+    "repository": {"full_name": "user/api"},
+}
+STATUS_SUCCESS = {
+    "sha": HEAD,
+    "context": "ci/legacy",
+    "state": "success",
+    "target_url": "https://ci.example.com/builds/7",
+    "created_at": "2025-03-01T12:01:00Z",
+    "repository": {"full_name": "user/api"},
+}
+
+BUILD_DONE = {
+    "__typename": "CheckRun",
+    "name": "build",
+    "status": "COMPLETED",
+    "conclusion": "SUCCESS",
+    "startedAt": "2025-03-01T12:00:00Z",
+    "completedAt": "2025-03-01T12:04:30Z",
+    "detailsUrl": "https://github.com/user/api/actions/runs/1/job/1",
+}
+TESTS_RUNNING = {
+    "__typename": "CheckRun",
+    "name": "tests",
+    "status": "IN_PROGRESS",
+    "conclusion": None,
+    "startedAt": "2025-03-01T12:00:00Z",
+    "completedAt": None,
+    "detailsUrl": "https://github.com/user/api/actions/runs/1/job/4",
+}
+
+
+def pr_node(contexts, oid=HEAD):
+    return {
+        "state": "OPEN",
+        "url": "https://github.com/user/api/pull/1",
+        "commits": {"nodes": [{"commit": {"oid": oid, "statusCheckRollup": {"contexts": {"nodes": contexts}}}}]},
+    }
+
+
+class FakeGraphQL:
+    """Answers checks queries for user/api#1 with node"""
+
+    def __init__(self, node):
+        self.node = node
+        self.queries = 0
+
+    def __call__(self, query, variables):
+        self.queries += 1
+        return {"pr0": {"pullRequest": self.node}}
+
+
+def post(listener, event, payload, secret=None):
+    body = json.dumps(payload).encode()
+    headers = {"X-GitHub-Event": event, "Content-Type": "application/json"}
+    if secret is not None:
+        headers["X-Hub-Signature-256"] = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    request = urllib.request.Request(f"http://127.0.0.1:{listener.port}/", data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=2) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.fixture
+def short_tmp():
+    # Unix socket paths are limited to about 100 bytes, too short for pytest's tmp_path
+    path = tempfile.mkdtemp(prefix="ac-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def listener():
+    events = []
+    listener = WebhookListener(events.append, secret="")
+    listener.events = events
+    listener.start()
+    yield listener
+    listener.close()
+
+
+def make_monitor(tmp, node, interval=30):
+    watchlist = WatchList(Path(tmp) / "watched.json")
+    watchlist.add(PullRequest("user", "api", 1))
+    notified = []
+    query = FakeGraphQL(node)
+    monitor = Monitor(
+        watchlist,
+        query=query,
+        notify=lambda pr, checks: notified.append((pr.slug, [c["result"] for c in checks])),
+        scheduler=PollScheduler(min_interval=interval, max_interval=interval),
+        socket_path=os.path.join(tmp, "monitor.sock"),
+    )
+    return monitor, query, notified
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestParseEvent:
+    def test_check_run(self):
+        event = parse_event("check_run", CHECK_RUN_COMPLETED)
+        assert event == CheckEvent(
+            "user/api",
+            HEAD,
+            (1,),
+            {
+                "name": "tests",
+                "result": "FAILURE",
+                "url": "https://github.com/user/api/actions/runs/1/job/4",
+                "started_at": "2025-03-01T12:00:00Z",
+                "duration": "0:06:10",
+            },
+        )
+        assert parse_event("check_run", CHECK_RUN_STARTED).check["result"] == "IN_PROGRESS"
+
+    def test_check_suite_only_when_completed(self):
+        assert parse_event("check_suite", CHECK_SUITE_COMPLETED) == CheckEvent("user/api", HEAD, (1,))
+        assert parse_event("check_suite", dict(CHECK_SUITE_COMPLETED, action="requested")) is None
+
+    def test_status(self):
+        event = parse_event("status", STATUS_SUCCESS)
+        assert event.numbers == ()
+        assert event.check["name"] == "ci/legacy"
+        assert event.check["result"] == "SUCCESS"
+
+    def test_other_events_are_ignored(self):
+        assert parse_event("push", {"repository": {"full_name": "user/api"}}) is None
+        assert parse_event("check_run", {}) is None
+
+    @pytest.mark.parametrize(
+        "value, address",
+        [("8765", ("127.0.0.1", 8765)), ("0.0.0.0:9000", ("0.0.0.0", 9000)), ("", None), ("nope", None)],
+    )
+    def test_address_from_environment(self, value, address):
+        with patch.dict(os.environ, {"ACTION_CHECKER_WEBHOOK": value}):
+            assert default_webhook_address() == address
+
+
+class TestListener:
+    def test_accepts_check_events(self, listener):
+        assert post(listener, "check_run", CHECK_RUN_COMPLETED) == 202
+        assert post(listener, "ping", {"zen": "Keep it logically awesome."}) == 200
+        assert post(listener, "push", {"repository": {"full_name": "user/api"}}) == 204
+        assert [event.check["result"] for event in listener.events] == ["FAILURE"]
+
+    def test_rejects_malformed_payloads(self, listener):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{listener.port}/", data=b"{not json", headers={"X-GitHub-Event": "check_run"}
+        )
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request, timeout=2)
+        assert error.value.code == 400
+        assert listener.events == []
+
+    def test_secret_requires_a_valid_signature(self, listener):
+        listener.secret = "s3cret"
+        assert post(listener, "check_run", CHECK_RUN_COMPLETED) == 401
+        assert post(listener, "check_run", CHECK_RUN_COMPLETED, secret="wrong") == 401
+        assert post(listener, "check_run", CHECK_RUN_COMPLETED, secret="s3cret") == 202
+        assert len(listener.events) == 1
+
+
+class TestMonitorEvents:
+    def test_finished_check_run_notifies_without_polling(self, short_tmp):
+        monitor, query, notified = make_monitor(short_tmp, pr_node([BUILD_DONE, TESTS_RUNNING]))
+        listener = WebhookListener(monitor.push_event, secret="")
+        listener.start()
+        thread = threading.Thread(target=monitor.run, daemon=True)
+        try:
+            thread.start()
+            assert wait_for(lambda: query.queries == 1)
+
+            # The next poll is 30 seconds away, the event is applied at once
+            assert post(listener, "check_run", CHECK_RUN_STARTED) == 202
+            assert post(listener, "check_run", CHECK_RUN_COMPLETED) == 202
+            assert wait_for(lambda: notified)
+            assert notified == [("user/api#1", ["SUCCESS", "FAILURE"])]
+            assert query.queries == 1
+            thread.join(2)
+            assert not thread.is_alive()
+        finally:
+            listener.close()
+            monitor.close()
+
+    def test_completed_suite_and_new_push_are_polled(self, short_tmp):
+        monitor, query, notified = make_monitor(short_tmp, pr_node([TESTS_RUNNING]))
+        monitor.poll()
+
+        monitor.push_event(parse_event("check_suite", CHECK_SUITE_COMPLETED))
+        monitor.apply_events()
+        assert monitor._poll_now and notified == []
+
+        monitor._poll_now = False
+        pushed = dict(CHECK_RUN_COMPLETED, check_run=dict(CHECK_RUN_COMPLETED["check_run"], head_sha="f" * 40))
+        monitor.push_event(parse_event("check_run", pushed))
+        monitor.apply_events()
+        assert monitor._poll_now and notified == []
+
+    def test_status_of_a_fork_is_matched_by_commit(self, short_tmp):
+        legacy = {
+            "__typename": "StatusContext",
+            "context": "ci/legacy",
+            "state": "PENDING",
+            "targetUrl": None,
+            "createdAt": "2025-03-01T12:00:00Z",
+        }
+        monitor, query, notified = make_monitor(short_tmp, pr_node([BUILD_DONE, legacy]))
+        monitor.poll()
+
+        monitor.push_event(parse_event("status", dict(STATUS_SUCCESS, sha="f" * 40)))
+        monitor.apply_events()
+        assert notified == []
+
+        monitor.push_event(parse_event("status", STATUS_SUCCESS))
+        monitor.apply_events()
+        assert notified == [("user/api#1", ["SUCCESS", "SUCCESS"])]
+
+    def test_polls_are_a_fallback_while_events_arrive(self, short_tmp):
+        monitor, query, notified = make_monitor(short_tmp, pr_node([BUILD_DONE, TESTS_RUNNING]), interval=5)
+        assert monitor.poll() == 5
+
+        monitor.push_event(parse_event("check_run", CHECK_RUN_STARTED))
+        monitor.apply_events()
+        assert monitor.poll() == EVENT_FALLBACK_INTERVAL
+
+
+class TestMergeCheck:
+    def test_replaces_by_name_and_ignores_late_events(self):
+        running = {"name": "tests", "result": "IN_PROGRESS", "started_at": "2025-03-01T12:00:00Z"}
+        done = dict(running, result="SUCCESS")
+        build = {"name": "build", "result": "SUCCESS", "started_at": "2025-03-01T12:00:00Z"}
+
+        assert merge_check([build, running], done) == [build, done]
+        assert merge_check([build], running) == [build, running]
+        assert merge_check([build, done], running) == [build, done]
+        rerun = dict(running, started_at="2025-03-01T13:00:00Z")
+        assert merge_check([build, done], rerun) == [build, rerun]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,167 @@
+"""GitHub check events pushed to the monitor over a local HTTP listener.
+
+With ``ACTION_CHECKER_WEBHOOK`` set to a port (or ``host:port``), the monitor
+also listens for ``check_run``, ``check_suite`` and ``status`` webhook
+deliveries, e.g. relayed by ``gh webhook forward``. A finished check run is
+applied to the checks of its pull request as the monitor last saw them, so
+the notification goes out as soon as the event arrives rather than on the
+next poll. Polling goes on as the fallback for lost or missing events, only
+far less often while a repository's events keep coming.
+
+With ``ACTION_CHECKER_WEBHOOK_SECRET`` set, deliveries must be signed with it
+(``X-Hub-Signature-256``), as GitHub and ``gh webhook forward --secret`` do.
+The monitor service does not listen at all without a secret.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from py_scripts.action_checker.checks import CheckRun
+
+DEFAULT_HOST = "127.0.0.1"
+# GitHub caps webhook payloads at 25 MB
+MAX_BODY = 25 * 1024 * 1024
+
+
+def default_webhook_address() -> Optional[Tuple[str, int]]:
+    """(host, port) from $ACTION_CHECKER_WEBHOOK, "8765" or "host:8765"; None when unset or invalid"""
+    value = os.environ.get("ACTION_CHECKER_WEBHOOK", "").strip()
+    host, _, port = value.rpartition(":")
+    if not port.isdigit():
+        return None
+    return host or DEFAULT_HOST, int(port)
+
+
+@dataclass(frozen=True)
+class CheckEvent:
+    """What a webhook delivery says about the checks of a commit
+
+    check is the check of a check_run or status event; None for a check
+    suite that completed, whose checks have to be asked for. numbers are the
+    pull requests GitHub attached to the event, empty for statuses and for
+    pull requests from forks.
+    """
+
+    repo: str
+    head_sha: str
+    numbers: Tuple[int, ...] = ()
+    check: Optional[CheckRun] = None
+
+
+def parse_event(name: str, payload: Dict[str, Any]) -> Optional[CheckEvent]:
+    """CheckEvent of a delivery, None for events and actions that do not change checks"""
+    repo = (payload.get("repository") or {}).get("full_name") or ""
+    if not repo:
+        return None
+    if name == "check_run":
+        run = payload.get("check_run") or {}
+        node = {
+            "__typename": "CheckRun",
+            "name": run.get("name") or "",
+            "status": (run.get("status") or "").upper(),
+            "conclusion": (run.get("conclusion") or "").upper() or None,
+            "startedAt": run.get("started_at"),
+            "completedAt": run.get("completed_at"),
+            "detailsUrl": run.get("details_url") or run.get("html_url"),
+        }
+        prs = run.get("pull_requests") or []
+        return CheckEvent(repo, run.get("head_sha") or "", tuple(pr["number"] for pr in prs), CheckRun.from_node(node))
+    if name == "check_suite":
+        suite = payload.get("check_suite") or {}
+        if payload.get("action") != "completed":
+            return None  # its check runs send their own events
+        prs = suite.get("pull_requests") or []
+        return CheckEvent(repo, suite.get("head_sha") or "", tuple(pr["number"] for pr in prs))
+    if name == "status":
+        node = {
+            "__typename": "StatusContext",
+            "context": payload.get("context") or "",
+            "state": (payload.get("state") or "").upper(),
+            "targetUrl": payload.get("target_url"),
+            "createdAt": payload.get("created_at"),
+        }
+        return CheckEvent(repo, payload.get("sha") or "", check=CheckRun.from_node(node))
+    return None
+
+
+def valid_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Whether signature is the X-Hub-Signature-256 of body with secret"""
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return signature is not None and hmac.compare_digest(expected, signature)
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        listener: "WebhookListener" = self.server.listener
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY:
+            self._reply(411 if length < 0 else 413)
+            return
+        body = self.rfile.read(length)
+        if listener.secret and not valid_signature(listener.secret, body, self.headers.get("X-Hub-Signature-256")):
+            self._reply(401)
+            return
+        name = self.headers.get("X-GitHub-Event", "")
+        if name == "ping":
+            self._reply(200)
+            return
+        try:
+            payload = json.loads(body)
+            event = parse_event(name, payload) if isinstance(payload, dict) else None
+        except (ValueError, KeyError, TypeError):
+            self._reply(400)
+            return
+        if event is None:
+            self._reply(204)
+            return
+        listener.on_event(event)
+        self._reply(202)
+
+    def _reply(self, code: int) -> None:
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # the monitor prints what events change
+
+
+class WebhookListener:
+    """HTTP server handing each check event it receives to on_event, on its own thread"""
+
+    def __init__(
+        self,
+        on_event: Callable[[CheckEvent], None],
+        address: Tuple[str, int] = (DEFAULT_HOST, 0),
+        secret: Optional[str] = None,
+    ):
+        self.on_event = on_event
+        self.address = address
+        self.secret = secret if secret is not None else os.environ.get("ACTION_CHECKER_WEBHOOK_SECRET") or None
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1] if self.server is not None else self.address[1]
+
+    def start(self) -> None:
+        server = ThreadingHTTPServer(self.address, _WebhookHandler)
+        server.daemon_threads = True
+        server.listener = self
+        self.server = server
+        threading.Thread(target=server.serve_forever, args=(0.2,), name="monitor-webhook", daemon=True).start()
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
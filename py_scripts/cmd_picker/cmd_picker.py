@@ -6,16 +6,42 @@
 
 import subprocess
 import sys
+import threading
+import time
 import os
 import shutil
-import termios
-import tty
 import json
-import webbrowser
-import argparse
-from typing import List, Dict, Any
+from collections import deque
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, ContextManager, Iterator, List, Dict, Any, Optional, Sequence, Tuple
 from abc import ABC, abstractmethod
 
+from py_scripts.startup.lazy import lazy_import
+from py_scripts.cmd_picker.keys import KeyReader
+from py_scripts.cmd_picker.log_stream import LogStream
+from py_scripts.cmd_picker.preview import PreviewCache, PreviewEngine
+from py_scripts.cmd_picker.registry import ToolLoadError, ToolRegistry
+from py_scripts.cmd_picker.render import ScreenRenderer
+from py_scripts.cmd_picker.runner import run_command
+from py_scripts.cmd_picker.search import SearchIndex
+from py_scripts.cmd_picker.snapshot import SnapshotStore
+from py_scripts.cmd_picker.tmux_control import TmuxControlClient
+from py_scripts.cmd_picker.tmux_state import TmuxState, run_tmux
+
+if TYPE_CHECKING:
+    from py_scripts.cmd_picker.daemon import DaemonClient
+    from py_scripts.cmd_picker.docker_api import DockerAPI
+    from py_scripts.cmd_picker.github_graphql import PullRequestStore
+    from py_scripts.cmd_picker.profiler import FrameProfiler
+
+# Backends of the docker, gh and systemd tools, the daemon client and the profiler, loaded when first needed
+docker_api = lazy_import("py_scripts.cmd_picker.docker_api")
+github_graphql = lazy_import("py_scripts.cmd_picker.github_graphql")
+github = lazy_import("py_scripts.http_cache.github")
+picker_daemon = lazy_import("py_scripts.cmd_picker.daemon")
+systemd_units = lazy_import("py_scripts.cmd_picker.systemd_units")
+frame_profiler = lazy_import("py_scripts.cmd_picker.profiler")
+
 
 class Colors:
     RESET = "\033[0m"
@@ -53,6 +79,15 @@ class Colors:
 class Tool(ABC):
     """Base class for all tools"""
 
+    # Seconds a computed preview is served from cache before being refreshed
+    preview_ttl: float = 10.0
+    # Compute previews for every row on screen, not just the ones next to the selection
+    prefetch_visible: bool = False
+    # Key toggling a live output pane for the selected item, see open_log_stream
+    follow_key: Optional[str] = None
+    # get_items may answer before every source has; the rest is announced through watch
+    streams_items: bool = False
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -83,10 +118,44 @@ class Tool(ABC):
     def execute_action(self, item: Dict[str, Any]) -> None:
         pass
 
+    def get_item_key(self, item: Dict[str, Any]) -> str:
+        """Return a stable identifier for item, used to cache its preview"""
+        return json.dumps(item, sort_keys=True, default=str)
+
+    def get_search_text(self, item: Dict[str, Any]) -> str:
+        """Return the text the / filter matches against"""
+        return " ".join(str(value) for value in item.values() if isinstance(value, (str, int)))
+
+    def get_snapshot_context(self) -> Optional[str]:
+        """Identify where get_items reads from (server socket, host, repository)
+
+        The last item list is saved per context and shown at startup while the
+        real one loads. Return None to always wait for get_items.
+        """
+        return None
+
+    def prepare_previews(self, items: List[Dict[str, Any]]) -> None:
+        """Called with the items on screen before their previews are computed
+
+        Lets a tool fetch what the previews need in bulk. Runs on the UI
+        thread, so it should only record the items, not do the fetching.
+        """
+
+    def open_log_stream(self, item: Dict[str, Any], on_update: Callable[[], None]) -> Optional[LogStream]:
+        """Start following the output of item. Return None if it cannot be followed."""
+        return None
+
     def get_additional_actions(self) -> Dict[str, str]:
         """Return additional key bindings and their descriptions"""
         return {}
 
+    def watch(self, on_change: Callable[[], None]) -> bool:
+        """Start pushing change notifications to on_change. Return False if unsupported."""
+        return False
+
+    def unwatch(self) -> None:
+        """Stop the notifications started by watch"""
+
     def handle_additional_action(self, key: str, item: Dict[str, Any]) -> bool:
         """Handle additional actions. Return True if action was handled."""
         return False
@@ -100,7 +169,106 @@ class Tool(ABC):
         return False
 
 
+# Control-mode notifications after which the session list must be re-read
+TMUX_STRUCTURE_NOTIFICATIONS = {
+    "%sessions-changed",
+    "%session-renamed",
+    "%session-window-changed",
+    "%window-add",
+    "%window-close",
+    "%window-renamed",
+    "%window-pane-changed",
+    "%unlinked-window-add",
+    "%unlinked-window-close",
+    "%unlinked-window-renamed",
+    "%layout-change",
+    "%exit",
+}
+
+
+def follow_process(args: Sequence[str], on_update: Callable[[], None]) -> Optional[LogStream]:
+    """LogStream of the combined output of a long-running command, None if it cannot be started"""
+    try:
+        proc = subprocess.Popen(list(args), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    except OSError:
+        return None
+    assert proc.stdout is not None
+    stdout = proc.stdout
+
+    def chunks() -> Iterator[bytes]:
+        try:
+            yield from iter(lambda: os.read(stdout.fileno(), 65536), b"")
+        finally:
+            stdout.close()
+            proc.wait()
+
+    return LogStream(chunks(), proc.terminate, on_update).start()
+
+
+def confirm(prompt: str) -> bool:
+    """Ask a y/N question while the picker has released the terminal
+
+    The whole answer line is read, so its newline is not left in the stdin
+    buffer for the next prompt to take as an empty answer.
+    """
+    print(prompt, end="", flush=True)
+    try:
+        return input().strip().lower().startswith("y")
+    except (EOFError, KeyboardInterrupt):
+        return False
+
+
 class TmuxTool(Tool):
+    preview_ttl = 2.0
+    # Minimum seconds between change callbacks caused by pane output
+    output_notify_interval = 0.25
+
+    def __init__(self, socket_name: Optional[str] = None):
+        # -L selects a private tmux server, handy for tests and nested setups
+        self.tmux_cmd = ["tmux", "-L", socket_name] if socket_name else ["tmux"]
+        self._run_process = run_tmux(self.tmux_cmd)
+        self.control: Optional[TmuxControlClient] = None
+        self._on_change: Optional[Callable[[], None]] = None
+        self._last_output_notify = 0.0
+        self.state = TmuxState(self._run)
+
+    def _run(self, args: Sequence[str]) -> str:
+        """Run a tmux subcommand over the control connection when there is one"""
+        control = self.control
+        if control is not None and control.start():
+            try:
+                return control.command(args)
+            except subprocess.CalledProcessError:
+                if control.connected:
+                    raise  # a genuine tmux error, not a lost connection
+        return self._run_process(args)
+
+    def watch(self, on_change: Callable[[], None]) -> bool:
+        self._on_change = on_change
+        self.control = TmuxControlClient(self.tmux_cmd, on_notification=self._handle_notification)
+        self.control.start()
+        return True
+
+    def unwatch(self) -> None:
+        control, self.control = self.control, None
+        self._on_change = None
+        if control is not None:
+            control.close()
+
+    def _handle_notification(self, name: str, args: str) -> None:
+        if name == "%output":
+            self.state.forget_capture(args.split(" ", 1)[0])
+            now = time.monotonic()
+            if now - self._last_output_notify < self.output_notify_interval:
+                return
+            self._last_output_notify = now
+        elif name in TMUX_STRUCTURE_NOTIFICATIONS:
+            self.state.invalidate()
+        else:
+            return
+        if self._on_change is not None:
+            self._on_change()
+
     @property
     def name(self) -> str:
         return "tmux"
@@ -112,23 +280,30 @@ class TmuxTool(Tool):
     def is_available(self) -> bool:
         return shutil.which("tmux") is not None
 
+    def get_snapshot_context(self) -> Optional[str]:
+        """Path of the server socket, resolved the way tmux itself does"""
+        socket_name = self.tmux_cmd[2] if len(self.tmux_cmd) > 2 else None
+        inside = os.environ.get("TMUX", "")
+        if socket_name is None and inside:
+            return inside.split(",")[0]
+        tmpdir = os.environ.get("TMUX_TMPDIR") or "/tmp"
+        return os.path.join(tmpdir, f"tmux-{os.getuid()}", socket_name or "default")
+
     def get_items(self) -> List[Dict[str, Any]]:
         try:
-            result = subprocess.run(
-                ["tmux", "list-sessions", "-F", "#{session_name}\t#{session_windows}\t#{session_created}"],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
-            items = []
-            for line in result.stdout.strip().split("\n"):
-                if line.strip():
-                    parts = line.split("\t")
-                    if len(parts) >= 3:
-                        items.append({"name": parts[0], "windows": parts[1], "created": parts[2], "type": "session"})
-            return items
-        except subprocess.CalledProcessError:
+            sessions = self.state.refresh()
+        except subprocess.SubprocessError:
             return []
+        return [
+            {"name": session.name, "windows": session.windows_count, "created": session.created, "type": "session"}
+            for session in sessions.values()
+        ]
+
+    def get_item_key(self, item: Dict[str, Any]) -> str:
+        return item["name"]
+
+    def get_search_text(self, item: Dict[str, Any]) -> str:
+        return item["name"]
 
     def get_item_display(self, item: Dict[str, Any], selected: bool) -> str:
         if selected:
@@ -137,59 +312,38 @@ class TmuxTool(Tool):
             return f"{Colors.BRIGHT_CYAN}📺 {item['name']}{Colors.RESET} {Colors.DIM}({item['windows']} windows){Colors.RESET}"
 
     def get_item_preview(self, item: Dict[str, Any]) -> str:
+        unavailable = f"{Colors.RED}Unable to get info for session: {item['name']}{Colors.RESET}"
         try:
-            # Get session info
-            session_info = subprocess.run(
-                [
-                    "tmux",
-                    "display-message",
-                    "-t",
-                    item["name"],
-                    "-p",
-                    "#{session_name}: #{session_windows} windows, created #{session_created}",
-                ],
-                capture_output=True,
-                text=True,
-                check=True,
-            ).stdout.strip()
-
-            # Get window list
-            windows = subprocess.run(
-                [
-                    "tmux",
-                    "list-windows",
-                    "-t",
-                    item["name"],
-                    "-F",
-                    "#{window_index}: #{window_name} #{?window_active,(active),}",
-                ],
-                capture_output=True,
-                text=True,
-                check=True,
-            ).stdout.strip()
+            # Session, window and pane metadata come from the shared snapshot
+            session = self.state.sessions().get(item["name"])
+            if session is None:
+                return unavailable
+
+            session_info = f"{session.name}: {session.windows_count} windows, created {session.created}"
+            windows = "\n".join(
+                f"{window.index}: {window.name} {'(active)' if window.active else ''}" for window in session.windows
+            )
 
-            # Get preview of active window
-            preview = subprocess.run(
-                ["tmux", "capture-pane", "-t", item["name"], "-p"], capture_output=True, text=True, check=True
-            ).stdout
+            # Preview of the active pane, only re-captured when it changed
+            pane = session.active_pane
+            preview = self.state.capture(pane) if pane else ""
 
             return f"{Colors.CYAN}{session_info}{Colors.RESET}\n\n{Colors.YELLOW}Windows:{Colors.RESET}\n{Colors.GREEN}{windows}{Colors.RESET}\n\n{Colors.YELLOW}Preview:{Colors.RESET}\n{preview[:500]}..."
         except subprocess.CalledProcessError:
-            return f"{Colors.RED}Unable to get info for session: {item['name']}{Colors.RESET}"
+            return unavailable
 
     def execute_action(self, item: Dict[str, Any]) -> None:
-        subprocess.run(["tmux", "attach-session", "-t", item["name"]])
+        subprocess.run([*self.tmux_cmd, "attach-session", "-t", item["name"]])
 
     def get_additional_actions(self) -> Dict[str, str]:
         return {"d": "Delete session", "a": "New session"}
 
     def handle_additional_action(self, key: str, item: Dict[str, Any]) -> bool:
         if key == "d":
-            print(f"\n{Colors.RED}Delete session '{item['name']}'? (y/N): {Colors.RESET}", end="", flush=True)
-            confirm = sys.stdin.read(1)
-            if confirm.lower() == "y":
+            if confirm(f"\n{Colors.RED}Delete session '{item['name']}'? (y/N): {Colors.RESET}"):
                 try:
-                    subprocess.run(["tmux", "kill-session", "-t", item["name"]], check=True)
+                    subprocess.run([*self.tmux_cmd, "kill-session", "-t", item["name"]], check=True)
+                    self.state.invalidate()
                     return True
                 except subprocess.CalledProcessError:
                     pass
@@ -202,27 +356,51 @@ class TmuxTool(Tool):
 
     def create_new_item(self) -> bool:
         print(f"\n{Colors.CYAN}Enter new session name: {Colors.RESET}", end="", flush=True)
-        # Temporarily restore terminal settings to read input
-        fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
+        # The picker hands the terminal back in normal mode while an action runs
         try:
-            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
             session_name = input().strip()
             if session_name:
                 try:
-                    subprocess.run(["tmux", "new-session", "-d", "-s", session_name], check=True)
+                    subprocess.run([*self.tmux_cmd, "new-session", "-d", "-s", session_name], check=True)
+                    self.state.invalidate()
                     print(f"{Colors.GREEN}✓ Session '{session_name}' created{Colors.RESET}")
                     return True
                 except subprocess.CalledProcessError:
                     print(f"{Colors.RED}✗ Failed to create session '{session_name}'{Colors.RESET}")
         except (EOFError, KeyboardInterrupt):
             pass
-        finally:
-            tty.setraw(sys.stdin.fileno())
         return False
 
 
 class DockerTool(Tool):
+    preview_ttl = 5.0
+    prefetch_visible = True
+    follow_key = "l"
+    # Lines of history shown when starting to follow a container
+    follow_tail = 100
+
+    def __init__(self, api: Optional["DockerAPI"] = None):
+        # Created on first use, so picking tmux sessions never loads the Engine API client
+        self._api = api
+        self._api_from_env = api is None
+        # Ids on screen, and their details from batched inspect calls
+        self._visible_ids: List[str] = []
+        self._details: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._inspect_lock = threading.Lock()
+
+    @property
+    def api(self) -> Optional["DockerAPI"]:
+        if self._api_from_env:
+            self._api = docker_api.DockerAPI.from_env()
+            self._api_from_env = False
+        return self._api
+
+    def get_api(self) -> Optional["DockerAPI"]:
+        """Engine API client if the daemon socket is usable, otherwise None (use the CLI)"""
+        if self.api is not None and self.api.available():
+            return self.api
+        return None
+
     @property
     def name(self) -> str:
         return "docker"
@@ -234,13 +412,29 @@ class DockerTool(Tool):
     def is_available(self) -> bool:
         return shutil.which("docker") is not None
 
+    def get_snapshot_context(self) -> Optional[str]:
+        return f"{os.environ.get('DOCKER_HOST', '')} context={os.environ.get('DOCKER_CONTEXT', '')}"
+
     def get_items(self) -> List[Dict[str, Any]]:
+        api = self.get_api()
+        if api is not None:
+            try:
+                return [
+                    {
+                        "id": container["Id"][:12],
+                        "name": (container.get("Names") or [""])[0].lstrip("/"),
+                        "status": container.get("Status", ""),
+                        "image": container.get("Image", ""),
+                        "type": "container",
+                    }
+                    for container in api.list_containers()
+                ]
+            except docker_api.DockerAPIError:
+                pass  # fall back to the CLI, which may know a context we don't
+
         try:
-            result = subprocess.run(
-                ["docker", "ps", "-a", "--format", "{{.ID}}\t{{.Names}}\t{{.Status}}\t{{.Image}}"],
-                capture_output=True,
-                text=True,
-                check=True,
+            result = run_command(
+                ["docker", "ps", "-a", "--format", "{{.ID}}\t{{.Names}}\t{{.Status}}\t{{.Image}}"], check=True
             )
             items = []
             for line in result.stdout.strip().split("\n"):
@@ -257,9 +451,15 @@ class DockerTool(Tool):
                             }
                         )
             return items
-        except subprocess.CalledProcessError:
+        except subprocess.SubprocessError:
             return []
 
+    def get_item_key(self, item: Dict[str, Any]) -> str:
+        return item["id"]
+
+    def get_search_text(self, item: Dict[str, Any]) -> str:
+        return f"{item['name']} {item['image']} {item['id']}"
+
     def get_item_display(self, item: Dict[str, Any], selected: bool) -> str:
         status_color = Colors.GREEN if "Up" in item["status"] else Colors.RED
         if selected:
@@ -267,28 +467,93 @@ class DockerTool(Tool):
         else:
             return f"{Colors.BRIGHT_CYAN}🐳 {item['name']}{Colors.RESET} {Colors.DIM}({item['id']}){Colors.RESET} {status_color}{item['status']}{Colors.RESET}"
 
+    def prepare_previews(self, items: List[Dict[str, Any]]) -> None:
+        self._visible_ids = [item["id"] for item in items]
+
+    def get_details(self, container_id: str, api: Optional["DockerAPI"] = None) -> Optional[str]:
+        """Formatted inspect data of a container, None if it does not exist
+
+        A miss inspects every container on screen that is not cached yet in one
+        go, over one Engine API connection or else in one docker inspect call;
+        concurrent preview workers wait for that call instead of starting their
+        own.
+        """
+        with self._inspect_lock:
+            now = time.monotonic()
+            cached = self._details.get(container_id)
+            if cached is not None and now - cached[0] <= self.preview_ttl:
+                return cached[1]
+
+            fresh = {cid for cid, (fetched_at, _) in self._details.items() if now - fetched_at <= self.preview_ttl}
+            batch = [container_id] + [cid for cid in self._visible_ids if cid != container_id and cid not in fresh]
+            found = api.inspect_many(batch) if api is not None else self.inspect_with_cli(batch)
+
+            self._details = {cid: entry for cid, entry in self._details.items() if cid in fresh}
+            for cid in batch:
+                info = found.get(cid)
+                self._details[cid] = (now, self.format_details(info) if info is not None else None)
+            return self._details[container_id][1]
+
+    @staticmethod
+    def inspect_with_cli(container_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Inspect data by the id asked for, from one docker inspect call, without the containers that are gone"""
+        # Exits non-zero when some containers are gone but still prints the rest
+        result = run_command(["docker", "inspect", *container_ids])
+        try:
+            found = json.loads(result.stdout) if result.stdout.strip() else []
+        except json.JSONDecodeError:
+            found = []
+        if result.returncode != 0 and not found and "No such" not in result.stderr:
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+        results = {}
+        for info in found:
+            # Match the full id back to the (possibly abbreviated) id that was asked for
+            cid = next((cid for cid in container_ids if info.get("Id", "").startswith(cid)), None)
+            if cid is not None:
+                results[cid] = info
+        return results
+
+    @staticmethod
+    def format_details(info: Dict[str, Any]) -> str:
+        """Render inspect data like the CLI preview's --format template"""
+        state = info.get("State") or {}
+        ports = (info.get("NetworkSettings") or {}).get("Ports") or {}
+        port_list = "".join(
+            f"{port}->{bindings[0].get('HostPort', '')} " for port, bindings in ports.items() if bindings
+        )
+        return (
+            f"{info.get('Name', '')}: {(info.get('Config') or {}).get('Image', '')}\n"
+            f"Status: {state.get('Status', '')}\n"
+            f"Created: {info.get('Created', '')}\n"
+            f"Ports: {port_list}"
+        )
+
     def get_item_preview(self, item: Dict[str, Any]) -> str:
+        api = self.get_api()
+        if api is not None:
+            try:
+                details = self.get_details(item["id"], api)
+                if details is None:
+                    return f"{Colors.RED}Unable to get info for container: {item['id']}{Colors.RESET}"
+                logs = api.logs(item["id"], tail=20)[-1000:] or "No logs available"
+                return (
+                    f"{Colors.CYAN}{details.strip()}{Colors.RESET}\n\n{Colors.YELLOW}Recent Logs:{Colors.RESET}\n{logs}"
+                )
+            except docker_api.DockerAPIError as e:
+                if e.status == 404:
+                    return f"{Colors.RED}Unable to get info for container: {item['id']}{Colors.RESET}"
+
         try:
-            # Get container details
-            info_result = subprocess.run(
-                [
-                    "docker",
-                    "inspect",
-                    "--format",
-                    "{{.Name}}: {{.Config.Image}}\nStatus: {{.State.Status}}\nCreated: {{.Created}}\nPorts: {{range $p, $conf := .NetworkSettings.Ports}}{{$p}}->{{(index $conf 0).HostPort}} {{end}}",
-                    item["id"],
-                ],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+            details = self.get_details(item["id"])
+            if details is None:
+                return f"{Colors.RED}Unable to get info for container: {item['id']}{Colors.RESET}"
 
             # Get recent logs
-            logs_result = subprocess.run(["docker", "logs", "--tail", "20", item["id"]], capture_output=True, text=True)
+            logs_result = run_command(["docker", "logs", "--tail", "20", item["id"]])
 
             logs = logs_result.stdout[-1000:] if logs_result.stdout else "No logs available"
 
-            return f"{Colors.CYAN}{info_result.stdout.strip()}{Colors.RESET}\n\n{Colors.YELLOW}Recent Logs:{Colors.RESET}\n{logs}"
+            return f"{Colors.CYAN}{details.strip()}{Colors.RESET}\n\n{Colors.YELLOW}Recent Logs:{Colors.RESET}\n{logs}"
         except subprocess.CalledProcessError:
             return f"{Colors.RED}Unable to get info for container: {item['id']}{Colors.RESET}"
 
@@ -298,8 +563,19 @@ class DockerTool(Tool):
         else:
             subprocess.run(["docker", "start", "-i", item["id"]])
 
+    def open_log_stream(self, item: Dict[str, Any], on_update: Callable[[], None]) -> Optional[LogStream]:
+        api = self.get_api()
+        if api is not None:
+            try:
+                chunks, stop = api.follow_logs(item["id"], tail=self.follow_tail)
+                return LogStream(chunks, stop, on_update).start()
+            except docker_api.DockerAPIError:
+                pass
+
+        return follow_process(["docker", "logs", "-f", "--tail", str(self.follow_tail), item["id"]], on_update)
+
     def get_additional_actions(self) -> Dict[str, str]:
-        return {"s": "Start/Stop container", "l": "View logs"}
+        return {"s": "Start/Stop container", "l": "Follow logs"}
 
     def handle_additional_action(self, key: str, item: Dict[str, Any]) -> bool:
         if key == "s":
@@ -308,16 +584,42 @@ class DockerTool(Tool):
                     subprocess.run(["docker", "stop", item["id"]], check=True)
                 else:
                     subprocess.run(["docker", "start", item["id"]], check=True)
+                with self._inspect_lock:
+                    self._details.clear()
                 return True
             except subprocess.CalledProcessError:
                 pass
-        elif key == "l":
-            subprocess.run(["docker", "logs", "-f", item["id"]])
-            return False
         return False
 
 
 class GhTool(Tool):
+    preview_ttl = 60.0
+
+    def __init__(self, store: Optional["PullRequestStore"] = None, repo: Optional[Tuple[str, str]] = None):
+        self._store = store
+        # An explicit repo is passed to gh as well; otherwise gh and get_repo use the current directory
+        self._repo = repo
+        self.repo_args = ["--repo", f"{repo[0]}/{repo[1]}"] if repo else []
+
+    @property
+    def store(self) -> "PullRequestStore":
+        """Pull requests with their commits and files, fetched in one GraphQL query"""
+        if self._store is None:
+            self._store = github_graphql.PullRequestStore(max_age=self.preview_ttl, rest=github.GitHubAPI())
+        return self._store
+
+    def get_repo(self) -> Optional[Tuple[str, str]]:
+        """(owner, name) of the repository gh would use here, None if unknown"""
+        if self._repo is None:
+            self._repo = github.current_repo()
+        return self._repo
+
+    def forget_items(self) -> None:
+        """Drop the cached pull requests after changing them"""
+        repo = self.get_repo()
+        if repo is not None:
+            self.store.invalidate(*repo)
+
     @property
     def name(self) -> str:
         return "gh"
@@ -329,26 +631,45 @@ class GhTool(Tool):
     def is_available(self) -> bool:
         return shutil.which("gh") is not None
 
+    def get_snapshot_context(self) -> Optional[str]:
+        repo = self.get_repo()
+        if repo is None:
+            return None
+        return f"{os.environ.get('GH_HOST', 'github.com')}/{repo[0]}/{repo[1]}"
+
     def get_items(self) -> List[Dict[str, Any]]:
+        repo = self.get_repo()
+        if repo is not None:
+            try:
+                return self.store.get(*repo)
+            except github_graphql.GitHubGraphQLError:
+                pass  # e.g. not logged in; gh itself may still work
+
         try:
-            result = subprocess.run(
+            result = run_command(
                 [
                     "gh",
                     "pr",
                     "list",
                     "--json",
                     "number,title,author,state,url,headRefName,baseRefName,createdAt,updatedAt,additions,deletions,changedFiles",
-                ],
-                capture_output=True,
-                text=True,
+                ]
+                + self.repo_args,
                 check=True,
             )
 
             prs = json.loads(result.stdout)
             return prs if prs else []
-        except (subprocess.CalledProcessError, json.JSONDecodeError):
+        except (subprocess.SubprocessError, json.JSONDecodeError):
             return []
 
+    def get_item_key(self, item: Dict[str, Any]) -> str:
+        return str(item["number"])
+
+    def get_search_text(self, item: Dict[str, Any]) -> str:
+        author = (item.get("author") or {}).get("login", "")
+        return f"#{item['number']} {item['title']} {author} {item.get('headRefName', '')}"
+
     def get_item_display(self, item: Dict[str, Any], selected: bool) -> str:
         if selected:
             return f"{Colors.BG_BLUE}{Colors.BRIGHT_WHITE}🔀 #{item['number']} {item['title'][:50]}{Colors.RESET} {Colors.DIM}by {item['author']['login']}{Colors.RESET}"
@@ -356,51 +677,56 @@ class GhTool(Tool):
             return f"{Colors.BRIGHT_CYAN}🔀 #{item['number']} {item['title'][:50]}{Colors.RESET} {Colors.DIM}by {item['author']['login']}{Colors.RESET}"
 
     def get_item_preview(self, item: Dict[str, Any]) -> str:
+        if "commits" in item and "files" in item:  # fetched along with the list
+            return self.format_preview(item, item["commits"], item["files"])
+
         try:
             # Get PR commits
-            commits_result = subprocess.run(
-                ["gh", "pr", "view", str(item["number"]), "--json", "commits"],
-                capture_output=True,
-                text=True,
-                check=True,
+            commits_result = run_command(
+                ["gh", "pr", "view", str(item["number"]), "--json", "commits"] + self.repo_args, check=True
             )
 
             commits_data = json.loads(commits_result.stdout)
             commits = commits_data.get("commits", [])
 
-            commit_list = []
-            for commit in commits[-5:]:
-                short_sha = commit["oid"][:8]
-                message = commit["messageHeadline"][:50]
-                author = commit.get("author", {}).get("name", "Unknown") if commit.get("author") else "Unknown"
-                commit_list.append(
-                    f"{Colors.YELLOW}{short_sha}{Colors.RESET} {message} {Colors.DIM}({author}){Colors.RESET}"
-                )
-
             # Get changed files
-            files_result = subprocess.run(
-                ["gh", "pr", "diff", str(item["number"]), "--name-only"], capture_output=True, text=True, check=True
+            files_result = run_command(
+                ["gh", "pr", "diff", str(item["number"]), "--name-only"] + self.repo_args, check=True
             )
 
-            files = files_result.stdout.strip().split("\n")[:10] if files_result.stdout.strip() else []
+            files = files_result.stdout.strip().split("\n") if files_result.stdout.strip() else []
 
-            info = f"{Colors.CYAN}PR #{item['number']}: {item['title']}{Colors.RESET}\n"
-            info += f"{Colors.DIM}Author: {item['author']['login']} | {item['headRefName']} -> {item['baseRefName']}{Colors.RESET}\n"
-            info += f"{Colors.GREEN}+{item.get('additions', 0)} -{item.get('deletions', 0)}{Colors.RESET} changes in {item.get('changedFiles', 0)} files\n\n"
+            return self.format_preview(item, commits, files)
+        except (subprocess.CalledProcessError, json.JSONDecodeError):
+            return f"{Colors.RED}Unable to get info for PR #{item['number']}{Colors.RESET}"
 
-            if commit_list:
-                info += f"{Colors.YELLOW}Recent Commits:{Colors.RESET}\n" + "\n".join(commit_list) + "\n\n"
+    def format_preview(self, item: Dict[str, Any], commits: List[Dict[str, Any]], files: List[str]) -> str:
+        commit_list = []
+        for commit in commits[-5:]:
+            short_sha = commit["oid"][:8]
+            message = commit["messageHeadline"][:50]
+            author = commit.get("author", {}).get("name", "Unknown") if commit.get("author") else "Unknown"
+            commit_list.append(
+                f"{Colors.YELLOW}{short_sha}{Colors.RESET} {message} {Colors.DIM}({author}){Colors.RESET}"
+            )
 
-            if files:
-                info += f"{Colors.YELLOW}Changed Files:{Colors.RESET}\n" + "\n".join(
-                    f"{Colors.GREEN}{f}{Colors.RESET}" for f in files
-                )
+        info = f"{Colors.CYAN}PR #{item['number']}: {item['title']}{Colors.RESET}\n"
+        info += f"{Colors.DIM}Author: {item['author']['login']} | {item['headRefName']} -> {item['baseRefName']}{Colors.RESET}\n"
+        info += f"{Colors.GREEN}+{item.get('additions', 0)} -{item.get('deletions', 0)}{Colors.RESET} changes in {item.get('changedFiles', 0)} files\n\n"
 
-            return info
-        except (subprocess.CalledProcessError, json.JSONDecodeError):
-            return f"{Colors.RED}Unable to get info for PR #{item['number']}{Colors.RESET}"
+        if commit_list:
+            info += f"{Colors.YELLOW}Recent Commits:{Colors.RESET}\n" + "\n".join(commit_list) + "\n\n"
+
+        if files:
+            info += f"{Colors.YELLOW}Changed Files:{Colors.RESET}\n" + "\n".join(
+                f"{Colors.GREEN}{f}{Colors.RESET}" for f in files[:10]
+            )
+
+        return info
 
     def execute_action(self, item: Dict[str, Any]) -> None:
+        import webbrowser
+
         webbrowser.open(item["url"])
 
     def get_additional_actions(self) -> Dict[str, str]:
@@ -409,16 +735,15 @@ class GhTool(Tool):
     def handle_additional_action(self, key: str, item: Dict[str, Any]) -> bool:
         if key == "c":
             try:
-                subprocess.run(["gh", "pr", "checkout", str(item["number"])], check=True)
+                subprocess.run(["gh", "pr", "checkout", str(item["number"])] + self.repo_args, check=True)
                 return False
             except subprocess.CalledProcessError:
                 pass
         elif key == "m":
-            print(f"\n{Colors.YELLOW}Merge PR #{item['number']}? (y/N): {Colors.RESET}", end="", flush=True)
-            confirm = sys.stdin.read(1)
-            if confirm.lower() == "y":
+            if confirm(f"\n{Colors.YELLOW}Merge PR #{item['number']}? (y/N): {Colors.RESET}"):
                 try:
-                    subprocess.run(["gh", "pr", "merge", str(item["number"])], check=True)
+                    subprocess.run(["gh", "pr", "merge", str(item["number"])] + self.repo_args, check=True)
+                    self.forget_items()
                     return True
                 except subprocess.CalledProcessError:
                     pass
@@ -432,99 +757,819 @@ class GhTool(Tool):
     def create_new_item(self) -> bool:
         print(f"\n{Colors.CYAN}Creating new PR...{Colors.RESET}")
         try:
-            subprocess.run(["gh", "pr", "create"], check=False)
+            subprocess.run(["gh", "pr", "create"] + self.repo_args, check=False)
+            self.forget_items()
             return True
         except subprocess.CalledProcessError:
             print(f"{Colors.RED}✗ Failed to create PR{Colors.RESET}")
             return False
 
 
+class SystemdTool(Tool):
+    preview_ttl = 5.0
+    prefetch_visible = True
+    follow_key = "l"
+    # Lines of history shown when starting to follow a unit
+    follow_tail = 100
+
+    def __init__(self) -> None:
+        self.systemctl_cmd = ["systemctl", "--user"]
+        self.journal_cmd = ["journalctl", "--user"]
+        self.journal = systemd_units.JournalTail(self._run_journalctl)
+        # Units on screen, and their properties from batched systemctl show calls
+        self._visible_units: List[str] = []
+        self._details: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._show_lock = threading.Lock()
+
+    def _run_journalctl(self, args: Sequence[str]) -> str:
+        return run_command([*self.journal_cmd, *args], check=True).stdout
+
+    @property
+    def name(self) -> str:
+        return "systemd"
+
+    @property
+    def description(self) -> str:
+        return "Interactive systemd user unit picker"
+
+    def is_available(self) -> bool:
+        return shutil.which("systemctl") is not None
+
+    def get_snapshot_context(self) -> Optional[str]:
+        """The user manager, identified by its runtime directory"""
+        return os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+
+    def get_items(self) -> List[Dict[str, Any]]:
+        try:
+            result = run_command(
+                [*self.systemctl_cmd, "list-units", "--type=service", "--all", "--output=json", "--no-pager"],
+                check=True,
+            )
+            return systemd_units.parse_units(result.stdout)
+        except (subprocess.SubprocessError, json.JSONDecodeError, KeyError):
+            return []
+
+    def get_item_key(self, item: Dict[str, Any]) -> str:
+        return item["unit"]
+
+    def get_search_text(self, item: Dict[str, Any]) -> str:
+        return f"{item['unit']} {item['description']} {item['active']} {item['sub']}"
+
+    def get_item_display(self, item: Dict[str, Any], selected: bool) -> str:
+        state_color = {"active": Colors.GREEN, "failed": Colors.RED}.get(item["active"], Colors.DIM)
+        state = f"{state_color}{item['active']} ({item['sub']}){Colors.RESET}"
+        if selected:
+            return f"{Colors.BG_BLUE}{Colors.BRIGHT_WHITE}🔧 {item['unit']}{Colors.RESET} {state} {Colors.DIM}{item['description'][:50]}{Colors.RESET}"
+        else:
+            return f"{Colors.BRIGHT_CYAN}🔧 {item['unit']}{Colors.RESET} {state} {Colors.DIM}{item['description'][:50]}{Colors.RESET}"
+
+    def prepare_previews(self, items: List[Dict[str, Any]]) -> None:
+        self._visible_units = [item["unit"] for item in items]
+
+    def get_details(self, unit: str) -> Optional[Dict[str, str]]:
+        """Properties of unit, read together with every other unit on screen that is not cached yet"""
+        with self._show_lock:
+            now = time.monotonic()
+            cached = self._details.get(unit)
+            if cached is not None and now - cached[0] <= self.preview_ttl:
+                return cached[1]
+
+            fresh = {name for name, (fetched_at, _) in self._details.items() if now - fetched_at <= self.preview_ttl}
+            batch = [unit] + [name for name in self._visible_units if name != unit and name not in fresh]
+            result = run_command(
+                [*self.systemctl_cmd, "show", "--no-pager", f"--property={','.join(systemd_units.SHOW_PROPERTIES)}"]
+                + batch,
+                check=True,
+            )
+            self._details = {name: entry for name, entry in self._details.items() if name in fresh}
+            for name, properties in systemd_units.parse_show(result.stdout).items():
+                self._details[name] = (now, properties)
+            cached = self._details.get(unit)
+            return cached[1] if cached is not None else None
+
+    def get_item_preview(self, item: Dict[str, Any]) -> str:
+        try:
+            details = self.get_details(item["unit"]) or {}
+        except subprocess.CalledProcessError:
+            return f"{Colors.RED}Unable to get info for unit: {item['unit']}{Colors.RESET}"
+        try:
+            journal = self.journal.get(item["unit"])
+        except subprocess.CalledProcessError as e:
+            journal = [f"{Colors.RED}Unable to read the journal: {(e.stderr or '').strip()}{Colors.RESET}"]
+
+        status = (
+            f"{item['unit']}: {details.get('Description', item['description'])}\n"
+            f"State: {details.get('ActiveState', item['active'])} ({details.get('SubState', item['sub'])})"
+            f", result {details.get('Result', '')}\n"
+            f"Since: {details.get('ActiveEnterTimestamp', '')}\n"
+            f"Main PID: {details.get('MainPID', '')}, exit status {details.get('ExecMainStatus', '')}"
+        )
+        memory = systemd_units.format_memory(details.get("MemoryCurrent"))
+        if memory is not None:
+            status += f"\nMemory: {memory}"
+        lines = "\n".join(journal) or "No journal entries"
+        return f"{Colors.CYAN}{status}{Colors.RESET}\n\n{Colors.YELLOW}Recent Journal:{Colors.RESET}\n{lines}"
+
+    def execute_action(self, item: Dict[str, Any]) -> None:
+        try:
+            subprocess.run([*self.journal_cmd, "-f", "-n", str(self.follow_tail), "-u", item["unit"]])
+        except KeyboardInterrupt:
+            pass  # Ctrl-C ends following, as in durable-run
+
+    def open_log_stream(self, item: Dict[str, Any], on_update: Callable[[], None]) -> Optional[LogStream]:
+        return follow_process(
+            [*self.journal_cmd, "-f", "--no-pager", "-n", str(self.follow_tail), "-u", item["unit"]], on_update
+        )
+
+    def get_additional_actions(self) -> Dict[str, str]:
+        return {"s": "Stop unit", "r": "Restart unit", "l": "Follow journal"}
+
+    def handle_additional_action(self, key: str, item: Dict[str, Any]) -> bool:
+        commands = {"s": "stop", "r": "restart"}
+        if key not in commands:
+            return False
+        try:
+            subprocess.run([*self.systemctl_cmd, commands[key], item["unit"]], check=True)
+        except subprocess.CalledProcessError:
+            return False
+        with self._show_lock:
+            self._details.pop(item["unit"], None)
+        return True
+
+
+class DaemonTool(Tool):
+    """Another tool whose items and previews come from a running `cmd-picker --daemon`
+
+    Display, actions and log streams stay with the wrapped tool and run
+    here. Whenever the daemon cannot answer, the wrapped tool is asked.
+    """
+
+    def __init__(self, tool: Tool, client: "DaemonClient"):
+        self.tool = tool
+        self.client = client
+        self.preview_ttl = tool.preview_ttl
+        self.prefetch_visible = tool.prefetch_visible
+        self.follow_key = tool.follow_key
+        # Set after an action changed things, so the next list is fetched rather than served warm
+        self._stale = False
+
+    @property
+    def name(self) -> str:
+        return self.tool.name
+
+    @property
+    def description(self) -> str:
+        return self.tool.description
+
+    def is_available(self) -> bool:
+        return self.tool.is_available()
+
+    def get_items(self) -> List[Dict[str, Any]]:
+        context = self.tool.get_snapshot_context()
+        if context is not None:
+            try:
+                items = self.client.items(self.tool.name, context, refresh=self._stale)
+                self._stale = False
+                return items
+            except picker_daemon.DaemonError:
+                pass
+        return self.tool.get_items()
+
+    def get_item_preview(self, item: Dict[str, Any]) -> str:
+        context = self.tool.get_snapshot_context()
+        if context is not None:
+            try:
+                return self.client.preview(self.tool.name, context, item)
+            except picker_daemon.DaemonError:
+                pass
+        return self.tool.get_item_preview(item)
+
+    def get_item_display(self, item: Dict[str, Any], selected: bool) -> str:
+        return self.tool.get_item_display(item, selected)
+
+    def execute_action(self, item: Dict[str, Any]) -> None:
+        self.tool.execute_action(item)
+
+    def get_item_key(self, item: Dict[str, Any]) -> str:
+        return self.tool.get_item_key(item)
+
+    def get_search_text(self, item: Dict[str, Any]) -> str:
+        return self.tool.get_search_text(item)
+
+    def get_snapshot_context(self) -> Optional[str]:
+        return self.tool.get_snapshot_context()
+
+    def open_log_stream(self, item: Dict[str, Any], on_update: Callable[[], None]) -> Optional[LogStream]:
+        return self.tool.open_log_stream(item, on_update)
+
+    def get_additional_actions(self) -> Dict[str, str]:
+        return self.tool.get_additional_actions()
+
+    def watch(self, on_change: Callable[[], None]) -> bool:
+        def changed() -> None:
+            self._stale = True
+            on_change()
+
+        return self.tool.watch(changed)
+
+    def unwatch(self) -> None:
+        self.tool.unwatch()
+
+    def handle_additional_action(self, key: str, item: Dict[str, Any]) -> bool:
+        handled = self.tool.handle_additional_action(key, item)
+        self._stale = self._stale or handled
+        return handled
+
+    def can_create_new(self) -> bool:
+        return self.tool.can_create_new()
+
+    def create_new_item(self) -> bool:
+        created = self.tool.create_new_item()
+        self._stale = self._stale or created
+        return created
+
+
+class AllTool(Tool):
+    """Items of several tools in one list, each backend queried on its own thread
+
+    get_items returns as soon as the fastest backend has answered; every
+    later answer is announced through the watch callback, and the picker
+    then picks up the longer list. Items are wrapped as {"tool", "item"} and
+    everything else is handed to the tool that owns the item.
+    """
+
+    streams_items = True
+
+    def __init__(
+        self, tools: Dict[str, Tool], live: bool = False, is_available: Optional[Callable[[str], bool]] = None
+    ):
+        self.tools = tools
+        # Availability probe per tool name, e.g. the registry's cached one
+        self._is_available = is_available or (lambda name: self.tools[name].is_available())
+        # Also forward the tools' own change notifications (cmd-picker all --live)
+        self.live = live
+        self.preview_ttl = min((tool.preview_ttl for tool in tools.values()), default=Tool.preview_ttl)
+        self.prefetch_visible = any(tool.prefetch_visible for tool in tools.values())
+        self.follow_key = next((tool.follow_key for tool in tools.values() if tool.follow_key), None)
+        self._results: Dict[str, List[Dict[str, Any]]] = {}
+        self._running: set = set()
+        # Tools to query again on the next get_items, e.g. after one of their actions
+        self._stale: set = set()
+        # A backend answered since get_items last returned, so the next call only collects
+        self._unreported = False
+        self._on_change: Optional[Callable[[], None]] = None
+        self._cond = threading.Condition()
+
+    @property
+    def name(self) -> str:
+        return "all"
+
+    @property
+    def description(self) -> str:
+        return f"Everything from {', '.join(self.tools)} in one list"
+
+    def available_tools(self) -> Dict[str, Tool]:
+        return {name: tool for name, tool in self.tools.items() if self._is_available(name)}
+
+    def is_available(self) -> bool:
+        return bool(self.available_tools())
+
+    def get_items(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            if self._stale:
+                names, self._stale = set(self._stale), set()
+            elif self._unreported:
+                names = set()
+            else:
+                names = set(self.available_tools())
+            self._unreported = False
+            for name in names - self._running:
+                self._running.add(name)
+                threading.Thread(target=self._fetch, args=(name,), name=f"all-{name}", daemon=True).start()
+            # Nothing to show yet: wait for the fastest backend, not for all of them
+            while self._running and not any(self._results.values()):
+                self._cond.wait()
+            return self._merged()
+
+    def _fetch(self, name: str) -> None:
+        try:
+            items = self.tools[name].get_items()
+        except Exception:
+            items = []  # one broken backend must not take the others down
+        with self._cond:
+            self._results[name] = items
+            self._running.discard(name)
+            self._unreported = True
+            self._cond.notify_all()
+            on_change = self._on_change
+        if on_change is not None:
+            on_change()
+
+    def _merged(self) -> List[Dict[str, Any]]:
+        """Answers so far, grouped in tool order so that late backends do not reshuffle the list"""
+        return [{"tool": name, "item": item} for name in self.tools for item in self._results.get(name, [])]
+
+    def owner(self, item: Dict[str, Any]) -> Tool:
+        return self.tools[item["tool"]]
+
+    def get_item_display(self, item: Dict[str, Any], selected: bool) -> str:
+        return self.owner(item).get_item_display(item["item"], selected)
+
+    def get_item_preview(self, item: Dict[str, Any]) -> str:
+        return self.owner(item).get_item_preview(item["item"])
+
+    def execute_action(self, item: Dict[str, Any]) -> None:
+        self.owner(item).execute_action(item["item"])
+
+    def get_item_key(self, item: Dict[str, Any]) -> str:
+        return f"{item['tool']}:{self.owner(item).get_item_key(item['item'])}"
+
+    def get_search_text(self, item: Dict[str, Any]) -> str:
+        return f"{item['tool']} {self.owner(item).get_search_text(item['item'])}"
+
+    def get_snapshot_context(self) -> Optional[str]:
+        contexts = {name: tool.get_snapshot_context() for name, tool in self.tools.items()}
+        if all(context is None for context in contexts.values()):
+            return None
+        return " ".join(f"{name}={context}" for name, context in contexts.items())
+
+    def prepare_previews(self, items: List[Dict[str, Any]]) -> None:
+        for name, tool in self.tools.items():
+            tool.prepare_previews([item["item"] for item in items if item["tool"] == name])
+
+    def open_log_stream(self, item: Dict[str, Any], on_update: Callable[[], None]) -> Optional[LogStream]:
+        return self.owner(item).open_log_stream(item["item"], on_update)
+
+    def get_additional_actions(self) -> Dict[str, str]:
+        """Every tool's keys; a key used by several tools acts on whichever owns the selected item"""
+        actions: Dict[str, List[str]] = {}
+        for tool in self.tools.values():
+            for key, description in tool.get_additional_actions().items():
+                actions.setdefault(key, []).append(description)
+        return {key: " / ".join(descriptions) for key, descriptions in actions.items()}
+
+    def handle_additional_action(self, key: str, item: Dict[str, Any]) -> bool:
+        handled = self.owner(item).handle_additional_action(key, item["item"])
+        if handled:
+            with self._cond:
+                self._stale.add(item["tool"])
+        return handled
+
+    def watch(self, on_change: Callable[[], None]) -> bool:
+        with self._cond:
+            self._on_change = on_change
+            missed = self._unreported
+        if self.live:
+            for name, tool in self.tools.items():
+                tool.watch(lambda name=name: self._tool_changed(name))
+        if missed:
+            on_change()  # a backend answered before we were watching
+        return True
+
+    def _tool_changed(self, name: str) -> None:
+        with self._cond:
+            self._stale.add(name)
+            on_change = self._on_change
+        if on_change is not None:
+            on_change()
+
+    def unwatch(self) -> None:
+        with self._cond:
+            self._on_change = None
+        if self.live:
+            for tool in self.tools.values():
+                tool.unwatch()
+
+
+class Viewport:
+    """The window of list rows currently on screen, scrolled to keep the selection visible"""
+
+    def __init__(self):
+        self.top: int = 0
+
+    def scroll_to(self, selected: int, height: int, total: int) -> range:
+        """Adjust the window so that selected is visible and return the visible indices"""
+        if height <= 0 or total <= 0:
+            return range(0)
+        if selected < self.top:
+            self.top = selected
+        elif selected >= self.top + height:
+            self.top = selected - height + 1
+        self.top = max(0, min(self.top, total - height))
+        return range(self.top, min(total, self.top + height))
+
+
+# Escape sequences emitted by the common terminals for the navigation keys
+KEYS_DOWN = ("j", "\x1b[B")
+KEYS_UP = ("k", "\x1b[A")
+KEYS_PAGE_DOWN = ("\x1b[6~", "\x06")  # PgDn, Ctrl-F
+KEYS_PAGE_UP = ("\x1b[5~", "\x02")  # PgUp, Ctrl-B
+KEYS_HOME = ("g", "\x1b[H", "\x1b[1~", "\x1bOH")
+KEYS_END = ("G", "\x1b[F", "\x1b[4~", "\x1bOF")
+KEYS_BACKSPACE = ("\x7f", "\x08")
+
+
 class CmdPicker:
-    def __init__(self, tool: Tool):
+    LOADING_PLACEHOLDER = "loading…"
+    PREFETCH_COUNT = 3
+
+    def __init__(
+        self, tool: Tool, snapshots: Optional[SnapshotStore] = None, profiler: Optional["FrameProfiler"] = None
+    ):
         self.tool = tool
+        # Time spent per phase of each frame, reported when run() returns (--profile)
+        self.profiler = profiler
+        # Last item lists on disk, drawn at startup while get_items runs in the background
+        self.snapshots = snapshots
+        self.refreshing: bool = False
+        self._refreshed: Optional[Tuple[int, Optional[List[Dict[str, Any]]]]] = None
+        self._refresh_lock = threading.Lock()
+        # Bumped by set_items, so a refresh started before a newer load is dropped
+        self._items_version: int = 0
+        # all_items is what the tool returned, items the part matching the filter
+        self.all_items: List[Dict[str, Any]] = []
         self.items: List[Dict[str, Any]] = []
         self.selected_index: int = 0
+        self.search_index = SearchIndex([])
+        self.filter_query: str = ""
+        self.filtering: bool = False
+        # Follow changes pushed by the tool (Tool.watch) instead of only refreshing after actions
+        self.live: bool = False
+        self._items_changed = threading.Event()
+        # Set by an action that may have removed the last item; checked once the refreshed list is in
+        self._quit_if_emptied: bool = False
         self.preview_height: int = 20
+        self.direction: int = 1
+        self.viewport = Viewport()
+        # Visible rows and list the tool was last told about (Tool.prepare_previews)
+        self._prepared_page: Optional[Tuple[range, List[Dict[str, Any]]]] = None
+        # Live output of the selected item, shown instead of the preview while following
+        self.following: bool = False
+        self.log_stream: Optional[LogStream] = None
+        self._log_stream_key: Optional[str] = None
+        # Rows available to the item list, updated on every frame
+        self.list_height: int = 1
+        # Self-pipe used by background workers to interrupt a blocking get_key, closed when run() returns
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_w, False)
+        self._wake_lock = threading.Lock()
+        self._key_reader: Optional[KeyReader] = None
+        # Keys read but not handled yet; the next frame is only drawn once this is empty
+        self._pending_keys: "deque[str]" = deque()
+        compute_preview = tool.get_item_preview
+        if profiler is not None:
+
+            def compute_preview(item: Dict[str, Any]) -> str:
+                with profiler.phase("preview"):
+                    return tool.get_item_preview(item)
+
+        self.previews = PreviewEngine(
+            compute_preview,
+            key=tool.get_item_key,
+            on_ready=self.wake,
+            cache=PreviewCache(ttl=tool.preview_ttl),
+        )
+        self.renderer = ScreenRenderer()
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """Profile the block as the named phase of the current frame, when profiling"""
+        return self.profiler.phase(name) if self.profiler is not None else nullcontext()
+
+    def wake(self) -> None:
+        """Make a pending get_key return so the interface is redrawn"""
+        # Under the lock, so a worker finishing late never writes to the descriptor number once it is reused
+        with self._wake_lock:
+            if self._wake_w < 0:
+                return
+            try:
+                os.write(self._wake_w, b"\0")
+            except BlockingIOError:
+                pass  # a wake-up is already pending
+
+    def close_wake_pipe(self) -> None:
+        with self._wake_lock:
+            if self._wake_w < 0:
+                return
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = -1
+
+    def on_items_changed(self) -> None:
+        """Called by the tool, from any thread, when its items may have changed"""
+        self._items_changed.set()
+        self.wake()
+
+    def reload_if_changed(self) -> None:
+        """Re-read the items in the background after the tool reported a change
+
+        A change reported while a refresh is running is picked up by the
+        next call once that refresh has been applied.
+        """
+        if not self._items_changed.is_set() or self.refreshing:
+            return
+        self._items_changed.clear()
+        self.previews.expire()
+        self.refresh_in_background()
+
+    def load_items(self) -> None:
+        """Fetch the items from the tool and remember them for the next start"""
+        with self.phase("fetch"):
+            items = self.tool.get_items()
+        self.save_snapshot(items)
+        self.set_items(items)
+
+    def load_snapshot(self) -> bool:
+        """Show the items saved by an earlier run. Return False if there are none."""
+        if self.snapshots is None:
+            return False
+        context = self.tool.get_snapshot_context()
+        items = self.snapshots.load(self.tool.name, context) if context is not None else None
+        if items is None:
+            return False
+        self.set_items(items)
+        return True
 
-    def get_key(self) -> str:
-        """Get a single keypress"""
-        fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
-        try:
-            tty.setraw(sys.stdin.fileno())
-            key = sys.stdin.read(1)
-            if ord(key) == 27:  # ESC sequence
-                key += sys.stdin.read(2)
-        finally:
-            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        return key
+    def save_snapshot(self, items: List[Dict[str, Any]]) -> None:
+        if self.snapshots is None:
+            return
+        context = self.tool.get_snapshot_context()
+        if context is not None:
+            self.snapshots.save(self.tool.name, context, items)
 
-    def display_interface(self) -> None:
-        """Display the picker interface"""
-        os.system("clear")
+    def refresh_in_background(self) -> None:
+        """Fetch the items on a worker thread; apply_refreshed_items swaps them in"""
+        version = self._items_version
+        self.refreshing = True
 
-        if not self.items:
-            print(f"{Colors.RED}No {self.tool.name} items found{Colors.RESET}")
+        def refresh() -> None:
+            try:
+                with self.phase("fetch"):
+                    items: Optional[List[Dict[str, Any]]] = self.tool.get_items()
+            except Exception:
+                items = None  # keep showing the snapshot rather than dying in a thread
+            with self._refresh_lock:
+                self._refreshed = (version, items)
+            self.wake()
+
+        threading.Thread(target=refresh, name="cmd-picker-refresh", daemon=True).start()
+
+    def apply_refreshed_items(self) -> None:
+        """Replace the snapshot with the items fetched by refresh_in_background, once they are in"""
+        with self._refresh_lock:
+            refreshed, self._refreshed = self._refreshed, None
+        if refreshed is None:
             return
+        self.refreshing = False
+        version, items = refreshed
+        if items is not None and version == self._items_version:
+            self.save_snapshot(items)
+            self.set_items(items)
 
-        # Get terminal size
-        try:
-            terminal_size = os.get_terminal_size()
-            cols = terminal_size.columns
-            rows = terminal_size.lines
-        except OSError:
-            cols, rows = 80, 24
+    @property
+    def key_reader(self) -> KeyReader:
+        if self._key_reader is None:
+            self._key_reader = KeyReader(sys.stdin.fileno(), wake_fd=self._wake_r)
+        return self._key_reader
+
+    def get_key(self) -> str:
+        """Get the next keypress, or "" when woken up by a background worker
+
+        Everything typed while the last frame was drawn is read at once and
+        queued, so key repeat does not cost a frame per key.
+        """
+        reader = self.key_reader
+        reader.start()  # raw mode from the first read until run() returns
+        while not self._pending_keys:
+            self._pending_keys.extend(reader.read())
+        return self._pending_keys.popleft()
+
+    def released_terminal(self) -> ContextManager[None]:
+        """The terminal in its normal mode, for tools that prompt with input()"""
+        return self._key_reader.suspended() if self._key_reader is not None else nullcontext()
+
+    def set_items(self, items: List[Dict[str, Any]]) -> None:
+        """Replace the item list, keeping the filter and, where possible, the selected item"""
+        self.all_items = items
+        self._items_version += 1
+        self.search_index = SearchIndex([self.tool.get_search_text(item) for item in items])
+        self.apply_filter(keep_selection=True)
+
+    def apply_filter(self, keep_selection: bool = False) -> None:
+        """Narrow items down to those matching filter_query, best match first"""
+        previous_index = min(self.selected_index, len(self.items) - 1)
+        selected_key = None
+        if keep_selection and self.items:
+            selected_key = self.tool.get_item_key(self.items[previous_index])
+
+        self.items = [self.all_items[i] for i in self.search_index.filter(self.filter_query)]
+
+        self.selected_index = 0
+        if selected_key is not None:
+            # Follow the selected item; if it is gone, stay at the same position
+            self.selected_index = max(0, min(previous_index, len(self.items) - 1))
+            for i, item in enumerate(self.items):
+                if self.tool.get_item_key(item) == selected_key:
+                    self.selected_index = i
+                    break
+
+    def handle_filter_key(self, key: str) -> None:
+        """Edit the filter query while in / mode"""
+        if key == "\x1b":  # Esc drops the filter
+            self.filtering = False
+            self.filter_query = ""
+        elif key == "\r":  # Enter keeps the filter and returns to navigation
+            self.filtering = False
+            return
+        elif key in KEYS_BACKSPACE:
+            self.filter_query = self.filter_query[:-1]
+        elif key in KEYS_DOWN[1:]:
+            self.move_selection(1)
+            return
+        elif key in KEYS_UP[1:]:
+            self.move_selection(-1)
+            return
+        elif key.isprintable() and len(key) == 1:
+            self.filter_query += key
+        else:
+            return
+        self.apply_filter()
+
+    def navigation_step(self, key: str) -> Optional[int]:
+        """Rows key moves the selection by, None if it is not a navigation key"""
+        if key in KEYS_DOWN:
+            return 1
+        if key in KEYS_UP:
+            return -1
+        if key in KEYS_PAGE_DOWN:
+            return self.list_height
+        if key in KEYS_PAGE_UP:
+            return -self.list_height
+        if key in KEYS_HOME:
+            return -len(self.items)
+        if key in KEYS_END:
+            return len(self.items)
+        return None
+
+    def navigate(self, key: str) -> None:
+        """Move for key and every navigation key queued right behind it, as one move"""
+        index = self.selected_index
+        step = self.navigation_step(key)
+        while step is not None:
+            index = max(0, min(len(self.items) - 1, index + step))
+            if not self._pending_keys:
+                break
+            step = self.navigation_step(self._pending_keys[0])
+            if step is not None:
+                self._pending_keys.popleft()
+        self.move_selection(index - self.selected_index)
+
+    def move_selection(self, delta: int) -> None:
+        """Move the selection by delta rows, clamped to the list"""
+        self.selected_index = max(0, min(len(self.items) - 1, self.selected_index + delta))
+        if delta:
+            self.direction = 1 if delta > 0 else -1
+
+    def prepare_page(self, visible: range) -> None:
+        """Let the tool batch-fetch the previews of a newly shown page and queue them"""
+        page = self._prepared_page
+        if page is not None and page[0] == visible and page[1] is self.items:
+            return
+        self._prepared_page = (visible, self.items)
+        page_items = [self.items[i] for i in visible]
+        self.tool.prepare_previews(page_items)
+        if self.tool.prefetch_visible:
+            self.previews.prefetch(page_items)
+
+    def get_selected_preview(self) -> str:
+        """Return the cached preview of the selected item and prefetch its neighbours"""
+        selected_item = self.items[self.selected_index]
+        preview = self.previews.get(selected_item)
+
+        # Warm the cache for the next few items in the direction of travel
+        ahead = (self.selected_index + self.direction * step for step in range(1, self.PREFETCH_COUNT + 1))
+        self.previews.prefetch(self.items[i] for i in ahead if 0 <= i < len(self.items))
+
+        if preview is None:
+            return f"{Colors.DIM}{self.LOADING_PLACEHOLDER}{Colors.RESET}"
+        return preview
+
+    def toggle_follow(self) -> None:
+        """Start or stop following the selected item's output in the preview pane"""
+        self.following = not self.following
+        if not self.following:
+            self.stop_following()
+
+    def stop_following(self) -> None:
+        if self.log_stream is not None:
+            self.log_stream.close()
+        self.log_stream = None
+        self._log_stream_key = None
+
+    def get_followed_lines(self, count: int) -> List[str]:
+        """Return the last lines of the selected item's output, switching streams when the selection moved"""
+        item = self.items[self.selected_index]
+        key = self.tool.get_item_key(item)
+        if key != self._log_stream_key:
+            self.stop_following()
+            self.log_stream = self.tool.open_log_stream(item, self.wake)
+            self._log_stream_key = key
+        if self.log_stream is None:
+            return [f"{Colors.RED}Unable to follow the output of this item{Colors.RESET}"]
+        lines = self.log_stream.tail(count)
+        if self.log_stream.ended:
+            lines = lines[len(lines) - count + 1 :] if count > 1 else []
+            lines.append(f"{Colors.YELLOW}-- end of output --{Colors.RESET}")
+        return lines
+
+    def display_interface(self) -> None:
+        """Display the picker interface"""
+        cols, rows = self.renderer.get_size()
+        with self.phase("format"):
+            lines = self.build_frame(cols, rows)
+        with self.phase("write"):
+            written = self.renderer.render(lines)
+        if self.profiler is not None:
+            self.profiler.end_frame(bytes_written=written)
+
+    def build_frame(self, cols: int, rows: int) -> List[str]:
+        """Return the lines of the interface for a terminal of the given size"""
+        if not self.items and not self.all_items:
+            return [f"{Colors.RED}No {self.tool.name} items found{Colors.RESET}"]
 
         width = cols
+        lines = []
 
         # Calculate layout
         session_list_height = rows - self.preview_height - 5
 
         # Header with tool-specific emoji
-        tool_emoji = {"tmux": "🚀", "docker": "🐳", "gh": "🔀"}.get(self.tool.name, "🎯")
-        print(f"{Colors.BOLD}{Colors.BLUE}{'═' * width}{Colors.RESET}")
-        print(
+        tool_emoji = {"tmux": "🚀", "docker": "🐳", "gh": "🔀", "systemd": "🔧", "all": "🧰"}.get(self.tool.name, "🎯")
+        lines.append(f"{Colors.BOLD}{Colors.BLUE}{'═' * width}{Colors.RESET}")
+        lines.append(
             f"{Colors.BOLD}{Colors.WHITE} {tool_emoji} {self.tool.name.upper()} Picker {Colors.RESET}{Colors.DIM}(j/k navigate, Enter select, q quit){Colors.RESET}"
+            + self.get_filter_prompt()
+            + (f"  {Colors.DIM}⟳ refreshing…{Colors.RESET}" if self.refreshing else "")
         )
-        print(f"{Colors.BOLD}{Colors.BLUE}{'═' * width}{Colors.RESET}")
-
-        # Display items list
-        for i, item in enumerate(self.items):
-            if i < session_list_height - 3:  # Leave space for borders
-                if i == self.selected_index:
-                    marker = f"{Colors.BRIGHT_GREEN}▶ {Colors.RESET}"
-                    display = self.tool.get_item_display(item, True)
-                else:
-                    marker = f"{Colors.DIM}  {Colors.RESET}"
-                    display = self.tool.get_item_display(item, False)
+        lines.append(f"{Colors.BOLD}{Colors.BLUE}{'═' * width}{Colors.RESET}")
+
+        # Display only the items inside the viewport
+        self.list_height = max(1, session_list_height - 3)  # Leave space for borders
+        visible = self.viewport.scroll_to(self.selected_index, self.list_height, len(self.items))
+        with self.phase("preview"):
+            self.prepare_page(visible)
+        for i in visible:
+            item = self.items[i]
+            if i == self.selected_index:
+                marker = f"{Colors.BRIGHT_GREEN}▶ {Colors.RESET}"
+                display = self.tool.get_item_display(item, True)
+            else:
+                marker = f"{Colors.DIM}  {Colors.RESET}"
+                display = self.tool.get_item_display(item, False)
 
-                print(f"{marker}{display}")
+            lines.append(f"{marker}{display}")
+        if not self.items:
+            lines.append(f"{Colors.DIM}  no items match '{self.filter_query}'{Colors.RESET}")
 
         # Separator
-        print(f"{Colors.YELLOW}{'─' * width}{Colors.RESET}")
-        print(f"{Colors.BOLD}{Colors.YELLOW} 📋 Item Details & Preview{Colors.RESET}")
-        print(f"{Colors.YELLOW}{'─' * width}{Colors.RESET}")
-
-        # Display preview
-        if self.items:
-            selected_item = self.items[self.selected_index]
-            preview = self.tool.get_item_preview(selected_item)
-            preview_lines = preview.split("\n")
-
-            # Show preview content
-            available_lines = self.preview_height - 3  # Account for headers
-            for i, line in enumerate(preview_lines[:available_lines]):
-                # Truncate lines to fit terminal width
-                truncated_line = line[: width - 1] if line else ""
-                print(f"{Colors.DIM}{truncated_line}{Colors.RESET}")
+        position = f"{Colors.DIM}[{self.selected_index + 1 if self.items else 0}/{len(self.items)}]{Colors.RESET}"
+        lines.append(f"{Colors.YELLOW}{'─' * width}{Colors.RESET}")
+        if self.following:
+            title = f"📜 Following Output {Colors.RESET}{Colors.DIM}({self.tool.follow_key} to stop)"
+        else:
+            title = "📋 Item Details & Preview"
+        lines.append(f"{Colors.BOLD}{Colors.YELLOW} {title}{Colors.RESET} {position}")
+        lines.append(f"{Colors.YELLOW}{'─' * width}{Colors.RESET}")
+
+        # Display preview, padded to a fixed height so the controls line stays put
+        available_lines = self.preview_height - 3  # Account for headers
+        with self.phase("preview"):
+            if not self.items:
+                preview_lines = []
+            elif self.following:
+                preview_lines = self.get_followed_lines(available_lines)
+            else:
+                preview_lines = self.get_selected_preview().split("\n")
+        for line in preview_lines[:available_lines]:
+            lines.append(f"{Colors.DIM}{line}{Colors.RESET}")
+        lines.extend([""] * (available_lines - len(preview_lines)))
 
         # Display controls at bottom
-        controls = ["j/k: Navigate", "Enter: Select", "q: Quit"]
+        controls = ["j/k: Navigate", "PgUp/PgDn g/G: Jump", "/: Filter", "Enter: Select", "q: Quit"]
         additional_actions = self.tool.get_additional_actions()
         for key, desc in additional_actions.items():
             controls.append(f"{key}: {desc}")
 
-        print(f"\n{Colors.DIM}Controls: {' | '.join(controls)}{Colors.RESET}")
+        lines.append("")
+        lines.append(f"{Colors.DIM}Controls: {' | '.join(controls)}{Colors.RESET}")
+        return lines
+
+    def get_filter_prompt(self) -> str:
+        """Return the header suffix showing the active filter, if any"""
+        if self.filtering:
+            return f"  {Colors.BRIGHT_YELLOW}/{self.filter_query}▏{Colors.RESET}"
+        if self.filter_query:
+            return f"  {Colors.YELLOW}/{self.filter_query}{Colors.RESET} {Colors.DIM}(Esc clears){Colors.RESET}"
+        return ""
 
     def run(self) -> None:
         """Run the picker interface"""
@@ -532,75 +1577,233 @@ class CmdPicker:
             print(f"{Colors.RED}Error: {self.tool.name} is not available{Colors.RESET}")
             sys.exit(1)
 
-        self.items = self.tool.get_items()
+        if self.load_snapshot():
+            self.refresh_in_background()
+        else:
+            self.load_items()
 
         if not self.items:
             print(f"{Colors.RED}No {self.tool.name} items found{Colors.RESET}")
             sys.exit(1)
 
+        if self.live or self.tool.streams_items:
+            self.tool.watch(self.on_items_changed)
+        self.renderer.start(on_resize=self.wake)
+        try:
+            selected_item = self._loop()
+        finally:
+            if self._key_reader is not None:
+                self._key_reader.stop()
+            self.renderer.stop()
+            self.stop_following()
+            self.previews.shutdown()
+            if self.live or self.tool.streams_items:
+                self.tool.unwatch()
+            if self.profiler is not None:
+                self.profiler.report(sys.stderr)
+            self.close_wake_pipe()
+
+        if selected_item is not None:
+            self.tool.execute_action(selected_item)
+
+    def _loop(self) -> Optional[Dict[str, Any]]:
+        """Handle keys until the user quits (None) or picks an item (returned)"""
         while True:
-            self.display_interface()
+            if not self._pending_keys:
+                self.display_interface()
             key = self.get_key()
 
-            if key == "q":
-                break
-            elif key in ["j", "\x1b[B"]:  # j or down arrow
-                self.selected_index = min(len(self.items) - 1, self.selected_index + 1)
-            elif key in ["k", "\x1b[A"]:  # k or up arrow
-                self.selected_index = max(0, self.selected_index - 1)
-            elif key == "\r":  # Enter
-                selected_item = self.items[self.selected_index]
-                os.system("clear")
-                self.tool.execute_action(selected_item)
-                break
-            else:
-                # Check additional actions
-                if self.tool.handle_additional_action(key, self.items[self.selected_index]):
-                    # Refresh items if action was handled and might have changed state
-                    self.items = self.tool.get_items()
-                    if not self.items:
-                        break
-                    self.selected_index = min(self.selected_index, len(self.items) - 1)
-
-
-TOOLS = {
-    "tmux": TmuxTool(),
-    "docker": DockerTool(),
-    "gh": GhTool(),
-}
+            # Handling the keys typed since the last frame; time waiting for them is not counted
+            with self.phase("input"):
+                if key == "":  # woken by a background worker: pick up changes and redraw
+                    self.apply_refreshed_items()
+                    if self._quit_if_emptied and not self.refreshing and not self._items_changed.is_set():
+                        self._quit_if_emptied = False
+                        if not self.all_items:
+                            return None
+                    self.reload_if_changed()
+                    continue
+                elif self.filtering:
+                    self.handle_filter_key(key)
+                elif key == "/":
+                    self.filtering = True
+                elif key == "\x1b" and self.filter_query:
+                    self.handle_filter_key(key)
+                elif key == "q":
+                    return None
+                elif not self.items:
+                    continue  # everything is filtered out, only filter keys apply
+                elif self.navigation_step(key) is not None:
+                    self.navigate(key)
+                elif key == "\r":  # Enter
+                    return self.items[self.selected_index]
+                elif self.tool.follow_key is not None and key == self.tool.follow_key:
+                    self.toggle_follow()
+                else:
+                    # Check additional actions; they may print prompts over the frame
+                    with self.released_terminal(), self.phase("action"):
+                        handled = self.tool.handle_additional_action(key, self.items[self.selected_index])
+                    self.renderer.invalidate()
+                    if handled:
+                        # The action may have changed state: re-read the items without blocking the keys,
+                        # after a refresh already running if there is one
+                        self.previews.invalidate()
+                        self._items_changed.set()
+                        self.reload_if_changed()
+                        self._quit_if_emptied = not self.live
+
+
+def all_tool() -> AllTool:
+    """Every other registered tool, built-in or installed, in one list"""
+    tools = {}
+    for name in TOOLS:
+        if name == "all":
+            continue
+        try:
+            tools[name] = TOOLS[name]
+        except ToolLoadError:
+            pass  # a broken plugin leaves the others usable
+    return AllTool(tools, is_available=TOOLS.is_available)
+
+
+TOOLS = ToolRegistry()
+TOOLS.register("tmux", TmuxTool)
+TOOLS.register("docker", DockerTool)
+TOOLS.register("gh", GhTool)
+TOOLS.register("systemd", SystemdTool)
+TOOLS.register("all", all_tool)
+
+
+def daemon_tool(name: str, context: str) -> Optional[Tool]:
+    """The tool a daemon uses to answer for name in context, None if it cannot serve that context"""
+    if name == "all" or name not in TOOLS:
+        return None
+    try:
+        tool = TOOLS[name]
+    except ToolLoadError:
+        return None
+    if tool.get_snapshot_context() == context:
+        return tool
+    if isinstance(tool, GhTool):
+        # Any repository on our GitHub host can be served: GhTool passes it on with --repo
+        host, _, repo = context.partition("/")
+        owner, _, repo_name = repo.partition("/")
+        if host == os.environ.get("GH_HOST", "github.com") and owner and repo_name:
+            return GhTool(repo=(owner, repo_name))
+    return None
+
+
+def serve_daemon() -> None:
+    daemon = picker_daemon.PickerDaemon(daemon_tool)
+    try:
+        daemon.bind()
+    except picker_daemon.DaemonError as e:
+        print(f"{Colors.RED}Error: {e}{Colors.RESET}")
+        sys.exit(1)
+    print(f"{Colors.GREEN}cmd-picker daemon listening on {daemon.socket_path}{Colors.RESET}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
 
 
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Unified command picker for various tools",
         formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog=f"""
-Available tools:
-{chr(10).join(f"  {name}: {tool.description}" for name, tool in TOOLS.items())}
-
+        epilog="""
 Examples:
+  cmd_picker           # List the available tools, including installed ones
   cmd_picker tmux      # Pick tmux sessions
   cmd_picker docker    # Pick docker containers
   cmd_picker gh        # Pick GitHub pull requests
+  cmd_picker systemd   # Pick systemd user units, e.g. the ones durable-run starts
+  cmd_picker all       # Everything above in one list
+  cmd_picker --daemon  # Keep all tools warm; later pickers connect to it
+  cmd_picker docker --profile  # Time every frame by phase
         """,
     )
 
-    parser.add_argument("tool", nargs="?", choices=list(TOOLS.keys()), help="Tool to use for picking")
+    # Not argparse choices: those would construct every tool and scan for installed ones on each run
+    parser.add_argument("tool", nargs="?", help="Tool to use for picking")
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Follow changes made elsewhere (tmux: keeps a control-mode connection open)",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Wait for the current items instead of showing the ones saved by the last run first",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep the items and previews of all tools warm in memory and serve them to later pickers",
+    )
+    parser.add_argument("--no-daemon", action="store_true", help="Do not use a running daemon")
+    # $CMD_PICKER_PROFILE: "1" profiles, any other value is also the trace path
+    profile_env = os.environ.get("CMD_PICKER_PROFILE", "")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=bool(profile_env),
+        help="Time each frame by phase and print a summary on exit (default: $CMD_PICKER_PROFILE)",
+    )
+    parser.add_argument(
+        "--profile-trace",
+        metavar="TRACE.json",
+        default=profile_env if profile_env not in ("", "1") else None,
+        help="Also write a JSON trace of every frame to this path; implies --profile",
+    )
 
     args = parser.parse_args()
 
+    if args.daemon:
+        serve_daemon()
+        return
+
+    if args.tool and args.tool not in TOOLS:
+        parser.error(f"unknown tool {args.tool!r} (choose from {', '.join(TOOLS)})")
+
     if not args.tool:
         # Show available tools if no tool specified
         print(f"{Colors.BOLD}🎯 Command Picker{Colors.RESET}")
         print("Available tools:\n")
-        for name, tool in TOOLS.items():
-            available = "✅" if tool.is_available() else "❌"
-            print(f"  {available} {Colors.GREEN}{name}{Colors.RESET}: {tool.description}")
+        for name in TOOLS:
+            try:
+                description = TOOLS[name].description
+            except ToolLoadError as e:
+                description = f"{Colors.RED}{e}{Colors.RESET}"
+            available = "✅" if TOOLS.is_available(name) else "❌"
+            print(f"  {available} {Colors.GREEN}{name}{Colors.RESET}: {description}")
         print("\nUsage: cmd_picker <tool>")
         return
 
-    tool = TOOLS[args.tool]
-    picker = CmdPicker(tool)
+    try:
+        tool = TOOLS[args.tool]
+    except ToolLoadError as e:
+        print(f"{Colors.RED}Error: {e}{Colors.RESET}")
+        sys.exit(1)
+    client = None
+    # No socket, no daemon: skip the connection attempt
+    if not args.no_daemon and os.path.exists(picker_daemon.default_socket_path()):
+        client = picker_daemon.DaemonClient()
+        if not client.ping():
+            client = None
+    if isinstance(tool, AllTool):
+        # The daemon warms each tool on its own, so ask it per backend rather than for the merged list
+        tools = {name: DaemonTool(t, client) if client else t for name, t in tool.tools.items()}
+        tool = AllTool(tools, live=args.live, is_available=TOOLS.is_available)
+    elif client is not None:
+        tool = DaemonTool(tool, client)
+    profiler = None
+    if args.profile or args.profile_trace:
+        profiler = frame_profiler.FrameProfiler(trace_path=args.profile_trace)
+    picker = CmdPicker(tool, snapshots=None if args.fresh else SnapshotStore(), profiler=profiler)
+    picker.live = args.live
     picker.run()
 
 
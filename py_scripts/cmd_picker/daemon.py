@@ -0,0 +1,291 @@
+"""Resident cmd-picker daemon and the client the picker uses to reach it.
+
+``cmd-picker --daemon`` keeps the item list of every tool and context it is
+asked about in memory, refreshes it in the background (at once when a tool
+reports a change through Tool.watch) and precomputes the previews of the
+first rows. A picker started while the daemon runs gets a ready item list
+and cached previews over a Unix domain socket instead of running tmux,
+docker or gh itself; actions and log streams still run in the picker.
+
+The protocol is one JSON object per line in each direction. Requests carry
+an ``op`` ("ping", "items", "preview" or "stop"), answers ``ok`` plus the
+result or an ``error`` message.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from py_scripts.cmd_picker.preview import PreviewCache, PreviewEngine
+
+if TYPE_CHECKING:
+    from py_scripts.cmd_picker.cmd_picker import Tool
+
+# Previews computed ahead for each list, roughly one screen of rows
+WARM_PREVIEWS = 16
+
+
+def default_socket_path() -> str:
+    if os.environ.get("CMD_PICKER_SOCKET"):
+        return os.environ["CMD_PICKER_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "cmd-picker.sock")
+    return f"/tmp/cmd-picker-{os.getuid()}.sock"
+
+
+class DaemonError(Exception):
+    """The daemon could not be reached or could not answer"""
+
+
+class WarmEntry:
+    """Items and previews of one tool in one context, kept fresh by a background thread"""
+
+    def __init__(self, tool: "Tool", idle_timeout: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.tool = tool
+        # Items older than the preview TTL are refetched; watched tools also refresh on change
+        self.interval = max(tool.preview_ttl, 1.0)
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self.items: Optional[List[Dict[str, Any]]] = None
+        self.fetched_at = 0.0
+        self.last_used = clock()
+        self.closed = False
+        self.previews = PreviewEngine(
+            tool.get_item_preview, key=tool.get_item_key, cache=PreviewCache(ttl=tool.preview_ttl)
+        )
+        self._fetch_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._refresher, name=f"warm-{tool.name}", daemon=True)
+
+    def start(self) -> "WarmEntry":
+        self.tool.watch(self._wake.set)
+        self._thread.start()
+        return self
+
+    def get_items(self) -> List[Dict[str, Any]]:
+        self.last_used = self._clock()
+        if self.items is None:
+            self.refresh()
+        return self.items or []
+
+    def refresh(self) -> None:
+        with self._fetch_lock:
+            items = self.tool.get_items()
+            self.items = items
+            self.fetched_at = self._clock()
+        self.previews.expire()
+        self.tool.prepare_previews(items[:WARM_PREVIEWS])
+        self.previews.prefetch(items[:WARM_PREVIEWS])
+
+    def get_preview(self, item: Dict[str, Any]) -> str:
+        """Cached preview of item, computed here and now on a miss"""
+        self.last_used = self._clock()
+        key = self.tool.get_item_key(item)
+        preview = self.previews.cache.get(key)
+        if preview is None:
+            preview = self.tool.get_item_preview(item)
+            self.previews.cache.put(key, preview)
+        return preview
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake.set()
+        self.tool.unwatch()
+        self.previews.shutdown()
+
+    def _refresher(self) -> None:
+        while not self.closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self.closed:
+                return
+            if self._clock() - self.last_used > self.idle_timeout:
+                self.close()  # nobody asked in a while, stop polling the backend
+                return
+            try:
+                self.refresh()
+            except Exception:
+                pass  # keep serving the last good list and try again next interval
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                response = self.server.picker_daemon.handle(json.loads(line))
+            except ValueError:
+                response = {"ok": False, "error": "malformed request"}
+            try:
+                self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+            except OSError:
+                return
+            if response.get("stopping"):
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class PickerDaemon:
+    """Answers picker requests from warm entries, one per (tool, context)
+
+    make_tool returns the tool serving a context, or None when this daemon
+    cannot serve it (the picker then falls back to running the tool itself).
+    """
+
+    def __init__(
+        self,
+        make_tool: Callable[[str, str], Optional["Tool"]],
+        socket_path: Optional[str] = None,
+        idle_timeout: float = 600.0,
+    ):
+        self.make_tool = make_tool
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.entries: Dict[Tuple[str, str], WarmEntry] = {}
+        self._lock = threading.Lock()
+        self.server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def entry(self, tool_name: str, context: str) -> Optional[WarmEntry]:
+        with self._lock:
+            entry = self.entries.get((tool_name, context))
+            if entry is None or entry.closed:
+                tool = self.make_tool(tool_name, context)
+                if tool is None:
+                    return None
+                entry = self.entries[(tool_name, context)] = WarmEntry(tool, self.idle_timeout).start()
+            return entry
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "stop":
+            return {"ok": True, "stopping": True}
+        if op not in ("items", "preview"):
+            return {"ok": False, "error": f"unknown op {op!r}"}
+
+        entry = self.entry(str(request.get("tool")), str(request.get("context")))
+        if entry is None:
+            return {"ok": False, "error": f"cannot serve {request.get('tool')} in {request.get('context')}"}
+        try:
+            if op == "preview":
+                return {"ok": True, "preview": entry.get_preview(request["item"])}
+            if request.get("refresh"):
+                entry.refresh()
+            return {"ok": True, "items": entry.get_items()}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def bind(self) -> None:
+        """Listen on socket_path, replacing a stale socket but never a live daemon"""
+        if os.path.exists(self.socket_path):
+            if DaemonClient(self.socket_path, timeout=1.0).ping():
+                raise DaemonError(f"a daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, _RequestHandler, bind_and_activate=False)
+        server.daemon_threads = True
+        server.picker_daemon = self
+        old_umask = os.umask(0o177)  # the socket hands out session names and PR data: owner only
+        try:
+            server.server_bind()
+        finally:
+            os.umask(old_umask)
+        server.server_activate()
+        self.server = server
+
+    def serve_forever(self) -> None:
+        if self.server is None:
+            self.bind()
+        assert self.server is not None
+        try:
+            self.server.serve_forever(0.2)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        with self._lock:
+            entries, self.entries = list(self.entries.values()), {}
+        for entry in entries:
+            entry.close()
+
+
+class DaemonClient:
+    """Talks to a PickerDaemon, one connection per thread"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 30.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and return the answer; raises DaemonError on failure or error answers"""
+        reused = getattr(self._local, "conn", None) is not None
+        try:
+            response = self._send(payload)
+        except (OSError, ValueError) as e:
+            if not reused:
+                raise DaemonError(f"cannot reach cmd-picker daemon at {self.socket_path}: {e}") from e
+            try:
+                response = self._send(payload)  # the daemon restarted since the last request
+            except (OSError, ValueError) as retry_error:
+                raise DaemonError(f"cannot reach cmd-picker daemon at {self.socket_path}: {retry_error}") from e
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "request failed"))
+        return response
+
+    def ping(self) -> bool:
+        try:
+            self.request({"op": "ping"})
+            return True
+        except DaemonError:
+            return False
+
+    def items(self, tool: str, context: str, refresh: bool = False) -> List[Dict[str, Any]]:
+        return self.request({"op": "items", "tool": tool, "context": context, "refresh": refresh})["items"]
+
+    def preview(self, tool: str, context: str, item: Dict[str, Any]) -> str:
+        return self.request({"op": "preview", "tool": tool, "context": context, "item": item})["preview"]
+
+    def stop(self) -> None:
+        self.request({"op": "stop"})
+        self.close()
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        sock, reader = conn
+        try:
+            sock.sendall(json.dumps(payload, default=str).encode() + b"\n")
+            line = reader.readline()
+            if not line:
+                raise ConnectionResetError("daemon closed the connection")
+            return json.loads(line)
+        except (OSError, ValueError):
+            self.close()
+            raise
@@ -0,0 +1,252 @@
+"""Minimal Docker Engine API client over the daemon's Unix socket.
+
+Talking HTTP to ``/var/run/docker.sock`` directly skips the docker CLI's
+startup cost on every call. Each thread keeps its own keep-alive connection,
+so listing, inspecting and tailing logs reuse one socket per worker.
+"""
+
+import http.client
+import json
+import os
+import socket
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+
+
+class DockerAPIError(Exception):
+    """The daemon could not be reached or answered with an error status"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects to a Unix domain socket instead of TCP"""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def is_multiplexed(data: bytes) -> bool:
+    """True if data starts with the stream header of a non-TTY container's logs"""
+    return len(data) >= 8 and data[0] in (0, 1, 2) and data[1:4] == b"\0\0\0"
+
+
+def demux_logs(data: bytes) -> str:
+    """Decode a logs response, stripping the stream headers of non-TTY containers
+
+    Without a TTY the daemon prefixes every chunk with an 8 byte header:
+    stream type (0-2), three zero bytes and the big-endian payload size.
+    """
+    if not is_multiplexed(data):
+        return data.decode(errors="replace")
+    chunks = []
+    pos = 0
+    while pos + 8 <= len(data):
+        size = int.from_bytes(data[pos + 4 : pos + 8], "big")
+        chunks.append(data[pos + 8 : pos + 8 + size])
+        pos += 8 + size
+    return b"".join(chunks).decode(errors="replace")
+
+
+class LogDemuxer:
+    """Incremental demux_logs for a followed stream, whose chunks split frames anywhere"""
+
+    def __init__(self):
+        self.multiplexed: Optional[bool] = None
+        self._pending = b""
+        self._remaining = 0  # payload bytes left in the current frame
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._pending + data
+        self._pending = b""
+        if self.multiplexed is None:
+            if len(data) < 8 and data[:1] in (b"\0", b"\1", b"\2"):
+                self._pending = data  # wait for a full header before deciding
+                return b""
+            self.multiplexed = is_multiplexed(data)
+        if not self.multiplexed:
+            return data
+
+        out = []
+        pos = 0
+        while pos < len(data):
+            if self._remaining:
+                payload = data[pos : pos + self._remaining]
+                out.append(payload)
+                self._remaining -= len(payload)
+                pos += len(payload)
+            elif len(data) - pos >= 8:
+                self._remaining = int.from_bytes(data[pos + 4 : pos + 8], "big")
+                pos += 8
+            else:
+                self._pending = data[pos:]
+                break
+        return b"".join(out)
+
+
+class DockerAPI:
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 5.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> Optional["DockerAPI"]:
+        """Client for $DOCKER_HOST, or None when it is not a unix:// socket"""
+        host = os.environ.get("DOCKER_HOST", "")
+        if not host:
+            return cls()
+        if host.startswith("unix://"):
+            return cls(host[len("unix://") :])
+        return None
+
+    def available(self) -> bool:
+        """True if the socket exists and we may talk to it"""
+        return os.access(self.socket_path, os.R_OK | os.W_OK)
+
+    def request(self, method: str, path: str, query: Optional[Dict[str, Any]] = None) -> bytes:
+        """Send a request and return the response body
+
+        A request failing on a reused connection is retried once on a fresh
+        one, since the daemon may have closed an idle keep-alive socket.
+        """
+        url = path + ("?" + urlencode(query) if query else "")
+        reused = getattr(self._local, "used", False)
+        try:
+            status, body = self._send(method, url)
+        except (OSError, http.client.HTTPException) as e:
+            if not reused:
+                raise DockerAPIError(f"cannot reach docker at {self.socket_path}: {e}") from e
+            try:
+                status, body = self._send(method, url)
+            except (OSError, http.client.HTTPException) as retry_error:
+                raise DockerAPIError(f"cannot reach docker at {self.socket_path}: {retry_error}") from retry_error
+        if status >= 400:
+            raise DockerAPIError(f"{method} {path}: HTTP {status}", status=status)
+        return body
+
+    def _send(self, method: str, url: str) -> Tuple[int, bytes]:
+        conn = self._connection()
+        try:
+            conn.request(method, url)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self._close_connection()
+            raise
+        self._local.used = True
+        if response.will_close:
+            self._close_connection()
+        return response.status, body
+
+    def get_json(self, path: str, query: Optional[Dict[str, Any]] = None) -> Any:
+        try:
+            return json.loads(self.request("GET", path, query))
+        except json.JSONDecodeError as e:
+            raise DockerAPIError(f"GET {path}: invalid JSON") from e
+
+    def list_containers(self, include_stopped: bool = True) -> List[Dict[str, Any]]:
+        return self.get_json("/containers/json", {"all": int(include_stopped)})
+
+    def inspect(self, container_id: str) -> Dict[str, Any]:
+        return self.get_json(f"/containers/{quote(container_id, safe='')}/json")
+
+    def inspect_many(self, container_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Inspect several containers back to back over the same connection
+
+        Containers that disappeared in the meantime are left out.
+        """
+        results = {}
+        for container_id in container_ids:
+            try:
+                results[container_id] = self.inspect(container_id)
+            except DockerAPIError as e:
+                if e.status != 404:
+                    raise
+        return results
+
+    def logs(self, container_id: str, tail: int = 20) -> str:
+        query = {"stdout": 1, "stderr": 1, "tail": tail}
+        return demux_logs(self.request("GET", f"/containers/{quote(container_id, safe='')}/logs", query))
+
+    def open_stream(self, path: str, query: Optional[Dict[str, Any]] = None) -> Tuple[UnixHTTPConnection, Any]:
+        """Start a long-running request on a connection of its own
+
+        Returns the connection and the response, which is read as data
+        arrives. Closing the connection ends the request.
+        """
+        conn = UnixHTTPConnection(self.socket_path, self.timeout)
+        try:
+            conn.request("GET", path + ("?" + urlencode(query) if query else ""))
+            response = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise DockerAPIError(f"cannot reach docker at {self.socket_path}: {e}") from e
+        if response.status >= 400:
+            conn.close()
+            raise DockerAPIError(f"GET {path}: HTTP {response.status}", status=response.status)
+        if conn.sock is not None:
+            conn.sock.settimeout(None)  # a followed container may stay quiet for a long time
+        return conn, response
+
+    def follow_logs(self, container_id: str, tail: int = 100) -> Tuple[Iterator[bytes], Callable[[], None]]:
+        """Stream a container's output as it is written
+
+        Returns the demultiplexed chunks and a function that stops the
+        stream from another thread, ending the iteration.
+        """
+        query = {"follow": 1, "stdout": 1, "stderr": 1, "tail": tail}
+        conn, response = self.open_stream(f"/containers/{quote(container_id, safe='')}/logs", query)
+        demuxer = LogDemuxer()
+
+        def chunks() -> Iterator[bytes]:
+            try:
+                while True:
+                    data = response.read1(65536)
+                    if not data:
+                        return
+                    yield demuxer.feed(data)
+            except http.client.HTTPException:
+                return
+            finally:
+                conn.close()
+
+        def stop() -> None:
+            if conn.sock is not None:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+
+        return chunks(), stop
+
+    def close(self) -> None:
+        self._close_connection()
+
+    def _connection(self) -> UnixHTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = UnixHTTPConnection(self.socket_path, self.timeout)
+            self._local.conn = conn
+            self._local.used = False
+        return conn
+
+    def _close_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+        self._local.used = False
@@ -0,0 +1,193 @@
+"""GitHub GraphQL data layer for GhTool.
+
+One paginated query returns the open pull requests of a repository together
+with their last commits and changed file paths, so the picker can show every
+preview without further requests. Results are kept on disk per repository
+and reused while younger than ``max_age``; when GitHub cannot be reached an
+older copy is served instead.
+
+Past ``max_age`` the store first asks the REST pull request list, through
+the shared ETag cache, whether anything changed. An unchanged list is
+answered with a 304, which costs no rate limit, and the GraphQL query is
+skipped. That list is only asked for once there is a copy to keep, so a
+cold start costs the GraphQL query alone.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from py_scripts.http_cache.github import GitHubAPI, GitHubAPIError, GitHubGraphQL, GitHubGraphQLError
+
+__all__ = ["GitHubGraphQLError", "PullRequestClient", "PullRequestStore", "to_item"]
+
+PULL_REQUESTS_QUERY = """
+query($owner: String!, $name: String!, $cursor: String, $pageSize: Int!, $commits: Int!, $files: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(states: OPEN, first: $pageSize, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number title state url headRefName baseRefName createdAt updatedAt additions deletions changedFiles
+        author { login }
+        commits(last: $commits) { nodes { commit { oid messageHeadline author { name } } } }
+        files(first: $files) { nodes { path } }
+      }
+    }
+  }
+}
+"""
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "cmd-picker" / "gh"
+
+
+def to_item(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a pullRequest node to the item shape of `gh pr list --json`, plus commits and files"""
+    item = {key: value for key, value in node.items() if key not in ("commits", "files")}
+    item["author"] = node.get("author") or {"login": "ghost"}
+    item["commits"] = [entry["commit"] for entry in (node.get("commits") or {}).get("nodes") or []]
+    item["files"] = [entry["path"] for entry in (node.get("files") or {}).get("nodes") or []]
+    return item
+
+
+class PullRequestClient(GitHubGraphQL):
+    """GraphQL client paging through the open pull requests of a repository"""
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        token: Optional[str] = None,
+        timeout: float = 10.0,
+        commits: int = 5,
+        files: int = 10,
+        page_size: int = 50,
+        max_items: int = 500,
+    ):
+        super().__init__(endpoint, token, timeout)
+        self.commits = commits
+        self.files = files
+        self.page_size = page_size
+        self.max_items = max_items
+
+    def pull_requests(self, owner: str, name: str) -> List[Dict[str, Any]]:
+        """Open pull requests of owner/name, newest first, each with its last commits and changed files"""
+        items: List[Dict[str, Any]] = []
+        cursor = None
+        while len(items) < self.max_items:
+            variables = {
+                "owner": owner,
+                "name": name,
+                "cursor": cursor,
+                "pageSize": min(self.page_size, self.max_items - len(items)),
+                "commits": self.commits,
+                "files": self.files,
+            }
+            repository = self.query(PULL_REQUESTS_QUERY, variables).get("repository")
+            if repository is None:
+                raise GitHubGraphQLError(f"repository {owner}/{name} not found")
+            connection = repository["pullRequests"]
+            items.extend(to_item(node) for node in connection["nodes"])
+            if not connection["pageInfo"]["hasNextPage"]:
+                break
+            cursor = connection["pageInfo"]["endCursor"]
+        return items
+
+
+class PullRequestStore:
+    """Pull requests per repository, fetched in bulk and cached on disk
+
+    With rest set, an expired copy is kept when the REST pull request list
+    shows no change since it was fetched.
+    """
+
+    def __init__(
+        self,
+        client: Optional[PullRequestClient] = None,
+        cache_dir: Optional[Path] = None,
+        max_age: float = 60.0,
+        clock: Callable[[], float] = time.time,
+        rest: Optional[GitHubAPI] = None,
+    ):
+        self.client = client if client is not None else PullRequestClient()
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self.max_age = max_age
+        self._clock = clock
+        self.rest = rest
+
+    def cache_path(self, owner: str, name: str) -> Path:
+        return self.cache_dir / f"{owner}__{name}.json"
+
+    def get(self, owner: str, name: str) -> List[Dict[str, Any]]:
+        """Return the open pull requests, from disk when recent enough
+
+        Raises GitHubGraphQLError when they can neither be fetched nor read
+        from an earlier run.
+        """
+        cached = self._read(owner, name)
+        if cached is not None and self._clock() - cached[0] <= self.max_age:
+            return cached[1]
+
+        fingerprint = self.fingerprint(owner, name) if cached is not None else None
+        if fingerprint is not None and fingerprint == cached[2]:
+            self._write(owner, name, cached[1], fingerprint)
+            return cached[1]
+
+        try:
+            items = self.client.pull_requests(owner, name)
+        except GitHubGraphQLError:
+            if cached is not None:
+                return cached[1]  # stale beats nothing while offline
+            raise
+        self._write(owner, name, items, fingerprint)
+        return items
+
+    def fingerprint(self, owner: str, name: str) -> Optional[List[List[Any]]]:
+        """Number, head commit and update time of the 100 most recently updated open PRs
+
+        Any new, pushed-to or edited PR moves to the top of this list, and a
+        closed one drops out of it, so an equal fingerprint means the cached
+        items are still current. With more than 100 open PRs, one closed
+        from outside the top 100 changes nothing here: it stays listed until
+        another PR changes or the cache is invalidated.
+        """
+        if self.rest is None:
+            return None
+        try:
+            pulls = self.rest.get_json(
+                f"/repos/{owner}/{name}/pulls",
+                {"state": "open", "sort": "updated", "direction": "desc", "per_page": 100},
+            )
+            return [[pr["number"], pr["head"]["sha"], pr["updated_at"]] for pr in pulls]
+        except (GitHubAPIError, KeyError, TypeError):
+            return None
+
+    def invalidate(self, owner: str, name: str) -> None:
+        """Forget the cached list, e.g. after merging or creating a pull request"""
+        try:
+            self.cache_path(owner, name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _read(self, owner: str, name: str) -> Optional[Tuple[float, List[Dict[str, Any]], Optional[list]]]:
+        try:
+            with open(self.cache_path(owner, name)) as f:
+                data = json.load(f)
+            return float(data["fetched_at"]), data["items"], data.get("fingerprint")
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write(self, owner: str, name: str, items: List[Dict[str, Any]], fingerprint: Optional[list]) -> None:
+        path = self.cache_path(owner, name)
+        data = {"fetched_at": self._clock(), "fingerprint": fingerprint, "items": items}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the cache is an optimisation, never a reason to fail
@@ -0,0 +1,151 @@
+"""Keyboard input for CmdPicker.
+
+KeyReader switches the terminal to raw mode once for the whole session and
+returns everything typed so far in one read, so keys that queue up while a
+frame is drawn are handled together before the next one. KeyParser splits
+the bytes into keys. It recognises escape sequences by their structure (CSI
+``ESC [ parameters final``, SS3 ``ESC O x``, Alt+key ``ESC x``) rather than
+by length, so ``\\x1b[5~`` or ``\\x1b[1;5A`` arrive as one key even when the
+terminal sends them over several reads. A lone Esc is reported once nothing
+follows it within ESC_TIMEOUT.
+"""
+
+import codecs
+import os
+import select
+import termios
+import tty
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+ESC = "\x1b"
+# Seconds to wait for the rest of an escape sequence before taking Esc as a key press
+ESC_TIMEOUT = 0.05
+
+
+class KeyParser:
+    """Incremental parser turning terminal input into keys, one string per key"""
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        # Start of an escape sequence whose remaining bytes have not arrived yet
+        self._pending = ""
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._pending)
+
+    def feed(self, data: bytes) -> List[str]:
+        """Keys completed by data; an unfinished escape sequence is kept for the next call"""
+        text = self._pending + self._decoder.decode(data)
+        self._pending = ""
+        keys = []
+        start = 0
+        while start < len(text):
+            if text[start] != ESC:
+                keys.append(text[start])
+                start += 1
+                continue
+            end = self._sequence_end(text, start)
+            if end is None:
+                self._pending = text[start:]
+                break
+            keys.append(text[start:end])
+            start = end
+        return keys
+
+    def flush(self) -> List[str]:
+        """Nothing more arrived: report the unfinished sequence (usually a lone Esc) as it is"""
+        pending, self._pending = self._pending, ""
+        return [pending] if pending else []
+
+    @staticmethod
+    def _sequence_end(text: str, start: int) -> Optional[int]:
+        """Index just past the escape sequence at start, None if it continues beyond text"""
+        if start + 1 >= len(text):
+            return None
+        introducer = text[start + 1]
+        if introducer == "[":
+            for end in range(start + 2, len(text)):
+                code = ord(text[end])
+                if 0x40 <= code <= 0x7E:  # final byte
+                    return end + 1
+                if not 0x20 <= code <= 0x3F:  # not a parameter or intermediate byte: malformed, cut here
+                    return end
+            return None
+        if introducer == "O":
+            return start + 3 if start + 3 <= len(text) else None
+        if introducer == ESC:
+            return start + 1  # Esc pressed twice
+        return start + 2  # Alt+key
+
+
+class KeyReader:
+    """Reads keys from a terminal kept in raw mode between start and stop
+
+    wake_fd is the read end of a self-pipe: a byte written to it makes a
+    waiting read return, with "" as its first key.
+    """
+
+    def __init__(self, fd: int, wake_fd: Optional[int] = None, esc_timeout: float = ESC_TIMEOUT):
+        self.fd = fd
+        self.wake_fd = wake_fd
+        self.esc_timeout = esc_timeout
+        self.parser = KeyParser()
+        self._saved: Optional[list] = None
+
+    def start(self) -> None:
+        if self._saved is not None or not os.isatty(self.fd):
+            return
+        self._saved = termios.tcgetattr(self.fd)
+        self._enter_raw_mode()
+
+    def stop(self) -> None:
+        saved, self._saved = self._saved, None
+        if saved is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, saved)
+
+    @contextmanager
+    def suspended(self) -> Iterator[None]:
+        """Give the terminal back in its normal mode, e.g. while a tool prompts with input()"""
+        if self._saved is None:
+            yield
+            return
+        termios.tcsetattr(self.fd, termios.TCSADRAIN, self._saved)
+        try:
+            yield
+        finally:
+            # Whatever mode the prompt left behind, stop() still restores the one from start()
+            self._enter_raw_mode()
+
+    def _enter_raw_mode(self) -> None:
+        tty.setraw(self.fd, termios.TCSANOW)
+        # Keep output processing, so text printed by tools still starts at the left edge
+        mode = termios.tcgetattr(self.fd)
+        mode[1] |= termios.OPOST
+        termios.tcsetattr(self.fd, termios.TCSANOW, mode)
+
+    def read(self, timeout: Optional[float] = None) -> List[str]:
+        """Every key typed so far, waiting up to timeout (None: forever) for the first
+
+        Returns [] when the timeout passed and [""] + keys when woken up.
+        Raises EOFError once the input is closed.
+        """
+        fds = [self.fd] if self.wake_fd is None else [self.fd, self.wake_fd]
+        ready, _, _ = select.select(fds, [], [], timeout)
+        keys = []
+        if self.wake_fd is not None and self.wake_fd in ready:
+            os.read(self.wake_fd, 1024)
+            keys.append("")
+        if self.fd not in ready:
+            return keys
+        data = os.read(self.fd, 4096)
+        if not data:
+            raise EOFError("input closed")
+        keys += self.parser.feed(data)
+        while self.parser.pending and select.select([self.fd], [], [], self.esc_timeout)[0]:
+            data = os.read(self.fd, 4096)
+            if not data:
+                break
+            keys += self.parser.feed(data)
+        return keys + self.parser.flush()
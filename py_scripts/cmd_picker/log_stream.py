@@ -0,0 +1,146 @@
+"""Live log following for CmdPicker's log pane.
+
+A LogStream reads an item's output on a background thread into a ring
+buffer holding at most ``max_lines`` lines of at most ``max_line_length``
+characters, so memory stays constant however much a source writes.
+Change notifications are throttled to ``max_fps`` per second: a source
+printing thousands of lines per second still causes only a handful of
+redraws, each showing the latest lines.
+"""
+
+import codecs
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Iterable, List, Optional
+
+
+class LogBuffer:
+    """Ring buffer of the last max_lines lines of a text stream"""
+
+    def __init__(self, max_lines: int = 500, max_line_length: int = 1000):
+        self.max_lines = max_lines
+        self.max_line_length = max_line_length
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self.partial = ""
+        self.total_lines = 0
+
+    def feed(self, text: str) -> None:
+        """Append text, which may start or end in the middle of a line"""
+        pieces = text.split("\n")
+        if len(pieces) == 1:
+            self.partial = (self.partial + text)[: self.max_line_length]
+            return
+        first = (self.partial + pieces[0])[: self.max_line_length]
+        self.partial = pieces[-1][: self.max_line_length]
+        complete = pieces[:-1]
+        self.total_lines += len(complete)
+        # Only the newest max_lines can survive, skip the rest outright
+        if len(complete) > self.max_lines:
+            complete = complete[-self.max_lines :]
+        else:
+            complete[0] = first
+        self.lines.extend(line[: self.max_line_length].rstrip("\r") for line in complete)
+
+    def tail(self, count: int) -> List[str]:
+        """Return the last count lines, including an unterminated last line"""
+        if count <= 0:
+            return []
+        lines = list(self.lines)
+        if self.partial:
+            lines.append(self.partial.rstrip("\r"))
+        return lines[-count:]
+
+
+class LogStream:
+    """Follow a byte stream on a background thread
+
+    chunks yields the raw output as it arrives and ends at EOF; stop must make
+    a pending read return (e.g. by closing the pipe or socket) so that close()
+    does not wait for the source's next write.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        stop: Callable[[], None],
+        on_update: Optional[Callable[[], None]] = None,
+        max_lines: int = 500,
+        max_line_length: int = 1000,
+        max_fps: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.chunks = chunks
+        self.stop = stop
+        self.on_update = on_update
+        self.min_interval = 1.0 / max_fps
+        self.buffer = LogBuffer(max_lines, max_line_length)
+        self.ended = False
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_update = float("-inf")
+        self._update_pending = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "LogStream":
+        self._thread = threading.Thread(target=self._reader, name="log-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def tail(self, count: int) -> List[str]:
+        with self._lock:
+            return self.buffer.tail(count)
+
+    def close(self) -> None:
+        """Stop following; safe to call more than once"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self.stop()
+        except OSError:
+            pass
+
+    def _reader(self) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            for chunk in self.chunks:
+                text = decoder.decode(chunk)
+                with self._lock:
+                    if self._closed:
+                        break
+                    self.buffer.feed(text)
+                self._changed()
+        except (OSError, ValueError):
+            pass  # the source went away or was closed under us
+        with self._lock:
+            self.ended = True
+        self._changed()
+
+    def _changed(self) -> None:
+        """Report new output, at most once per min_interval"""
+        with self._lock:
+            if self._update_pending or self._closed:
+                return
+            delay = self._last_update + self.min_interval - self._clock()
+            if delay > 0:
+                # Coalesce everything arriving until then into one update
+                self._update_pending = True
+                timer = threading.Timer(delay, self._deliver)
+                timer.daemon = True
+                timer.start()
+                return
+            self._last_update = self._clock()
+        if self.on_update is not None:
+            self.on_update()
+
+    def _deliver(self) -> None:
+        with self._lock:
+            self._update_pending = False
+            self._last_update = self._clock()
+            if self._closed:
+                return
+        if self.on_update is not None:
+            self.on_update()
@@ -0,0 +1,193 @@
+"""Background preview computation for CmdPicker.
+
+Previews are produced by worker threads and kept in a small LRU cache whose
+entries expire after a TTL. The picker asks for a preview on every frame; a
+cache hit is returned immediately, a miss schedules the work and returns
+``None`` so the caller can draw a placeholder and redraw once ``on_ready``
+fires.
+
+Each computation runs under its own CancelToken: when another item becomes
+the selection, the commands still running for the previous one are killed
+instead of holding a worker and a command slot.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from py_scripts.cmd_picker.runner import CancelToken, CommandCancelled, cancel_scope
+
+
+class PreviewCache:
+    """LRU cache of preview strings with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[str]:
+        """Return the cached value, or None if missing (or expired unless allow_stale)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if not allow_stale and self._clock() - stored_at > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def expire(self) -> None:
+        """Mark every entry stale; stale values are still served while they refresh"""
+        with self._lock:
+            for key, (_, value) in self._entries.items():
+                self._entries[key] = (float("-inf"), value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class PreviewEngine:
+    """Compute previews on a worker pool, most recent request first.
+
+    The selected item always goes ahead of prefetches, and both queues are
+    served newest-first with the oldest prefetches dropped once the queue is
+    full, so holding a navigation key never builds an ever-growing backlog.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[Dict[str, Any]], str],
+        key: Callable[[Dict[str, Any]], Hashable],
+        on_ready: Optional[Callable[[], None]] = None,
+        workers: int = 4,
+        max_pending: int = 16,
+        cache: Optional[PreviewCache] = None,
+    ):
+        self.compute = compute
+        self.key = key
+        self.on_ready = on_ready
+        self.workers = workers
+        self.max_pending = max_pending
+        self.cache = cache if cache is not None else PreviewCache()
+        self._urgent: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._prefetch: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        # Computations running now: key -> (token, whether it was for the selected item)
+        self._inflight: Dict[Hashable, Tuple[CancelToken, bool]] = {}
+        self._cond = threading.Condition()
+        self._threads: list = []
+        self._closed = False
+
+    def get(self, item: Dict[str, Any]) -> Optional[str]:
+        """Return the preview for item, scheduling it when not cached.
+
+        An expired entry is still returned while its refresh runs in the
+        background; None means nothing is available yet.
+        """
+        item_key = self.key(item)
+        self._cancel_other_selections(item_key)
+        value = self.cache.get(item_key)
+        if value is not None:
+            return value
+        self._schedule(item_key, item, self._urgent)
+        return self.cache.get(item_key, allow_stale=True)
+
+    def prefetch(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Queue previews for items that are likely to be selected next, nearest first."""
+        for item in reversed(list(items)):
+            item_key = self.key(item)
+            if self.cache.get(item_key) is None:
+                self._schedule(item_key, item, self._prefetch)
+
+    def invalidate(self, item: Optional[Dict[str, Any]] = None) -> None:
+        self.cache.invalidate(None if item is None else self.key(item))
+
+    def expire(self) -> None:
+        """Recompute previews on next use without blanking the ones on screen"""
+        self.cache.expire()
+
+    def shutdown(self) -> None:
+        """Stop the workers. In-flight computations are cancelled, not awaited."""
+        with self._cond:
+            self._closed = True
+            self._urgent.clear()
+            self._prefetch.clear()
+            for token, _ in self._inflight.values():
+                token.cancel()
+            self._cond.notify_all()
+
+    def _cancel_other_selections(self, item_key: Hashable) -> None:
+        """The selection moved to item_key: nobody is waiting for the previous selections any more"""
+        with self._cond:
+            for key, (token, selected) in self._inflight.items():
+                if selected and key != item_key:
+                    token.cancel()
+
+    def _schedule(
+        self, item_key: Hashable, item: Dict[str, Any], queue: "OrderedDict[Hashable, Dict[str, Any]]"
+    ) -> None:
+        with self._cond:
+            running = self._inflight.get(item_key)
+            if self._closed or (running is not None and not running[0].cancelled):
+                return
+            if queue is self._urgent:
+                self._prefetch.pop(item_key, None)
+            elif item_key in self._urgent:
+                return
+            queue[item_key] = item
+            queue.move_to_end(item_key, last=False)
+            while len(queue) > self.max_pending:
+                queue.popitem(last=True)
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name="preview-worker", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._urgent and not self._prefetch and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                selected = bool(self._urgent)
+                queue = self._urgent if selected else self._prefetch
+                item_key, item = queue.popitem(last=False)
+                token = CancelToken()
+                self._inflight[item_key] = (token, selected)
+            try:
+                with cancel_scope(token):
+                    value: Optional[str] = self.compute(item)
+            except CommandCancelled:
+                value = None  # rescheduled by the next get if it is selected again
+            except Exception as e:
+                value = f"Unable to load preview: {e}"
+            with self._cond:
+                if self._inflight.get(item_key, (None,))[0] is token:
+                    del self._inflight[item_key]
+            if value is None:
+                continue
+            self.cache.put(item_key, value)
+            if self.on_ready is not None:
+                self.on_ready()
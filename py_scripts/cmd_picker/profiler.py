@@ -0,0 +1,185 @@
+"""Per-frame cost profile of CmdPicker, enabled with --profile (or --profile-trace).
+
+Every frame the picker draws is split into phases: handling the keys typed
+since the last frame (input), fetching items (fetch), building previews
+(preview), composing the lines (format) and writing them to the terminal
+(write). Phases nest, and each is charged only the time not spent in a
+nested one, so the phases of a frame add up to the time it blocked the key
+loop. Work done on other threads, such as background refreshes and the
+preview workers, is recorded per phase as background samples instead.
+
+Each frame also records the commands started through run_command and the
+bytes written to the terminal. On exit the picker prints a summary with a
+histogram of frame times and, when a path was given, dumps every frame as
+a JSON trace.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional
+
+from py_scripts.cmd_picker.runner import commands_started
+
+PHASES = ("input", "fetch", "preview", "format", "write")
+# Upper bounds in milliseconds of the frame time histogram buckets
+HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 33, 66, 133, float("inf"))
+HISTOGRAM_WIDTH = 40
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of values, 0 for none"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class FrameProfiler:
+    """Collects phase timings, command counts and bytes written per frame
+
+    The thread that creates the profiler is taken to be the key loop;
+    phases entered on any other thread become background samples.
+    """
+
+    def __init__(
+        self,
+        trace_path: Optional[str] = None,
+        clock: Callable[[], float] = time.perf_counter,
+        count_commands: Callable[[], int] = commands_started,
+    ):
+        self.trace_path = trace_path
+        self._clock = clock
+        self._count_commands = count_commands
+        self._thread = threading.get_ident()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.frames: List[Dict[str, Any]] = []
+        # phase -> durations in seconds of work done off the key loop
+        self.background: Dict[str, List[float]] = {}
+        self._started = clock()
+        self._frame_start = self._started
+        self._current: Dict[str, float] = {}
+        self._commands = count_commands()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Charge the time spent in the block, minus nested phases, to name"""
+        stack = self._local.__dict__.setdefault("stack", [])
+        # Time spent in phases nested inside this one, subtracted on exit
+        stack.append(0.0)
+        start = self._clock()
+        try:
+            yield
+        finally:
+            elapsed = self._clock() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.record(name, elapsed - nested)
+
+    def record(self, name: str, seconds: float) -> None:
+        if threading.get_ident() == self._thread:
+            self._current[name] = self._current.get(name, 0.0) + seconds
+            return
+        with self._lock:
+            self.background.setdefault(name, []).append(seconds)
+
+    def end_frame(self, bytes_written: int) -> None:
+        """Close the frame just drawn; the next one starts now"""
+        now = self._clock()
+        commands = self._count_commands()
+        self.frames.append(
+            {
+                "start": self._frame_start - self._started,
+                "total": sum(self._current.values()),
+                "phases": self._current,
+                "commands": commands - self._commands,
+                "bytes": bytes_written,
+            }
+        )
+        self._frame_start = now
+        self._current = {}
+        self._commands = commands
+
+    def summary(self) -> str:
+        """Text report: per-phase percentiles, background work and a frame time histogram"""
+        if not self.frames:
+            return "cmd-picker profile: no frames drawn"
+        totals = [frame["total"] * 1000 for frame in self.frames]
+        lines = [
+            f"cmd-picker profile: {len(self.frames)} frames, "
+            f"{sum(frame['commands'] for frame in self.frames)} commands, "
+            f"{sum(frame['bytes'] for frame in self.frames)} bytes written",
+            "",
+            f"{'phase':<12}{'total ms':>10}{'mean':>8}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}",
+        ]
+        names = list(PHASES) + sorted({name for frame in self.frames for name in frame["phases"]} - set(PHASES))
+        for name in names + ["frame"]:
+            if name == "frame":
+                values = totals
+            else:
+                values = [frame["phases"].get(name, 0.0) * 1000 for frame in self.frames]
+            lines.append(self._stats_row(name, values))
+        with self._lock:
+            background = {name: [seconds * 1000 for seconds in values] for name, values in self.background.items()}
+        if background:
+            lines += ["", "background (off the key loop)"]
+            for name in sorted(background):
+                lines.append(self._stats_row(f"{name} ×{len(background[name])}", background[name]))
+
+        lines += ["", "frame time"]
+        counts = [0] * len(HISTOGRAM_BUCKETS)
+        for value in totals:
+            counts[next(i for i, bound in enumerate(HISTOGRAM_BUCKETS) if value < bound)] += 1
+        lower = 0.0
+        for bound, count in zip(HISTOGRAM_BUCKETS, counts):
+            label = f"{lower:g}-{bound:g} ms" if bound != float("inf") else f">= {lower:g} ms"
+            bar = "█" * round(HISTOGRAM_WIDTH * count / len(totals))
+            lines.append(f"  {label:>12} {count:>6} {bar}")
+            lower = bound
+        return "\n".join(lines)
+
+    @staticmethod
+    def _stats_row(name: str, values: List[float]) -> str:
+        mean = sum(values) / len(values) if values else 0.0
+        stats = [
+            mean,
+            percentile(values, 0.5),
+            percentile(values, 0.9),
+            percentile(values, 0.99),
+            max(values, default=0),
+        ]
+        return f"{name:<12}{sum(values):>10.1f}" + "".join(f"{value:>8.2f}" for value in stats)
+
+    def trace(self) -> Dict[str, Any]:
+        """Every frame and background sample, times in milliseconds"""
+        with self._lock:
+            background = {name: [round(s * 1000, 3) for s in values] for name, values in self.background.items()}
+        return {
+            "frames": [
+                {
+                    "start": round(frame["start"] * 1000, 3),
+                    "total": round(frame["total"] * 1000, 3),
+                    "phases": {name: round(s * 1000, 3) for name, s in frame["phases"].items()},
+                    "commands": frame["commands"],
+                    "bytes": frame["bytes"],
+                }
+                for frame in self.frames
+            ],
+            "background": background,
+        }
+
+    def report(self, out: IO[str]) -> None:
+        """Print the summary to out and write the JSON trace, if a path was given"""
+        print(self.summary(), file=out)
+        if self.trace_path is None:
+            return
+        try:
+            with open(self.trace_path, "w") as f:
+                json.dump(self.trace(), f, indent=1)
+        except OSError as e:
+            print(f"cmd-picker profile: cannot write {self.trace_path}: {e}", file=out)
+            return
+        print(f"cmd-picker profile: trace written to {self.trace_path}", file=out)
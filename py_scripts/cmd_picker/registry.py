@@ -0,0 +1,106 @@
+"""Registry of the tools cmd-picker can run.
+
+The built-in tools are registered by name with the class (or any callable)
+that builds them. Other packages add tools through the ``cmd_picker.tools``
+entry point group, for example in their pyproject.toml::
+
+    [project.entry-points."cmd_picker.tools"]
+    k8s = "my_tools.k8s:PodTool"
+
+Nothing is built until it is asked for, and installed packages are only
+searched for entry points when a name is not a built-in one or the full list
+is needed, so ``cmd-picker tmux`` neither constructs the other tools nor scans
+site-packages. Availability probes are cached per PATH.
+"""
+
+import os
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    from py_scripts.cmd_picker.cmd_picker import Tool
+
+ENTRY_POINT_GROUP = "cmd_picker.tools"
+
+
+class ToolLoadError(Exception):
+    """A registered tool could not be imported or constructed"""
+
+
+class ToolRegistry(Mapping):
+    """Name -> Tool mapping whose tools are constructed on first access"""
+
+    def __init__(self, group: Optional[str] = ENTRY_POINT_GROUP):
+        self.group = group
+        self._factories: Dict[str, Callable[[], "Tool"]] = {}
+        self._tools: Dict[str, "Tool"] = {}
+        self._discovered = group is None
+        # name -> (PATH the probe ran with, result)
+        self._availability: Dict[str, Tuple[str, bool]] = {}
+
+    def register(self, name: str, factory: Callable[[], "Tool"]) -> None:
+        """Add a tool; a name registered here wins over an entry point of the same name"""
+        self._factories[name] = factory
+        self._tools.pop(name, None)
+        self._availability.pop(name, None)
+
+    def discover(self) -> None:
+        """Register the tools of the entry point group, once, without importing them yet"""
+        if self._discovered:
+            return
+        self._discovered = True
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=self.group):
+            if entry_point.name not in self._factories:
+                self._factories[entry_point.name] = self._entry_point_factory(entry_point)
+
+    @staticmethod
+    def _entry_point_factory(entry_point) -> Callable[[], "Tool"]:
+        def build() -> "Tool":
+            return entry_point.load()()
+
+        return build
+
+    def __getitem__(self, name: str) -> "Tool":
+        tool = self._tools.get(name)
+        if tool is not None:
+            return tool
+        if name not in self:
+            raise KeyError(name)
+        try:
+            tool = self._factories[name]()
+        except Exception as e:
+            raise ToolLoadError(f"cannot load tool {name!r}: {type(e).__name__}: {e}") from e
+        self._tools[name] = tool
+        return tool
+
+    def __contains__(self, name: object) -> bool:
+        if name not in self._factories:
+            self.discover()
+        return name in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        self.discover()
+        return iter(list(self._factories))
+
+    def __len__(self) -> int:
+        self.discover()
+        return len(self._factories)
+
+    def loaded(self) -> Dict[str, "Tool"]:
+        """The tools constructed so far"""
+        return dict(self._tools)
+
+    def is_available(self, name: str) -> bool:
+        """Cached Tool.is_available of name; False when the tool does not load"""
+        path = os.environ.get("PATH", "")
+        cached = self._availability.get(name)
+        if cached is not None and cached[0] == path:
+            return cached[1]
+        try:
+            available = self[name].is_available()
+        except ToolLoadError:
+            available = False
+        self._availability[name] = (path, available)
+        return available
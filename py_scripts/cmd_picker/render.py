@@ -0,0 +1,146 @@
+"""Differential terminal renderer for CmdPicker.
+
+The renderer remembers the last frame it drew and, on the next one, only
+rewrites the rows that changed, addressing each with a cursor-position
+escape. The whole update goes out in a single buffered write so the terminal
+never shows a half-drawn frame.
+"""
+
+import os
+import re
+import signal
+import sys
+import unicodedata
+from typing import Callable, List, Optional, TextIO, Tuple
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+ENTER_ALT_SCREEN = "\x1b[?1049h"
+LEAVE_ALT_SCREEN = "\x1b[?1049l"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+CLEAR_LINE = "\x1b[K"
+RESET = "\x1b[0m"
+
+
+def char_width(char: str) -> int:
+    """Number of terminal columns a single character occupies"""
+    if unicodedata.combining(char):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+
+
+def fit_width(line: str, width: int) -> str:
+    """Truncate line to width visible columns, leaving escape sequences intact"""
+    line = line.expandtabs()
+    out = []
+    used = 0
+    pos = 0
+    while pos < len(line):
+        match = ANSI_ESCAPE.match(line, pos)
+        if match:
+            out.append(match.group())
+            pos = match.end()
+            continue
+        char = line[pos]
+        if char < " ":  # drop stray control characters, they would move the cursor
+            pos += 1
+            continue
+        w = char_width(char)
+        if used + w > width:
+            out.append(RESET)
+            break
+        out.append(char)
+        used += w
+        pos += 1
+    return "".join(out)
+
+
+class ScreenRenderer:
+    """Keep the previously drawn frame and write only the rows that differ"""
+
+    def __init__(self, out: Optional[TextIO] = None, size: Optional[Tuple[int, int]] = None):
+        self.out = out if out is not None else sys.stdout
+        self.fixed_size = size
+        self.bytes_written = 0
+        self._last: List[str] = []
+        self._last_size: Optional[Tuple[int, int]] = None
+        self._invalidated = True
+        self._previous_handler = None
+        self._active = False
+
+    def get_size(self) -> Tuple[int, int]:
+        """Return (columns, rows) of the terminal"""
+        if self.fixed_size is not None:
+            return self.fixed_size
+        try:
+            terminal_size = os.get_terminal_size()
+            return terminal_size.columns, terminal_size.lines
+        except OSError:
+            return 80, 24
+
+    def invalidate(self) -> None:
+        """Force a full redraw on the next render, e.g. after something else wrote to the screen"""
+        self._invalidated = True
+
+    def render(self, lines: List[str]) -> int:
+        """Draw lines as the new frame and return the number of bytes written"""
+        cols, rows = self.get_size()
+        frame = [fit_width(line, cols) for line in lines[:rows]]
+
+        parts = []
+        if self._invalidated or self._last_size != (cols, rows):
+            parts.append(CLEAR_SCREEN)
+            previous: List[str] = []
+        else:
+            previous = self._last
+
+        for row, line in enumerate(frame):
+            if row < len(previous) and previous[row] == line:
+                continue
+            parts.append(f"\x1b[{row + 1};1H{line}{RESET}{CLEAR_LINE}")
+        for row in range(len(frame), len(previous)):
+            parts.append(f"\x1b[{row + 1};1H{CLEAR_LINE}")
+
+        self._last = frame
+        self._last_size = (cols, rows)
+        self._invalidated = False
+        return self._write("".join(parts))
+
+    def start(self, on_resize: Optional[Callable[[], None]] = None) -> None:
+        """Switch to the alternate screen and redraw from scratch on SIGWINCH"""
+        self._write(ENTER_ALT_SCREEN + HIDE_CURSOR)
+        self._active = True
+        self.invalidate()
+
+        def handle_resize(signum, frame):
+            self.invalidate()
+            if on_resize is not None:
+                on_resize()
+
+        try:
+            self._previous_handler = signal.signal(signal.SIGWINCH, handle_resize)
+        except ValueError:
+            self._previous_handler = None  # not on the main thread
+
+    def stop(self) -> None:
+        """Restore the normal screen and the previous SIGWINCH handler"""
+        if not self._active:
+            return
+        self._active = False
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGWINCH, self._previous_handler)
+            self._previous_handler = None
+        self._write(SHOW_CURSOR + LEAVE_ALT_SCREEN)
+        self._last = []
+        self.invalidate()
+
+    def _write(self, data: str) -> int:
+        if not data:
+            return 0
+        self.out.write(data)
+        self.out.flush()
+        written = len(data.encode())
+        self.bytes_written += written
+        return written
@@ -0,0 +1,155 @@
+"""Bounded, cancellable execution of the commands behind the tools.
+
+Every tmux, docker and gh call that only reads (item lists, previews) goes
+through run_command. It caps how many of them run at once, kills a command
+that outlives its timeout, and kills it early when the calling thread's
+CancelToken is cancelled, e.g. because the preview it was computing is no
+longer selected. Children run in their own session with stdin closed, so a
+hung docker or gh never holds on to the picker's terminal.
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence, Tuple
+
+# Seconds a command may run before it is killed, unless the caller says otherwise
+DEFAULT_TIMEOUT = 20.0
+# Commands running at the same time, across every tool and worker thread
+MAX_CONCURRENT = 8
+
+
+class CommandCancelled(subprocess.SubprocessError):
+    """The command was killed because its CancelToken was cancelled"""
+
+    def __init__(self, cmd: Sequence[str]):
+        super().__init__(f"Command {list(cmd)!r} was cancelled")
+        self.cmd = cmd
+
+
+class CancelToken:
+    """Set by whoever no longer needs the result; the command running under it is killed"""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+_scope = threading.local()
+
+
+@contextmanager
+def cancel_scope(token: CancelToken) -> Iterator[CancelToken]:
+    """Run the commands started by this thread inside the block under token"""
+    previous = getattr(_scope, "token", None)
+    _scope.token = token
+    try:
+        yield token
+    finally:
+        _scope.token = previous
+
+
+def current_token() -> Optional[CancelToken]:
+    return getattr(_scope, "token", None)
+
+
+class CommandRunner:
+    """Runs commands to completion, with a concurrency cap, timeouts and cancellation"""
+
+    def __init__(
+        self, max_concurrent: int = MAX_CONCURRENT, timeout: float = DEFAULT_TIMEOUT, poll_interval: float = 0.05
+    ):
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        # Commands started so far, read by the frame profiler
+        self.started = 0
+        self._started_lock = threading.Lock()
+
+    def run(
+        self,
+        args: Sequence[str],
+        timeout: Optional[float] = None,
+        check: bool = False,
+        token: Optional[CancelToken] = None,
+    ) -> "subprocess.CompletedProcess[str]":
+        """Run args and return its output, like subprocess.run(capture_output=True, text=True)
+
+        Raises subprocess.TimeoutExpired once timeout (waiting for a free slot
+        included) has passed, CommandCancelled when token, or the token of
+        the enclosing cancel_scope, is cancelled, and with check
+        subprocess.CalledProcessError on a non-zero exit.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        token = token if token is not None else current_token()
+        deadline = time.monotonic() + timeout
+
+        while not self._slots.acquire(timeout=self.poll_interval):
+            if token is not None and token.cancelled:
+                raise CommandCancelled(args)
+            if time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(list(args), timeout)
+        try:
+            proc = subprocess.Popen(
+                list(args),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True,
+            )
+            with self._started_lock:
+                self.started += 1
+            while True:
+                if token is not None and token.cancelled:
+                    self._kill(proc)
+                    raise CommandCancelled(args)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    stdout, stderr = self._kill(proc)
+                    raise subprocess.TimeoutExpired(list(args), timeout, output=stdout, stderr=stderr)
+                try:
+                    # communicate may be called again after it timed out, without losing output
+                    stdout, stderr = proc.communicate(timeout=min(self.poll_interval, remaining))
+                    break
+                except subprocess.TimeoutExpired:
+                    continue
+        finally:
+            self._slots.release()
+
+        if check and proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, list(args), stdout, stderr)
+        return subprocess.CompletedProcess(list(args), proc.returncode, stdout, stderr)
+
+    @staticmethod
+    def _kill(proc: subprocess.Popen) -> Tuple[str, str]:
+        """Kill proc and whatever it started (gh runs git, docker its plugins), return its output so far"""
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            proc.kill()
+        return proc.communicate()
+
+
+_runner = CommandRunner()
+
+
+def run_command(
+    args: Sequence[str], timeout: Optional[float] = None, check: bool = False
+) -> "subprocess.CompletedProcess[str]":
+    """Run args on the shared CommandRunner, see CommandRunner.run"""
+    return _runner.run(args, timeout=timeout, check=check)
+
+
+def commands_started() -> int:
+    """Number of commands the shared CommandRunner has started"""
+    return _runner.started
@@ -0,0 +1,99 @@
+"""Incremental fuzzy filtering for CmdPicker.
+
+Each item is reduced once to a lowercased search string. A query matches an
+item when its characters appear in order (not necessarily adjacent); matches
+are ranked by how tightly the characters cluster and how early they start.
+When a query extends the previous one only the previous matches are
+rescanned, so typing narrows an ever smaller set.
+"""
+
+import re
+from typing import Dict, List, Sequence, Tuple
+
+INDEX_BITS = 32
+INDEX_MASK = (1 << INDEX_BITS) - 1
+POSITION_BITS = 16
+MAX_TEXT_LENGTH = (1 << POSITION_BITS) - 1
+
+
+def fuzzy_pattern(query: str) -> str:
+    """Regex matching query as a subsequence, e.g. "abc" -> "a[^b]*b[^c]*c"
+
+    The negated classes make each step stop at the first occurrence of the
+    next character, so a failed match never backtracks.
+    """
+    parts = [re.escape(query[0])]
+    for char in query[1:]:
+        escaped = re.escape(char)
+        parts.append(f"[^{escaped}]*{escaped}")
+    return "".join(parts)
+
+
+class SearchIndex:
+    """Searchable text of a fixed list of items, filtered by fuzzy queries"""
+
+    def __init__(self, texts: List[str]):
+        self.texts = [text.lower()[:MAX_TEXT_LENGTH] for text in texts]
+        # Results for the prefixes of the current query, so that typing
+        # refines and backspace is a lookup: query -> (matches by index, ranked)
+        self._results: Dict[str, Tuple[List[int], List[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def filter(self, query: str) -> List[int]:
+        """Return the indices of matching items, best match first"""
+        query = query.lower()
+        if not query:
+            self._results.clear()
+            return list(range(len(self.texts)))
+
+        cached = self._results.get(query)
+        if cached is not None:
+            self._forget_unrelated(query)
+            return list(cached[1])
+
+        # A longer query can only match a subset of what its prefix did
+        candidates: Sequence[int] = range(len(self.texts))
+        for size in range(len(query) - 1, 0, -1):
+            prefix = self._results.get(query[:size])
+            if prefix is not None:
+                candidates = prefix[0]
+                break
+
+        scores = self._score(query, candidates)
+        matches = sorted(score & INDEX_MASK for score in scores)
+        scores.sort()
+        ranked = [score & INDEX_MASK for score in scores]
+
+        self._forget_unrelated(query)
+        self._results[query] = (matches, ranked)
+        return list(ranked)
+
+    def _forget_unrelated(self, query: str) -> None:
+        for cached_query in [q for q in self._results if not query.startswith(q)]:
+            del self._results[cached_query]
+
+    def _score(self, query: str, candidates: Sequence[int]) -> List[int]:
+        """Return a sort key for every candidate that matches query
+
+        Keys pack (span, start, index) into one int so ranking is a plain
+        int sort; the item index is the low INDEX_BITS.
+        """
+        texts = self.texts
+        size = len(query)
+        fuzzy = re.compile(fuzzy_pattern(query)).search
+        scores = []
+        append = scores.append
+        for index in candidates:
+            text = texts[index]
+            start = text.find(query)
+            if start >= 0:  # a contiguous match always has the tightest span
+                append((((size << POSITION_BITS) | start) << INDEX_BITS) | index)
+                continue
+            if size > 1:
+                match = fuzzy(text)
+                if match:
+                    start = match.start()
+                    append((((match.end() - start) << POSITION_BITS) | start) << INDEX_BITS | index)
+        return scores
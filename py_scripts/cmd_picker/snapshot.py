@@ -0,0 +1,69 @@
+"""Last item list of every tool, kept on disk for an instant first frame.
+
+CmdPicker draws the snapshot for the current tool and context (tmux socket,
+docker host, repository) straight away and fetches the real list in the
+background, swapping it in when it arrives. Snapshots are zlib-compressed
+JSON written atomically; a missing, corrupt or mismatching file is treated
+as no snapshot.
+"""
+
+import hashlib
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Bumped when the file layout changes, older snapshots are then ignored
+FORMAT_VERSION = 1
+
+
+def default_snapshot_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "cmd-picker" / "snapshots"
+
+
+class SnapshotStore:
+    def __init__(self, cache_dir: Optional[Path] = None, clock: Callable[[], float] = time.time):
+        self.cache_dir = cache_dir if cache_dir is not None else default_snapshot_dir()
+        self._clock = clock
+
+    def path(self, tool: str, context: str) -> Path:
+        digest = hashlib.sha1(context.encode()).hexdigest()[:16]
+        return self.cache_dir / f"{tool}-{digest}.json.z"
+
+    def load(self, tool: str, context: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the items saved for tool in context, None if there are none"""
+        try:
+            with open(self.path(tool, context), "rb") as f:
+                data = json.loads(zlib.decompress(f.read()))
+            if data["version"] != FORMAT_VERSION or data["context"] != context:
+                return None
+            items = data["items"]
+        except (OSError, ValueError, KeyError, TypeError, zlib.error):
+            return None
+        return items if isinstance(items, list) and items else None
+
+    def save(self, tool: str, context: str, items: List[Dict[str, Any]]) -> None:
+        """Replace the snapshot; an empty list removes it so the next start waits for real data"""
+        path = self.path(tool, context)
+        if not items:
+            self.remove(tool, context)
+            return
+        data = {"version": FORMAT_VERSION, "context": context, "saved_at": self._clock(), "items": items}
+        try:
+            payload = zlib.compress(json.dumps(data, separators=(",", ":"), default=str).encode(), 1)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            pass  # without a snapshot the next start just waits for get_items
+
+    def remove(self, tool: str, context: str) -> None:
+        try:
+            self.path(tool, context).unlink()
+        except OSError:
+            pass
@@ -0,0 +1,119 @@
+"""systemd user units for SystemdTool.
+
+The unit list comes from a single ``systemctl --user list-units
+--output=json`` call, however many transient ``run-u*.service`` units
+durable-run has left behind. Details are read with one ``systemctl show``
+call for every unit on screen, and the journal lines of a unit are read
+incrementally: JournalTail keeps the cursor journalctl reports with
+``--show-cursor`` and asks only for entries after it on the next preview.
+"""
+
+import json
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+# Properties shown in the preview, read with systemctl show
+SHOW_PROPERTIES = (
+    "Id",
+    "Description",
+    "ActiveState",
+    "SubState",
+    "Result",
+    "MainPID",
+    "ActiveEnterTimestamp",
+    "ExecMainStatus",
+    "MemoryCurrent",
+)
+
+CURSOR_PREFIX = "-- cursor: "
+# What systemctl show reports for a counter it does not track (UINT64_MAX)
+UNSET_COUNTER = str(2**64 - 1)
+
+
+def parse_units(output: str) -> List[Dict[str, Any]]:
+    """Items from the JSON printed by systemctl list-units --output=json"""
+    return [
+        {
+            "unit": unit["unit"],
+            "load": unit.get("load", ""),
+            "active": unit.get("active", ""),
+            "sub": unit.get("sub", ""),
+            "description": unit.get("description", ""),
+            "type": "unit",
+        }
+        for unit in json.loads(output or "[]")
+    ]
+
+
+def parse_show(output: str) -> Dict[str, Dict[str, str]]:
+    """Properties per unit Id from systemctl show output, one blank-line separated block per unit"""
+    units: Dict[str, Dict[str, str]] = {}
+    for block in output.split("\n\n"):
+        properties = dict(line.split("=", 1) for line in block.splitlines() if "=" in line)
+        if properties.get("Id"):
+            units[properties["Id"]] = properties
+    return units
+
+
+def format_memory(value: Optional[str]) -> Optional[str]:
+    """MemoryCurrent in bytes as "1.5M", None when memory accounting has no value for the unit"""
+    if not value or value == UNSET_COUNTER or not value.isdigit():
+        return None  # "[not set]", or not tracked
+    size = float(value)
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+def split_cursor(output: str) -> Tuple[List[str], Optional[str]]:
+    """Journal lines and the trailing cursor line journalctl --show-cursor adds, if any"""
+    lines = output.splitlines()
+    if lines and lines[-1].startswith(CURSOR_PREFIX):
+        return lines[:-1], lines[-1][len(CURSOR_PREFIX) :]
+    return lines, None
+
+
+class JournalTail:
+    """The last lines of each unit's journal, topped up from a saved cursor
+
+    run executes a journalctl command line (without the journalctl itself)
+    and returns its stdout.
+    """
+
+    def __init__(self, run: Callable[[Sequence[str]], str], lines: int = 20, max_units: int = 256):
+        self.run = run
+        self.lines = lines
+        self.max_units = max_units
+        self._entries: "OrderedDict[str, Tuple[Optional[str], Deque[str]]]" = OrderedDict()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, unit: str) -> List[str]:
+        with self._lock:
+            unit_lock = self._locks.setdefault(unit, threading.Lock())
+        # One read per unit at a time, so two previews do not both append the same entries
+        with unit_lock:
+            with self._lock:
+                cursor, tail = self._entries.get(unit, (None, deque(maxlen=self.lines)))
+            args = ["-u", unit, "--no-pager", "--quiet", "--show-cursor"]
+            args += ["--after-cursor", cursor] if cursor else ["-n", str(self.lines)]
+            new_lines, new_cursor = split_cursor(self.run(args))
+            tail.extend(new_lines)
+            with self._lock:
+                self._entries[unit] = (new_cursor or cursor, tail)
+                self._entries.move_to_end(unit)
+                while len(self._entries) > self.max_units:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._locks.pop(evicted, None)
+            return list(tail)
+
+    def forget(self, unit: Optional[str] = None) -> None:
+        """Read the journal of unit (or every unit) from scratch next time"""
+        with self._lock:
+            if unit is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(unit, None)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.cmd_picker import AllTool, CmdPicker, Tool
+
+
+class FakeTool(Tool):
+    """A backend answering after delay seconds, or only once released"""
+
+    def __init__(self, name, delay=0.0, gate=None, fail=False, context=None):
+        self._name = name
+        self.delay = delay
+        self.gate = gate
+        self.fail = fail
+        self.context = context
+        self.items = [{"id": f"{name}-{i}"} for i in range(2)]
+        self.fetches = 0
+        self.actions = []
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def description(self):
+        return f"Fake {self._name}"
+
+    def is_available(self):
+        return True
+
+    def get_items(self):
+        self.fetches += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return list(self.items)
+
+    def get_item_display(self, item, selected):
+        return item["id"]
+
+    def get_item_preview(self, item):
+        return f"preview of {item['id']}"
+
+    def execute_action(self, item):
+        self.actions.append(("enter", item["id"]))
+
+    def get_item_key(self, item):
+        return item["id"]
+
+    def get_snapshot_context(self):
+        return self.context
+
+    def get_additional_actions(self):
+        return {"x": f"{self._name} x"}
+
+    def handle_additional_action(self, key, item):
+        self.actions.append((key, item["id"]))
+        return True
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def ids(items):
+    return [item["item"]["id"] for item in items]
+
+
+def reload(picker):
+    """What the key loop does when woken up, returning the number of items"""
+    picker.apply_refreshed_items()
+    picker.reload_if_changed()
+    return len(picker.all_items)
+
+
+class TestAllTool:
+    def test_fastest_backend_does_not_wait_for_the_slowest(self):
+        slow_gate = threading.Event()
+        tool = AllTool({"fast": FakeTool("fast"), "slow": FakeTool("slow", gate=slow_gate)})
+
+        started = time.perf_counter()
+        items = tool.get_items()
+
+        assert time.perf_counter() - started < 1.0
+        assert ids(items) == ["fast-0", "fast-1"]
+        slow_gate.set()
+
+    def test_late_answers_are_announced_and_merged_in_tool_order(self):
+        gate = threading.Event()
+        slow = FakeTool("slow", gate=gate)
+        tool = AllTool({"slow": slow, "fast": FakeTool("fast")})
+        changes = []
+        tool.watch(lambda: changes.append(True))
+
+        assert ids(tool.get_items()) == ["fast-0", "fast-1"]
+        gate.set()
+        assert wait_for(lambda: len(changes) == 2)
+
+        assert ids(tool.get_items()) == ["slow-0", "slow-1", "fast-0", "fast-1"]
+        # Collecting the announced answer did not start another round
+        assert slow.fetches == 1
+
+    def test_next_round_queries_every_backend(self):
+        a, b = FakeTool("a"), FakeTool("b")
+        tool = AllTool({"a": a, "b": b})
+        tool.get_items()
+        assert wait_for(lambda: a.fetches == b.fetches == 1 and not tool._running)
+        tool.get_items()  # collects the second answer
+        tool.get_items()
+
+        assert wait_for(lambda: a.fetches == b.fetches == 2)
+
+    def test_failing_backend_contributes_nothing(self):
+        tool = AllTool({"broken": FakeTool("broken", fail=True), "ok": FakeTool("ok", delay=0.05)})
+        assert ids(tool.get_items()) == ["ok-0", "ok-1"]
+
+    def test_all_backends_empty(self):
+        empty = FakeTool("empty")
+        empty.items = []
+        assert AllTool({"empty": empty}).get_items() == []
+
+    def test_actions_go_to_the_owner_and_refetch_only_it(self):
+        a, b = FakeTool("a"), FakeTool("b")
+        tool = AllTool({"a": a, "b": b})
+        tool.get_items()
+        assert wait_for(lambda: not tool._running)
+        items = tool.get_items()
+        item = items[2]
+
+        tool.execute_action(item)
+        assert tool.handle_additional_action("x", item)
+        tool.get_items()
+
+        assert b.actions == [("enter", "b-0"), ("x", "b-0")]
+        assert a.actions == []
+        assert wait_for(lambda: b.fetches == 2)
+        assert a.fetches == 1
+
+    def test_keys_search_and_actions_carry_the_tool(self):
+        tool = AllTool({"a": FakeTool("a"), "b": FakeTool("b")})
+        item = {"tool": "b", "item": {"id": "b-0"}}
+
+        assert tool.get_item_key(item) == "b:b-0"
+        assert tool.get_search_text(item).startswith("b ")
+        assert tool.get_item_preview(item) == "preview of b-0"
+        assert tool.get_additional_actions() == {"x": "a x / b x"}
+
+    def test_snapshot_context_combines_the_tools(self):
+        assert AllTool({"a": FakeTool("a"), "b": FakeTool("b")}).get_snapshot_context() is None
+        tool = AllTool({"a": FakeTool("a", context="here"), "b": FakeTool("b")})
+        assert tool.get_snapshot_context() == "a=here b=None"
+
+
+class TestCmdPickerWithAllTool:
+    def test_picker_list_grows_as_backends_answer(self):
+        gate = threading.Event()
+        picker = CmdPicker(AllTool({"fast": FakeTool("fast"), "slow": FakeTool("slow", gate=gate)}))
+        picker.load_items()
+        picker.tool.watch(picker.on_items_changed)
+        assert len(picker.all_items) == 2
+
+        gate.set()
+        assert wait_for(lambda: reload(picker) == 4)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -2,14 +2,21 @@
 
 import pytest
 from unittest.mock import Mock, patch
+import io
+import json
 import subprocess
+import threading
+import time
 
 import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 
-from py_scripts.cmd_picker.cmd_picker import TmuxTool, DockerTool, GhTool, CmdPicker
+from py_scripts.cmd_picker.cmd_picker import TmuxTool, DockerTool, GhTool, CmdPicker, Viewport
+from py_scripts.cmd_picker.docker_api import DockerAPI
+from py_scripts.cmd_picker.log_stream import LogStream
+from py_scripts.cmd_picker.render import ScreenRenderer
 
 
 class TestTmuxTool:
@@ -27,10 +34,14 @@ class TestTmuxTool:
         mock_which.return_value = None
         assert not tool.is_available()
 
-    @patch("subprocess.run")
+    @patch("py_scripts.cmd_picker.tmux_state.run_command")
     def test_get_items_success(self, mock_run):
         tool = TmuxTool()
-        mock_run.return_value = Mock(stdout="session1\t3\t1234567890\nsession2\t1\t1234567891\n", returncode=0)
+        mock_run.return_value = Mock(
+            stdout="session1\t3\t1234567890\t0\tmain\t1\t%0\t1\t1234567890\t0\t0\t0\n"
+            "session2\t1\t1234567891\t0\tmain\t1\t%1\t1\t1234567891\t0\t0\t0\n",
+            returncode=0,
+        )
 
         items = tool.get_items()
 
@@ -40,7 +51,7 @@ class TestTmuxTool:
         assert items[1]["name"] == "session2"
         assert items[1]["windows"] == "1"
 
-    @patch("subprocess.run")
+    @patch("py_scripts.cmd_picker.tmux_state.run_command")
     def test_get_items_failure(self, mock_run):
         tool = TmuxTool()
         mock_run.side_effect = subprocess.CalledProcessError(1, "tmux")
@@ -61,6 +72,25 @@ class TestTmuxTool:
         display = tool.get_item_display(item, selected=False)
         assert "test_session" in display
 
+    @patch("subprocess.run")
+    def test_prompts_in_a_row_each_read_their_own_answer(self, mock_run):
+        tool = TmuxTool()
+        item = {"name": "session1", "windows": "1", "created": "0"}
+
+        # Answers typed in line mode, newlines included, as the released terminal delivers them
+        with patch("sys.stdin", io.StringIO("y\nY\nn\nwork\n")), patch("builtins.print"):
+            assert tool.handle_additional_action("d", item)
+            assert tool.handle_additional_action("d", item)
+            assert not tool.handle_additional_action("d", item)
+            assert tool.handle_additional_action("a", item)
+
+        commands = [call.args[0][1:] for call in mock_run.call_args_list]
+        assert commands == [
+            ["kill-session", "-t", "session1"],
+            ["kill-session", "-t", "session1"],
+            ["new-session", "-d", "-s", "work"],
+        ]
+
 
 class TestDockerTool:
     def test_name_and_description(self):
@@ -77,8 +107,9 @@ class TestDockerTool:
         mock_which.return_value = None
         assert not tool.is_available()
 
-    @patch("subprocess.run")
-    def test_get_items_success(self, mock_run):
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    @patch.object(DockerTool, "get_api", return_value=None)
+    def test_get_items_success(self, mock_api, mock_run):
         tool = DockerTool()
         mock_run.return_value = Mock(stdout="abc123456789\ttest_container\tUp 2 hours\tnginx:latest\n", returncode=0)
 
@@ -100,6 +131,231 @@ class TestDockerTool:
         assert "Up 2 hours" in display
 
 
+class FakeDockerCLI:
+    """run_command stand-in answering docker inspect/logs, recording calls and concurrency"""
+
+    def __init__(self, existing, delay=0.01):
+        self.existing = set(existing)
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, args, **kwargs):
+        with self.lock:
+            self.calls.append(args)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        if args[1] == "inspect":
+            found = [
+                {
+                    "Id": cid + "f" * 52,
+                    "Name": f"/c{cid}",
+                    "Created": "2024-05-01T10:00:00Z",
+                    "Config": {"Image": "nginx"},
+                    "State": {"Status": "running"},
+                    "NetworkSettings": {"Ports": {}},
+                }
+                for cid in args[2:]
+                if cid in self.existing
+            ]
+            missing = len(found) < len(args) - 2
+            return Mock(
+                stdout=json.dumps(found), stderr="Error: No such object" if missing else "", returncode=int(missing)
+            )
+        return Mock(stdout=f"log of {args[-1]}\n", stderr="", returncode=0)
+
+    def commands(self, name):
+        return [args for args in self.calls if args[1] == name]
+
+
+class FakeDockerAPI:
+    """DockerAPI stand-in answering inspect_many and logs, recording the batches asked for"""
+
+    def __init__(self, existing):
+        self.existing = set(existing)
+        self.batches = []
+
+    def available(self):
+        return True
+
+    def inspect_many(self, container_ids):
+        self.batches.append(list(container_ids))
+        return {
+            cid: {"Name": f"/c{cid}", "Config": {"Image": "nginx"}} for cid in container_ids if cid in self.existing
+        }
+
+    def logs(self, container_id, tail=20):
+        return f"log of {container_id}\n"
+
+
+class TestDockerBatchedPreviews:
+    def make_tool(self):
+        return DockerTool(api=DockerAPI("/nonexistent/docker.sock"))
+
+    def test_one_inspect_for_all_visible_rows(self):
+        ids = [f"{i:012d}" for i in range(5)]
+        tool = self.make_tool()
+        fake = FakeDockerCLI(ids)
+        tool.prepare_previews([{"id": cid} for cid in ids])
+
+        with patch("py_scripts.cmd_picker.cmd_picker.run_command", side_effect=fake):
+            assert "/c000000000003: nginx" in tool.get_details(ids[3])
+            for cid in ids:
+                tool.get_details(cid)
+
+        assert fake.commands("inspect") == [["docker", "inspect", ids[3], *ids[:3], ids[4]]]
+
+    def test_missing_container(self):
+        tool = self.make_tool()
+        fake = FakeDockerCLI(["000000000001"])
+        tool.prepare_previews([{"id": "000000000001"}, {"id": "gone00000000"}])
+
+        with patch("py_scripts.cmd_picker.cmd_picker.run_command", side_effect=fake):
+            assert "Unable to get info" in tool.get_item_preview({"id": "gone00000000"})
+            assert "log of 000000000001" in tool.get_item_preview({"id": "000000000001"})
+
+        assert len(fake.commands("inspect")) == 1
+
+    def test_engine_api_inspects_visible_rows_in_one_batch(self):
+        ids = [f"{i:012d}" for i in range(5)]
+        api = FakeDockerAPI(ids[1:])
+        tool = DockerTool(api=api)
+        tool.prepare_previews([{"id": cid} for cid in ids])
+
+        assert "/c000000000002: nginx" in tool.get_item_preview({"id": ids[2]})
+        assert "log of 000000000003" in tool.get_item_preview({"id": ids[3]})
+        assert "Unable to get info" in tool.get_item_preview({"id": ids[0]})
+
+        assert api.batches == [[ids[2], ids[0], ids[1], ids[3], ids[4]]]
+
+    def test_details_expire_after_preview_ttl(self):
+        tool = self.make_tool()
+        fake = FakeDockerCLI(["000000000001"])
+
+        with patch("py_scripts.cmd_picker.cmd_picker.run_command", side_effect=fake):
+            tool.get_details("000000000001")
+            tool.get_details("000000000001")
+            assert len(fake.commands("inspect")) == 1
+
+            tool.preview_ttl = 0.0
+            tool.get_details("000000000001")
+            assert len(fake.commands("inspect")) == 2
+
+    def test_page_of_40_costs_one_inspect_and_bounded_log_fetches(self):
+        ids = [f"{i:012d}" for i in range(40)]
+        picker = CmdPicker(self.make_tool())
+        picker.set_items([{"id": cid, "name": f"c{cid}", "status": "Up", "image": "nginx"} for cid in ids])
+        fake = FakeDockerCLI(ids)
+
+        with patch("py_scripts.cmd_picker.cmd_picker.run_command", side_effect=fake):
+            picker.build_frame(120, 40 + picker.preview_height + 8)
+            assert picker.list_height == 40
+            deadline = time.monotonic() + 5
+            while len(picker.previews.cache) < picker.previews.max_pending and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            picker.previews.shutdown()
+
+        assert len(fake.commands("inspect")) == 1
+        assert sorted(fake.commands("inspect")[0][2:]) == ids
+        assert len(fake.commands("logs")) <= picker.previews.max_pending + picker.previews.workers
+        assert fake.max_running <= picker.previews.workers
+
+
+class TestCmdPickerFollow:
+    def make_picker(self):
+        picker = CmdPicker(DockerTool(api=DockerAPI("/nonexistent/docker.sock")))
+        picker.set_items([{"id": f"{i:012d}", "name": f"c{i}", "status": "Up", "image": "nginx"} for i in range(3)])
+        picker.previews.get = Mock(return_value="static preview")
+        picker.previews.prefetch = Mock()
+        self.opened = []
+
+        def open_log_stream(item, on_update):
+            self.opened.append(item["id"])
+            lines = "".join(f"{item['name']} line {i}\n" for i in range(100)).encode()
+            return LogStream(iter([lines]), lambda: None, on_update).start()
+
+        picker.tool.open_log_stream = open_log_stream
+        return picker
+
+    def frame_after_stream(self, picker):
+        picker.build_frame(100, 50)
+        deadline = time.monotonic() + 2
+        while not picker.log_stream.ended and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return "\n".join(picker.build_frame(100, 50))
+
+    def test_follow_replaces_preview_with_latest_lines(self):
+        picker = self.make_picker()
+        picker.toggle_follow()
+        frame = self.frame_after_stream(picker)
+
+        assert "Following Output" in frame
+        assert "c0 line 99" in frame
+        assert "c0 line 50" not in frame
+        assert "static preview" not in frame
+
+        picker.toggle_follow()
+        assert picker.log_stream is None
+        assert "static preview" in "\n".join(picker.build_frame(100, 50))
+
+    def test_follow_moves_with_selection(self):
+        picker = self.make_picker()
+        picker.toggle_follow()
+        self.frame_after_stream(picker)
+        first_stream = picker.log_stream
+
+        picker.move_selection(1)
+        frame = self.frame_after_stream(picker)
+
+        assert self.opened == ["000000000000", "000000000001"]
+        assert first_stream._closed
+        assert "c1 line 99" in frame
+
+    def test_unfollowable_item(self):
+        picker = self.make_picker()
+        picker.tool.open_log_stream = lambda item, on_update: None
+        picker.toggle_follow()
+        assert "Unable to follow" in "\n".join(picker.build_frame(100, 50))
+
+    @patch("subprocess.Popen")
+    def test_docker_cli_follow(self, mock_popen):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"hello\n")
+        os.close(write_fd)
+        mock_popen.return_value.stdout = os.fdopen(read_fd, "rb")
+
+        stream = DockerTool(api=DockerAPI("/nonexistent/docker.sock")).open_log_stream({"id": "abc"}, lambda: None)
+        deadline = time.monotonic() + 2
+        while not stream.ended and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+        commands = [c[0][0] for c in mock_popen.call_args_list if c[0][0][1] == "logs"]
+        assert commands == [["docker", "logs", "-f", "--tail", "100", "abc"]]
+        assert stream.tail(1) == ["hello"]
+        stream.close()
+        mock_popen.return_value.terminate.assert_called_once()
+
+    @patch.object(DockerTool, "is_available", return_value=True)
+    def test_run_toggles_follow_key(self, mock_is_available):
+        picker = self.make_picker()
+        with (
+            patch.object(DockerTool, "get_items", return_value=picker.all_items),
+            patch.object(picker, "display_interface"),
+            patch.object(picker.renderer, "start"),
+            patch.object(picker, "get_key", side_effect=["l", "j", "q"]),
+        ):
+            picker.run()
+
+        assert picker.following
+        assert picker.log_stream is None  # closed on exit
+
+
 class TestGhTool:
     def test_name_and_description(self):
         tool = GhTool()
@@ -115,8 +371,9 @@ class TestGhTool:
         mock_which.return_value = None
         assert not tool.is_available()
 
-    @patch("subprocess.run")
-    def test_get_items_success(self, mock_run):
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    @patch.object(GhTool, "get_repo", return_value=None)
+    def test_get_items_success(self, mock_repo, mock_run):
         tool = GhTool()
         mock_run.return_value = Mock(
             stdout='[{"number": 123, "title": "Test PR", "author": {"login": "testuser"}, "state": "open", "url": "https://github.com/test/repo/pull/123"}]',
@@ -130,8 +387,9 @@ class TestGhTool:
         assert items[0]["title"] == "Test PR"
         assert items[0]["author"]["login"] == "testuser"
 
-    @patch("subprocess.run")
-    def test_get_items_failure(self, mock_run):
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    @patch.object(GhTool, "get_repo", return_value=None)
+    def test_get_items_failure(self, mock_repo, mock_run):
         tool = GhTool()
         mock_run.side_effect = subprocess.CalledProcessError(1, "gh")
 
@@ -147,6 +405,24 @@ class TestGhTool:
         assert "Test pull request title" in display
         assert "testuser" in display
 
+    @patch("subprocess.run")
+    def test_actions_run_against_the_tools_repository(self, mock_run):
+        store = Mock()
+        tool = GhTool(store=store, repo=("user", "api"))
+        item = {"number": 7}
+
+        with patch("sys.stdin", io.StringIO("y\n")), patch("builtins.print"):
+            tool.handle_additional_action("c", item)
+            assert tool.handle_additional_action("m", item)
+            assert tool.handle_additional_action("a", item)
+
+        assert [call.args[0] for call in mock_run.call_args_list] == [
+            ["gh", "pr", "checkout", "7", "--repo", "user/api"],
+            ["gh", "pr", "merge", "7", "--repo", "user/api"],
+            ["gh", "pr", "create", "--repo", "user/api"],
+        ]
+        store.invalidate.assert_called_with("user", "api")
+
 
 class TestCmdPicker:
     @patch.object(TmuxTool, "is_available", return_value=True)
@@ -180,6 +456,371 @@ class TestCmdPicker:
         with pytest.raises(SystemExit):
             picker.run()
 
+    def test_preview_placeholder_while_loading(self):
+        tool = TmuxTool()
+        picker = CmdPicker(tool)
+        picker.items = [{"name": "session1", "windows": "1", "created": "0"}]
+
+        with patch.object(picker.previews, "get", return_value=None):
+            assert CmdPicker.LOADING_PLACEHOLDER in picker.get_selected_preview()
+
+    def test_prefetch_follows_direction(self):
+        tool = TmuxTool()
+        picker = CmdPicker(tool)
+        picker.items = [{"name": f"s{i}", "windows": "1", "created": "0"} for i in range(10)]
+        picker.selected_index = 5
+
+        with (
+            patch.object(picker.previews, "get", return_value="cached"),
+            patch.object(picker.previews, "prefetch") as mock_prefetch,
+        ):
+            picker.direction = 1
+            picker.get_selected_preview()
+            assert [i["name"] for i in mock_prefetch.call_args[0][0]] == ["s6", "s7", "s8"]
+
+            picker.direction = -1
+            picker.get_selected_preview()
+            assert [i["name"] for i in mock_prefetch.call_args[0][0]] == ["s4", "s3", "s2"]
+
+    def test_wake_interrupts_get_key(self):
+        picker = CmdPicker(TmuxTool())
+        picker.wake()
+
+        with (
+            patch("termios.tcgetattr"),
+            patch("termios.tcsetattr"),
+            patch("tty.setraw"),
+            patch("sys.stdin") as mock_stdin,
+        ):
+            read_fd, write_fd = os.pipe()
+            mock_stdin.fileno.return_value = read_fd
+            assert picker.get_key() == ""
+            os.close(read_fd)
+            os.close(write_fd)
+
+    @patch.object(TmuxTool, "is_available", return_value=True)
+    def test_run_closes_the_wake_pipe(self, mock_is_available):
+        picker = CmdPicker(TmuxTool())
+        wake_fds = (picker._wake_r, picker._wake_w)
+        with (
+            patch.object(TmuxTool, "get_items", return_value=[{"name": "a", "windows": "1", "created": "0"}]),
+            patch.object(picker, "display_interface"),
+            patch.object(picker.renderer, "start"),
+            patch.object(picker, "get_key", side_effect=["q"]),
+            patch("os.close", wraps=os.close) as mock_close,
+        ):
+            picker.run()
+
+        assert {call.args[0] for call in mock_close.call_args_list} >= set(wake_fds)
+        picker.wake()  # a worker finishing after run() returned writes nowhere
+
+    def test_navigation_writes_far_fewer_bytes_than_full_redraw(self):
+        tool = TmuxTool()
+        picker = CmdPicker(tool)
+        picker.renderer = ScreenRenderer(out=io.StringIO(), size=(120, 60))
+        picker.items = [{"name": f"session{i}", "windows": "2", "created": "0"} for i in range(300)]
+
+        with patch.object(picker.previews, "get", return_value="\n".join(f"line {i}" for i in range(30))):
+            full_redraw = picker.renderer.render(picker.build_frame(120, 60))
+            picker.selected_index = 1
+            incremental = picker.renderer.render(picker.build_frame(120, 60))
+
+        assert incremental > 0
+        assert full_redraw / incremental >= 10
+
+    def test_reload_after_tool_reports_change(self):
+        tool = TmuxTool()
+        picker = CmdPicker(tool)
+        picker.set_items([{"name": "a", "windows": "1", "created": "0"}])
+
+        with patch.object(TmuxTool, "get_items", return_value=[{"name": "b", "windows": "1", "created": "0"}]) as mock:
+            picker.reload_if_changed()
+            mock.assert_not_called()
+
+            picker.on_items_changed()
+            picker.reload_if_changed()
+            # The list is fetched off the key-handling thread and swapped in by the loop
+            assert picker.refreshing
+            deadline = time.monotonic() + 2
+            while picker._refreshed is None and time.monotonic() < deadline:
+                time.sleep(0.005)
+            picker.apply_refreshed_items()
+
+        assert [item["name"] for item in picker.items] == ["b"]
+
+    @patch.object(TmuxTool, "is_available", return_value=True)
+    def test_action_refreshes_in_background_and_quits_when_emptied(self, mock_is_available):
+        picker = CmdPicker(TmuxTool())
+        sessions = [{"name": "a", "windows": "1", "created": "0"}]
+        fetched_on = []
+
+        def get_items():
+            fetched_on.append(threading.current_thread())
+            return list(sessions)
+
+        def kill_session(key, item):
+            sessions.clear()
+            return True
+
+        keys = iter(["x"])
+
+        def get_key():
+            key = next(keys, None)
+            if key is not None:
+                return key
+            # The action returned before the list was re-read; the worker wakes the loop once it is in
+            deadline = time.monotonic() + 2
+            while picker._refreshed is None and time.monotonic() < deadline:
+                time.sleep(0.005)
+            return "" if picker._refreshed is not None else "q"
+
+        with (
+            patch.object(TmuxTool, "get_items", side_effect=get_items),
+            patch.object(TmuxTool, "handle_additional_action", side_effect=kill_session),
+            patch.object(TmuxTool, "execute_action") as mock_execute,
+            patch.object(picker, "display_interface"),
+            patch.object(picker.renderer, "start"),
+            patch.object(picker, "get_key", side_effect=get_key),
+        ):
+            picker.run()
+
+        assert picker.all_items == []
+        assert fetched_on[0] is threading.main_thread() and fetched_on[1] is not threading.main_thread()
+        mock_execute.assert_not_called()
+
+    @patch.object(TmuxTool, "is_available", return_value=True)
+    def test_live_mode_watches_tool(self, mock_is_available):
+        tool = TmuxTool()
+        picker = CmdPicker(tool)
+        picker.live = True
+        item = {"name": "a", "windows": "1", "created": "0"}
+        with (
+            patch.object(TmuxTool, "get_items", return_value=[item]),
+            patch.object(TmuxTool, "watch") as mock_watch,
+            patch.object(TmuxTool, "unwatch") as mock_unwatch,
+            patch.object(TmuxTool, "execute_action") as mock_execute,
+            patch.object(picker, "display_interface"),
+            patch.object(picker.renderer, "start"),
+            patch.object(picker, "get_key", side_effect=["\r"]),
+        ):
+            picker.run()
+
+        mock_watch.assert_called_once_with(picker.on_items_changed)
+        mock_unwatch.assert_called_once()
+        mock_execute.assert_called_once_with(item)
+
+
+class TestViewport:
+    def test_selection_below_window_scrolls_down(self):
+        viewport = Viewport()
+        assert viewport.scroll_to(0, 10, 100) == range(0, 10)
+        assert viewport.scroll_to(15, 10, 100) == range(6, 16)
+
+    def test_selection_above_window_scrolls_up(self):
+        viewport = Viewport()
+        viewport.scroll_to(50, 10, 100)
+        assert viewport.scroll_to(30, 10, 100) == range(30, 40)
+
+    def test_window_stays_put_while_selection_inside(self):
+        viewport = Viewport()
+        viewport.scroll_to(15, 10, 100)
+        assert viewport.scroll_to(10, 10, 100) == range(6, 16)
+
+    def test_short_list(self):
+        viewport = Viewport()
+        assert viewport.scroll_to(2, 10, 3) == range(0, 3)
+        assert viewport.scroll_to(0, 10, 0) == range(0)
+
+    def test_list_shrinking_pulls_window_back(self):
+        viewport = Viewport()
+        viewport.scroll_to(99, 10, 100)
+        assert viewport.scroll_to(4, 10, 5) == range(0, 5)
+
+
+class TestCmdPickerScrolling:
+    def make_picker(self, count):
+        tool = DockerTool()
+        picker = CmdPicker(tool)
+        picker.items = [
+            {"id": f"{i:012d}", "name": f"container{i}", "status": "Up", "image": "nginx"} for i in range(count)
+        ]
+        return picker
+
+    def test_frame_formats_only_visible_rows(self):
+        picker = self.make_picker(2000)
+        picker.selected_index = 1500
+
+        with (
+            patch.object(picker.previews, "get", return_value="preview"),
+            patch.object(DockerTool, "get_item_display", return_value="row") as mock_display,
+        ):
+            picker.build_frame(120, 50)
+
+        assert mock_display.call_count == picker.list_height
+        assert mock_display.call_count < 50
+
+    def test_selection_always_visible(self):
+        picker = self.make_picker(2000)
+
+        with patch.object(picker.previews, "get", return_value="preview"):
+            for index in (0, 100, 1999, 40, 41):
+                picker.selected_index = index
+                frame = "\n".join(picker.build_frame(120, 50))
+                assert f"container{index}\x1b[0m" in frame
+
+    def test_page_and_jump_keys(self):
+        picker = self.make_picker(100)
+        picker.list_height = 20
+
+        picker.move_selection(picker.list_height)
+        assert picker.selected_index == 20
+        picker.move_selection(-picker.list_height)
+        assert picker.selected_index == 0
+        picker.move_selection(len(picker.items))
+        assert picker.selected_index == 99
+        assert picker.direction == 1
+        picker.move_selection(-len(picker.items))
+        assert picker.selected_index == 0
+        assert picker.direction == -1
+
+    @patch.object(DockerTool, "is_available", return_value=True)
+    def test_run_dispatches_navigation_keys(self, mock_is_available):
+        picker = self.make_picker(100)
+        with (
+            patch.object(DockerTool, "get_items", return_value=picker.items),
+            patch.object(picker, "display_interface"),
+            patch.object(picker.renderer, "start"),
+            patch.object(picker, "get_key", side_effect=["\x1b[6~", "G", "\x1b[5~", "g", "j", "q"]),
+        ):
+            picker.list_height = 10
+            positions = []
+            picker.display_interface.side_effect = lambda: positions.append(picker.selected_index)
+            picker.run()
+
+        assert positions == [0, 10, 99, 89, 0, 1]
+
+    @patch.object(DockerTool, "is_available", return_value=True)
+    def test_held_key_is_coalesced_into_few_frames(self, mock_is_available):
+        picker = self.make_picker(1000)
+        read_fd, write_fd = os.pipe()
+        # Key repeat: every j is queued before the picker gets to read any of them
+        os.write(write_fd, b"j" * 1200 + b"k\x1b[A" + b"q")
+        with (
+            patch.object(DockerTool, "get_items", return_value=picker.items),
+            patch.object(picker, "display_interface") as mock_display,
+            patch.object(picker.renderer, "start"),
+            patch("sys.stdin") as mock_stdin,
+        ):
+            mock_stdin.fileno.return_value = read_fd
+            picker.run()
+        os.close(read_fd)
+        os.close(write_fd)
+
+        assert picker.selected_index == 997
+        assert mock_display.call_count <= 3
+
+    def test_navigation_keys_queued_behind_each_other_are_one_move(self):
+        picker = self.make_picker(100)
+        picker.list_height = 10
+        picker._pending_keys.extend(["G", "k", "\x1b[5~", "x", "j"])
+
+        picker.navigate("j")
+
+        assert picker.selected_index == 88
+        assert list(picker._pending_keys) == ["x", "j"]
+        assert picker.direction == 1
+
+
+class TestCmdPickerFilter:
+    def make_picker(self):
+        tool = GhTool()
+        picker = CmdPicker(tool)
+        picker.set_items(
+            [
+                {"number": 1, "title": "Fix login bug", "author": {"login": "alice"}, "headRefName": "fix-login"},
+                {"number": 2, "title": "Add docker support", "author": {"login": "bob"}, "headRefName": "docker"},
+                {"number": 3, "title": "Update README", "author": {"login": "carol"}, "headRefName": "docs"},
+            ]
+        )
+        return picker
+
+    def type(self, picker, text):
+        for char in text:
+            picker.handle_filter_key(char)
+
+    def test_search_text_fields(self):
+        assert TmuxTool().get_search_text({"name": "work"}) == "work"
+        docker_text = DockerTool().get_search_text({"id": "abc", "name": "web", "image": "nginx", "status": "Up"})
+        assert docker_text == "web nginx abc"
+        gh_text = GhTool().get_search_text(
+            {"number": 7, "title": "Title", "author": {"login": "dev"}, "headRefName": "branch"}
+        )
+        assert gh_text == "#7 Title dev branch"
+
+    def test_typing_narrows_items(self):
+        picker = self.make_picker()
+        picker.filtering = True
+
+        self.type(picker, "bob")
+        assert [item["number"] for item in picker.items] == [2]
+        assert len(picker.all_items) == 3
+
+    def test_backspace_and_escape(self):
+        picker = self.make_picker()
+        picker.filtering = True
+        self.type(picker, "bobx")
+        assert picker.items == []
+
+        picker.handle_filter_key("\x7f")
+        assert [item["number"] for item in picker.items] == [2]
+
+        picker.handle_filter_key("\x1b")
+        assert not picker.filtering
+        assert picker.filter_query == ""
+        assert len(picker.items) == 3
+
+    def test_enter_keeps_filter(self):
+        picker = self.make_picker()
+        picker.filtering = True
+        self.type(picker, "#3")
+        picker.handle_filter_key("\r")
+
+        assert not picker.filtering
+        assert [item["number"] for item in picker.items] == [3]
+
+    def test_refresh_keeps_filter_and_selection(self):
+        picker = self.make_picker()
+        picker.filter_query = "o"
+        picker.apply_filter()
+        picker.selected_index = [item["number"] for item in picker.items].index(2)
+
+        picker.set_items(list(reversed(picker.all_items)))
+
+        assert picker.items[picker.selected_index]["number"] == 2
+
+    def test_frame_with_no_matches(self):
+        picker = self.make_picker()
+        picker.filter_query = "zzz"
+        picker.apply_filter()
+
+        frame = "\n".join(picker.build_frame(100, 40))
+        assert "no items match 'zzz'" in frame
+        assert "/zzz" in frame
+
+    @patch.object(GhTool, "is_available", return_value=True)
+    def test_run_filter_mode(self, mock_is_available):
+        picker = self.make_picker()
+        with (
+            patch.object(GhTool, "get_items", return_value=picker.all_items),
+            patch.object(picker, "display_interface"),
+            patch.object(picker.renderer, "start"),
+            patch.object(picker, "get_key", side_effect=["/", "q", "\r", "q"]),
+        ):
+            picker.run()
+
+        # "q" typed in filter mode is part of the query, the second one quits
+        assert picker.filter_query == "q"
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.cmd_picker import DaemonTool, GhTool, Tool, daemon_tool
+from py_scripts.cmd_picker.daemon import DaemonClient, DaemonError, PickerDaemon
+
+
+class FakeTool(Tool):
+    """A backend that takes a while to list its items"""
+
+    preview_ttl = 60.0
+
+    def __init__(self, context="fake-context", delay=0.0):
+        self.context = context
+        self.delay = delay
+        self.items = [{"name": f"item-{i}"} for i in range(3)]
+        self.fetches = 0
+        self.previews = []
+        self.on_change = None
+
+    @property
+    def name(self):
+        return "fake"
+
+    @property
+    def description(self):
+        return "Fake tool"
+
+    def is_available(self):
+        return True
+
+    def get_items(self):
+        self.fetches += 1
+        time.sleep(self.delay)
+        return list(self.items)
+
+    def get_item_display(self, item, selected):
+        return item["name"]
+
+    def get_item_preview(self, item):
+        self.previews.append(item["name"])
+        return f"preview of {item['name']}"
+
+    def execute_action(self, item):
+        pass
+
+    def get_item_key(self, item):
+        return item["name"]
+
+    def get_snapshot_context(self):
+        return self.context
+
+    def handle_additional_action(self, key, item):
+        return key == "x"
+
+    def watch(self, on_change):
+        self.on_change = on_change
+        return True
+
+
+@pytest.fixture
+def socket_path():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield os.path.join(tmp, "picker.sock")
+
+
+@pytest.fixture
+def served(socket_path):
+    """A daemon serving one FakeTool, and a client connected to it"""
+    tool = FakeTool()
+    daemon = PickerDaemon(lambda name, context: tool if context == tool.context else None, socket_path)
+    daemon.bind()
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    client = DaemonClient(socket_path, timeout=5)
+    yield tool, daemon, client
+    client.close()
+    if daemon.server is not None:
+        daemon.server.shutdown()
+    thread.join(2)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class TestPickerDaemon:
+    def test_items_are_served_warm(self, served):
+        tool, _, client = served
+
+        first = client.items("fake", "fake-context")
+        again = client.items("fake", "fake-context")
+
+        assert first == again == tool.items
+        assert tool.fetches == 1
+
+    def test_refresh_request_fetches_again(self, served):
+        tool, _, client = served
+        client.items("fake", "fake-context")
+        tool.items = [{"name": "new"}]
+
+        assert client.items("fake", "fake-context", refresh=True) == [{"name": "new"}]
+
+    def test_previews_of_first_rows_are_precomputed(self, served):
+        tool, _, client = served
+        client.items("fake", "fake-context")
+        assert wait_for(lambda: len(tool.previews) == 3)
+
+        assert client.preview("fake", "fake-context", {"name": "item-1"}) == "preview of item-1"
+        assert sorted(tool.previews) == ["item-0", "item-1", "item-2"]
+
+    def test_change_notification_refreshes_in_background(self, served):
+        tool, _, client = served
+        client.items("fake", "fake-context")
+        tool.items = [{"name": "renamed"}]
+
+        tool.on_change()
+
+        assert wait_for(lambda: client.items("fake", "fake-context") == [{"name": "renamed"}])
+
+    def test_unknown_context(self, served):
+        _, _, client = served
+        with pytest.raises(DaemonError, match="cannot serve"):
+            client.items("fake", "elsewhere")
+
+    def test_stop_removes_socket(self, served, socket_path):
+        _, daemon, client = served
+        client.stop()
+        assert wait_for(lambda: not os.path.exists(socket_path))
+        assert not client.ping()
+
+    def test_refuses_to_replace_live_daemon(self, served, socket_path):
+        with pytest.raises(DaemonError, match="already listening"):
+            PickerDaemon(lambda name, context: None, socket_path).bind()
+
+    def test_replaces_stale_socket(self, socket_path):
+        open(socket_path, "w").close()
+        daemon = PickerDaemon(lambda name, context: None, socket_path)
+        daemon.bind()
+        assert daemon.server is not None
+        daemon.close()
+        assert not os.path.exists(socket_path)
+
+    def test_socket_is_private(self, served, socket_path):
+        assert os.stat(socket_path).st_mode & 0o077 == 0
+
+    def test_client_reconnects_after_restart(self, served, socket_path):
+        tool, daemon, client = served
+        assert client.ping()
+        daemon.server.shutdown()
+        daemon.close()
+
+        restarted = PickerDaemon(lambda name, context: tool, socket_path)
+        restarted.bind()
+        threading.Thread(target=restarted.serve_forever, daemon=True).start()
+        try:
+            assert client.items("fake", "fake-context") == tool.items
+        finally:
+            restarted.server.shutdown()
+
+
+class TestDaemonTool:
+    def test_warm_items_skip_slow_backend(self, served):
+        tool, _, client = served
+        client.items("fake", "fake-context")
+        tool.delay = 0.5
+
+        started = time.perf_counter()
+        items = DaemonTool(FakeTool(), client).get_items()
+
+        assert time.perf_counter() - started < 0.05
+        assert items == tool.items
+
+    def test_action_makes_next_list_fresh(self, served):
+        tool, _, client = served
+        wrapped = DaemonTool(FakeTool(), client)
+        wrapped.get_items()
+        tool.items = [{"name": "after-action"}]
+
+        assert wrapped.handle_additional_action("x", {"name": "item-0"})
+        assert wrapped.get_items() == [{"name": "after-action"}]
+
+    def test_falls_back_to_local_tool(self, socket_path):
+        local = FakeTool()
+        wrapped = DaemonTool(local, DaemonClient(socket_path))
+
+        assert wrapped.get_items() == local.items
+        assert wrapped.get_item_preview({"name": "item-0"}) == "preview of item-0"
+        assert local.fetches == 1
+
+    def test_delegates_to_wrapped_tool(self, socket_path):
+        local = FakeTool()
+        wrapped = DaemonTool(local, DaemonClient(socket_path))
+        assert wrapped.name == "fake"
+        assert wrapped.preview_ttl == 60.0
+        assert wrapped.get_item_key({"name": "a"}) == "a"
+
+
+class TestDaemonToolFactory:
+    def test_other_repository_is_served_with_repo_flag(self):
+        with patch.dict(os.environ, {"GH_HOST": "github.com"}):
+            with patch.object(GhTool, "get_repo", return_value=("octo", "here")):
+                tool = daemon_tool("gh", "github.com/octo/elsewhere")
+
+        assert isinstance(tool, GhTool)
+        assert tool.get_repo() == ("octo", "elsewhere")
+        assert tool.repo_args == ["--repo", "octo/elsewhere"]
+
+    def test_unknown_tool_or_host(self):
+        assert daemon_tool("nope", "x") is None
+        with patch.dict(os.environ, {"GH_HOST": "github.com"}):
+            with patch.object(GhTool, "get_repo", return_value=None):
+                assert daemon_tool("gh", "ghe.example.com/octo/repo") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.cmd_picker import DockerTool
+from py_scripts.cmd_picker.docker_api import DockerAPI, DockerAPIError, LogDemuxer, demux_logs
+
+# Trimmed responses recorded from a Docker 27 daemon
+CONTAINERS = [
+    {
+        "Id": "abc123456789def0123456789abcdef0123456789abcdef0123456789abcdef0",
+        "Names": ["/web"],
+        "Image": "nginx:latest",
+        "State": "running",
+        "Status": "Up 2 hours",
+    },
+    {
+        "Id": "fedcba9876543210fedcba9876543210fedcba9876543210fedcba9876543210",
+        "Names": ["/db"],
+        "Image": "postgres:16",
+        "State": "exited",
+        "Status": "Exited (0) 3 days ago",
+    },
+]
+INSPECT = {
+    "abc123456789": {
+        "Name": "/web",
+        "Created": "2024-05-01T10:00:00.000000000Z",
+        "Config": {"Image": "nginx:latest"},
+        "State": {"Status": "running"},
+        "NetworkSettings": {"Ports": {"80/tcp": [{"HostIp": "0.0.0.0", "HostPort": "8080"}], "443/tcp": None}},
+    },
+    "fedcba987654": {
+        "Name": "/db",
+        "Created": "2024-04-28T08:30:00.000000000Z",
+        "Config": {"Image": "postgres:16"},
+        "State": {"Status": "exited"},
+        "NetworkSettings": {"Ports": {}},
+    },
+}
+
+
+def frame(stream: int, payload: bytes) -> bytes:
+    return struct.pack(">BxxxI", stream, len(payload)) + payload
+
+
+LOGS = {"abc123456789": frame(1, b"GET / 200\n") + frame(2, b"warning: slow\n")}
+
+
+class FakeDaemonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        path = self.path.split("?")[0]
+        parts = path.strip("/").split("/")
+        if path == "/containers/json":
+            self.reply(200, json.dumps(CONTAINERS).encode())
+        elif len(parts) == 3 and parts[0] == "containers" and parts[2] == "json" and parts[1] in INSPECT:
+            self.reply(200, json.dumps(INSPECT[parts[1]]).encode())
+        elif len(parts) == 3 and parts[2] == "logs" and parts[1] in INSPECT and "follow=1" in self.path:
+            self.stream(LOGS.get(parts[1], b""))
+        elif len(parts) == 3 and parts[0] == "containers" and parts[2] == "logs" and parts[1] in INSPECT:
+            self.reply(200, LOGS.get(parts[1], b""), "application/vnd.docker.raw-stream")
+        else:
+            self.reply(404, b'{"message": "No such container"}')
+
+    def reply(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, data):
+        """Send data in small chunks, then keep the request open until the client leaves"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for pos in range(0, len(data), 5):
+            chunk = data[pos : pos + 5]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+        self.rfile.read(1)
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, FakeDaemonHandler)
+        self.requests = []
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up early (e.g. after an error status) are expected
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+@pytest.fixture
+def daemon():
+    with tempfile.TemporaryDirectory() as tmp:
+        server = FakeDaemon(os.path.join(tmp, "docker.sock"))
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def api(daemon):
+    client = DockerAPI(daemon.server_address, timeout=2.0)
+    yield client
+    client.close()
+
+
+class TestDemuxLogs:
+    def test_strips_stream_headers(self):
+        assert demux_logs(LOGS["abc123456789"]) == "GET / 200\nwarning: slow\n"
+
+    def test_tty_output_is_passed_through(self):
+        assert demux_logs(b"plain output\n") == "plain output\n"
+
+    def test_empty(self):
+        assert demux_logs(b"") == ""
+
+    def test_incremental_demux_at_every_split(self):
+        data = LOGS["abc123456789"]
+        for size in range(1, len(data) + 1):
+            demuxer = LogDemuxer()
+            out = b"".join(demuxer.feed(data[pos : pos + size]) for pos in range(0, len(data), size))
+            assert out == b"GET / 200\nwarning: slow\n", size
+
+    def test_incremental_tty_stream(self):
+        demuxer = LogDemuxer()
+        assert demuxer.feed(b"plain") == b"plain"
+        assert demuxer.feed(b"\x01\x00 more") == b"\x01\x00 more"
+
+
+class TestDockerAPI:
+    def test_list_inspect_and_logs(self, api, daemon):
+        containers = api.list_containers()
+        assert [c["Names"][0] for c in containers] == ["/web", "/db"]
+        assert daemon.requests[0] == "/containers/json?all=1"
+
+        assert api.inspect("abc123456789")["State"]["Status"] == "running"
+        assert api.logs("abc123456789") == "GET / 200\nwarning: slow\n"
+
+    def test_requests_share_one_keep_alive_connection(self, api, daemon):
+        api.list_containers()
+        api.inspect_many(["abc123456789", "fedcba987654"])
+        api.logs("abc123456789")
+        assert len(daemon.requests) == 4
+        assert daemon.connections == 1
+
+    def test_inspect_many_skips_missing_containers(self, api):
+        results = api.inspect_many(["abc123456789", "gone00000000"])
+        assert list(results) == ["abc123456789"]
+
+    def test_error_status_raises(self, api):
+        with pytest.raises(DockerAPIError) as excinfo:
+            api.inspect("gone00000000")
+        assert excinfo.value.status == 404
+
+    def test_reconnects_after_daemon_closed_idle_connection(self, api, daemon):
+        api.list_containers()
+        api._local.conn.sock.close()  # simulate the daemon dropping the idle socket
+        assert api.inspect("fedcba987654")["Name"] == "/db"
+        assert daemon.connections == 2
+
+    def test_follow_logs_streams_until_stopped(self, api):
+        chunks, stop = api.follow_logs("abc123456789")
+        received = b""
+        for chunk in chunks:
+            received += chunk
+            if received == b"GET / 200\nwarning: slow\n":
+                break
+        stop()
+        assert list(chunks) == []
+
+    def test_follow_logs_unblocks_reader_on_stop(self, api):
+        chunks, stop = api.follow_logs("fedcba987654")
+        done = threading.Event()
+
+        def read_all():
+            list(chunks)
+            done.set()
+
+        threading.Thread(target=read_all, daemon=True).start()
+        assert not done.wait(0.1)
+        stop()
+        assert done.wait(2)
+
+    def test_follow_missing_container(self, api):
+        with pytest.raises(DockerAPIError) as excinfo:
+            api.follow_logs("gone00000000")
+        assert excinfo.value.status == 404
+
+    def test_unreachable_socket(self):
+        api = DockerAPI("/nonexistent/docker.sock", timeout=0.5)
+        assert not api.available()
+        with pytest.raises(DockerAPIError):
+            api.list_containers()
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {"DOCKER_HOST": ""}):
+            assert DockerAPI.from_env().socket_path == "/var/run/docker.sock"
+        with patch.dict(os.environ, {"DOCKER_HOST": "unix:///run/user/1000/docker.sock"}):
+            assert DockerAPI.from_env().socket_path == "/run/user/1000/docker.sock"
+        with patch.dict(os.environ, {"DOCKER_HOST": "tcp://10.0.0.5:2375"}):
+            assert DockerAPI.from_env() is None
+
+
+class TestDockerToolWithAPI:
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    def test_get_items_uses_api(self, mock_run, api):
+        items = DockerTool(api=api).get_items()
+
+        mock_run.assert_not_called()
+        assert items[0] == {
+            "id": "abc123456789",
+            "name": "web",
+            "status": "Up 2 hours",
+            "image": "nginx:latest",
+            "type": "container",
+        }
+        assert items[1]["name"] == "db"
+
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    def test_preview_matches_cli_format(self, mock_run, api):
+        preview = DockerTool(api=api).get_item_preview({"id": "abc123456789"})
+
+        mock_run.assert_not_called()
+        assert "/web: nginx:latest\nStatus: running\nCreated: 2024-05-01T10:00:00.000000000Z" in preview
+        assert "Ports: 80/tcp->8080" in preview
+        assert "443/tcp" not in preview
+        assert "GET / 200\nwarning: slow" in preview
+
+    def test_preview_of_container_without_logs(self, api):
+        preview = DockerTool(api=api).get_item_preview({"id": "fedcba987654"})
+        assert "No logs available" in preview
+
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    def test_falls_back_to_cli_when_socket_is_unusable(self, mock_run):
+        mock_run.return_value = Mock(stdout="abc123456789\tweb\tUp 2 hours\tnginx:latest\n", returncode=0)
+        tool = DockerTool(api=DockerAPI("/nonexistent/docker.sock"))
+
+        items = tool.get_items()
+
+        assert mock_run.call_args[0][0][:2] == ["docker", "ps"]
+        assert items[0]["name"] == "web"
+
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    def test_falls_back_to_cli_when_api_fails(self, mock_run):
+        api = Mock(spec=DockerAPI)
+        api.available.return_value = True
+        api.list_containers.side_effect = DockerAPIError("HTTP 500", status=500)
+        mock_run.return_value = Mock(stdout="abc123456789\tweb\tUp 2 hours\tnginx:latest\n", returncode=0)
+
+        items = DockerTool(api=api).get_items()
+
+        assert mock_run.called
+        assert items[0]["id"] == "abc123456789"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.cmd_picker import CmdPicker, GhTool
+from py_scripts.cmd_picker.github_graphql import PullRequestClient, PullRequestStore
+from py_scripts.http_cache.github import GitHubGraphQLError
+from py_scripts.http_cache.github import GitHubAPI
+from py_scripts.http_cache.http_cache import HTTPCache
+
+
+def pr_node(number):
+    """A pullRequests node as GitHub returns it for PULL_REQUESTS_QUERY"""
+    return {
+        "number": number,
+        "title": f"Change number {number}",
+        "state": "OPEN",
+        "url": f"https://github.com/octo/repo/pull/{number}",
+        "headRefName": f"feature-{number}",
+        "baseRefName": "main",
+        "createdAt": "2024-05-01T10:00:00Z",
+        "updatedAt": "2024-05-02T10:00:00Z",
+        "additions": number,
+        "deletions": 1,
+        "changedFiles": 2,
+        "author": {"login": "octocat"} if number % 10 else None,
+        "commits": {
+            "nodes": [
+                {
+                    "commit": {
+                        "oid": f"{number:04d}{i}" + "a" * 35,
+                        "messageHeadline": f"commit {i}",
+                        "author": {"name": "Mona"},
+                    }
+                }
+                for i in range(2)
+            ]
+        },
+        "files": {"nodes": [{"path": "src/app.py"}, {"path": f"tests/test_{number}.py"}]},
+    }
+
+
+def page(numbers, next_cursor=None):
+    return {
+        "data": {
+            "repository": {
+                "pullRequests": {
+                    "pageInfo": {"hasNextPage": next_cursor is not None, "endCursor": next_cursor},
+                    "nodes": [pr_node(n) for n in numbers],
+                }
+            }
+        }
+    }
+
+
+# Recorded responses for 100 open pull requests, served 50 per page
+PAGES = {None: page(range(100, 50, -1), "Y3Vyc29yOjUw"), "Y3Vyc29yOjUw": page(range(50, 0, -1))}
+
+
+class FakeGraphQLHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.headers.get("Authorization"), body["variables"]))
+        if self.server.fail:
+            self.reply(502, {"message": "Bad Gateway"})
+        elif body["variables"]["name"] != "repo":
+            self.reply(
+                200, {"data": {"repository": None}, "errors": [{"message": "Could not resolve to a Repository"}]}
+            )
+        else:
+            self.reply(200, PAGES[body["variables"]["cursor"]])
+
+    def do_GET(self):
+        """REST pull request list, answering 304 while it is unchanged"""
+        self.server.rest_requests.append(self.path)
+        etag = '"v%d"' % self.server.rest_version
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        pulls = [
+            {"number": n, "head": {"sha": f"sha{n}-{self.server.rest_version}"}, "updated_at": "2024-05-02T10:00:00Z"}
+            for n in range(100, 0, -1)
+        ]
+        self.reply(200, pulls, {"ETag": etag})
+
+    def reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGraphQLHandler)
+    server.requests = []
+    server.rest_requests = []
+    server.rest_version = 1
+    server.fail = False
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    return PullRequestClient(endpoint=f"http://127.0.0.1:{server.server_address[1]}/graphql", token="secret")
+
+
+@pytest.fixture
+def cache_dir():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield Path(tmp)
+
+
+class TestPullRequestClient:
+    def test_fetches_all_pages(self, client, server):
+        items = client.pull_requests("octo", "repo")
+
+        assert [item["number"] for item in items] == list(range(100, 0, -1))
+        assert [variables["cursor"] for _, variables in server.requests] == [None, "Y3Vyc29yOjUw"]
+        assert server.requests[0][0] == "bearer secret"
+
+    def test_items_match_gh_pr_list_shape(self, client):
+        item = client.pull_requests("octo", "repo")[1]
+
+        assert item["number"] == 99
+        assert item["author"] == {"login": "octocat"}
+        assert item["headRefName"] == "feature-99"
+        assert item["files"] == ["src/app.py", "tests/test_99.py"]
+        assert item["commits"][0]["messageHeadline"] == "commit 0"
+
+    def test_deleted_author(self, client):
+        item = client.pull_requests("octo", "repo")[0]
+        assert item["number"] == 100
+        assert item["author"] == {"login": "ghost"}
+
+    def test_max_items(self, client, server):
+        client.max_items = 30
+        assert len(client.pull_requests("octo", "repo")) == 50
+        assert server.requests[0][1]["pageSize"] == 30
+
+    def test_errors(self, client, server):
+        with pytest.raises(GitHubGraphQLError, match="Could not resolve") as error:
+            client.pull_requests("octo", "missing")
+        # The data GitHub sent with the errors comes along
+        assert error.value.data == {"repository": None}
+        assert error.value.errors == [{"message": "Could not resolve to a Repository"}]
+        server.fail = True
+        with pytest.raises(GitHubGraphQLError):
+            client.pull_requests("octo", "repo")
+
+
+class TestPullRequestStore:
+    def test_cached_on_disk_per_repo(self, client, server, cache_dir):
+        store = PullRequestStore(client, cache_dir=cache_dir)
+        first = store.get("octo", "repo")
+
+        again = PullRequestStore(client, cache_dir=cache_dir).get("octo", "repo")
+
+        assert again == first
+        assert len(server.requests) == 2
+        assert (cache_dir / "octo__repo.json").exists()
+
+    def test_refetches_when_too_old(self, client, server, cache_dir):
+        now = [1000.0]
+        store = PullRequestStore(client, cache_dir=cache_dir, max_age=60, clock=lambda: now[0])
+        store.get("octo", "repo")
+        now[0] += 61
+        store.get("octo", "repo")
+        assert len(server.requests) == 4
+
+    def test_serves_stale_copy_when_offline(self, client, server, cache_dir):
+        now = [1000.0]
+        store = PullRequestStore(client, cache_dir=cache_dir, max_age=60, clock=lambda: now[0])
+        items = store.get("octo", "repo")
+        now[0] += 3600
+        server.fail = True
+        assert store.get("octo", "repo") == items
+
+    def test_invalidate(self, client, server, cache_dir):
+        store = PullRequestStore(client, cache_dir=cache_dir)
+        store.get("octo", "repo")
+        store.invalidate("octo", "repo")
+        store.invalidate("octo", "repo")
+        store.get("octo", "repo")
+        assert len(server.requests) == 4
+
+
+class TestPullRequestStoreRevalidation:
+    def make_store(self, client, server, cache_dir, clock):
+        rest = GitHubAPI(
+            HTTPCache(cache_dir / "http"), token="secret", api_url=f"http://127.0.0.1:{server.server_address[1]}"
+        )
+        return PullRequestStore(client, cache_dir=cache_dir, max_age=60, clock=clock, rest=rest)
+
+    def test_unchanged_list_skips_graphql(self, client, server, cache_dir):
+        now = [1000.0]
+        store = self.make_store(client, server, cache_dir, lambda: now[0])
+        items = store.get("octo", "repo")
+        assert len(server.requests) == 2
+        assert server.rest_requests == []  # nothing cached to revalidate
+
+        for _ in range(4):
+            now[0] += 61
+            assert store.get("octo", "repo") == items
+
+        # The first expired copy has no fingerprint to compare, later ones are kept
+        assert len(server.requests) == 4
+        assert len(server.rest_requests) == 4  # one full list, then 304s
+
+    def test_changed_list_refetches(self, client, server, cache_dir):
+        now = [1000.0]
+        store = self.make_store(client, server, cache_dir, lambda: now[0])
+        store.get("octo", "repo")
+        now[0] += 61
+        store.get("octo", "repo")  # records the fingerprint
+
+        server.rest_version = 2  # someone pushed to a PR
+        now[0] += 61
+        store.get("octo", "repo")
+
+        assert len(server.requests) == 6
+
+
+class TestGhToolWithGraphQL:
+    def make_tool(self, client, cache_dir):
+        tool = GhTool(store=PullRequestStore(client, cache_dir=cache_dir))
+        tool._repo = ("octo", "repo")
+        return tool
+
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    def test_navigating_100_prs_needs_no_further_requests(self, mock_run, client, server, cache_dir):
+        picker = CmdPicker(self.make_tool(client, cache_dir))
+        picker.set_items(picker.tool.get_items())
+        requests_after_list = len(server.requests)
+
+        previews = [picker.tool.get_item_preview(item) for item in picker.items]
+
+        assert len(picker.items) == 100
+        assert len(server.requests) == requests_after_list == 2
+        mock_run.assert_not_called()
+        assert "PR #57: Change number 57" in previews[43]
+        assert "commit 1" in previews[43]
+        assert "tests/test_57.py" in previews[43]
+
+    @patch("py_scripts.cmd_picker.cmd_picker.run_command")
+    def test_falls_back_to_gh_cli(self, mock_run, client, server, cache_dir):
+        server.fail = True
+        mock_run.return_value.stdout = '[{"number": 7, "title": "From gh", "author": {"login": "bob"}}]'
+
+        items = self.make_tool(client, cache_dir).get_items()
+
+        assert items[0]["title"] == "From gh"
+        assert mock_run.call_args[0][0][:3] == ["gh", "pr", "list"]
+
+    def test_preview_of_cli_item_still_runs_gh(self):
+        item = {"number": 7, "title": "t", "author": {"login": "bob"}, "headRefName": "x", "baseRefName": "main"}
+        with patch("py_scripts.cmd_picker.cmd_picker.run_command") as mock_run:
+            mock_run.return_value.stdout = '{"commits": []}'
+            GhTool().get_item_preview(item)
+        assert mock_run.call_count == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
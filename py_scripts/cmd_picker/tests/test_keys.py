@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import os
+import pty
+import sys
+import termios
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.keys import KeyParser, KeyReader
+
+
+class TestKeyParser:
+    def test_plain_and_control_keys(self):
+        assert KeyParser().feed(b"jk\r\x06") == ["j", "k", "\r", "\x06"]
+
+    def test_escape_sequences_of_any_length(self):
+        keys = KeyParser().feed(b"\x1b[A\x1b[5~\x1b[1;5C\x1bOH\x1b[F")
+        assert keys == ["\x1b[A", "\x1b[5~", "\x1b[1;5C", "\x1bOH", "\x1b[F"]
+
+    def test_sequence_split_across_reads(self):
+        parser = KeyParser()
+        assert parser.feed(b"j\x1b[") == ["j"]
+        assert parser.pending
+        assert parser.feed(b"6") == []
+        assert parser.feed(b"~k") == ["\x1b[6~", "k"]
+
+    def test_lone_escape_is_reported_on_flush(self):
+        parser = KeyParser()
+        assert parser.feed(b"\x1b") == []
+        assert parser.flush() == ["\x1b"]
+        assert not parser.pending
+
+    def test_alt_key_and_double_escape(self):
+        assert KeyParser().feed(b"\x1bx\x1b\x1b[B") == ["\x1bx", "\x1b", "\x1b[B"]
+
+    def test_utf8_split_across_reads(self):
+        parser = KeyParser()
+        data = "é".encode()
+        assert parser.feed(data[:1]) == []
+        assert parser.feed(data[1:]) == ["é"]
+
+
+class TestKeyReader:
+    @pytest.fixture
+    def pipe(self):
+        read_fd, write_fd = os.pipe()
+        yield read_fd, write_fd
+        os.close(read_fd)
+        os.close(write_fd)
+
+    def test_reads_everything_queued_at_once(self, pipe):
+        read_fd, write_fd = pipe
+        os.write(write_fd, b"jjj\x1b[B")
+        assert KeyReader(read_fd).read() == ["j", "j", "j", "\x1b[B"]
+
+    def test_waits_for_the_rest_of_a_sequence(self, pipe):
+        read_fd, write_fd = pipe
+        os.write(write_fd, b"\x1b[")
+        threading.Timer(0.01, os.write, (write_fd, b"5~")).start()
+        assert KeyReader(read_fd, esc_timeout=1.0).read() == ["\x1b[5~"]
+
+    def test_lone_escape_after_timeout(self, pipe):
+        read_fd, write_fd = pipe
+        os.write(write_fd, b"\x1b")
+        assert KeyReader(read_fd, esc_timeout=0.01).read() == ["\x1b"]
+
+    def test_wake_and_timeout(self, pipe):
+        read_fd, write_fd = pipe
+        wake_r, wake_w = os.pipe()
+        reader = KeyReader(read_fd, wake_fd=wake_r)
+        assert reader.read(timeout=0) == []
+
+        os.write(wake_w, b"\0")
+        os.write(write_fd, b"q")
+        assert reader.read() == ["", "q"]
+        os.close(wake_r)
+        os.close(wake_w)
+
+    def test_closed_input(self):
+        read_fd, write_fd = os.pipe()
+        os.close(write_fd)
+        with pytest.raises(EOFError):
+            KeyReader(read_fd).read()
+        os.close(read_fd)
+
+    def test_raw_mode_for_the_whole_session(self):
+        master, slave = pty.openpty()
+        original = termios.tcgetattr(slave)
+        reader = KeyReader(slave)
+
+        reader.start()
+        raw = termios.tcgetattr(slave)
+        assert not raw[3] & termios.ICANON
+        assert raw[1] & termios.OPOST
+        with reader.suspended():
+            assert termios.tcgetattr(slave) == original
+        assert termios.tcgetattr(slave) == raw
+        reader.stop()
+
+        assert termios.tcgetattr(slave) == original
+        os.close(master)
+        os.close(slave)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.log_stream import LogBuffer, LogStream
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+class TestLogBuffer:
+    def test_lines_split_across_chunks(self):
+        buffer = LogBuffer()
+        buffer.feed("first li")
+        buffer.feed("ne\nsecond\nthi")
+        assert buffer.tail(10) == ["first line", "second", "thi"]
+        buffer.feed("rd\n")
+        assert buffer.tail(2) == ["second", "third"]
+
+    def test_keeps_only_max_lines(self):
+        buffer = LogBuffer(max_lines=100)
+        for start in range(0, 100_000, 1000):
+            buffer.feed("".join(f"line {i}\n" for i in range(start, start + 1000)))
+        assert len(buffer.lines) == 100
+        assert buffer.tail(2) == ["line 99998", "line 99999"]
+        assert buffer.total_lines == 100_000
+
+    def test_long_lines_are_truncated(self):
+        buffer = LogBuffer(max_line_length=10)
+        buffer.feed("x" * 1_000_000)
+        assert len(buffer.partial) == 10
+        buffer.feed("y" * 50 + "\n" + "z" * 50 + "\nshort\n")
+        assert buffer.tail(3) == ["x" * 10, "z" * 10, "short"]
+
+    def test_carriage_returns_are_dropped(self):
+        buffer = LogBuffer()
+        buffer.feed("windows\r\nline\r\n")
+        assert buffer.tail(2) == ["windows", "line"]
+
+    def test_tail_of_nothing(self):
+        assert LogBuffer().tail(5) == []
+        assert LogBuffer().tail(0) == []
+
+
+class TestLogStream:
+    def test_follows_until_end(self):
+        updates = []
+        stream = LogStream(iter([b"one\n", b"two\n"]), lambda: None, on_update=lambda: updates.append(1)).start()
+        wait_for(lambda: stream.ended)
+        assert stream.tail(5) == ["one", "two"]
+        wait_for(lambda: len(updates) > 0)
+
+    def test_utf8_split_across_chunks(self):
+        data = "żółw 🐢\n".encode()
+        stream = LogStream(iter([data[:2], data[2:7], data[7:]]), lambda: None).start()
+        wait_for(lambda: stream.ended)
+        assert stream.tail(1) == ["żółw 🐢"]
+
+    def test_flood_is_throttled_and_bounded(self):
+        updates = []
+
+        def flood():
+            for i in range(2000):
+                yield b"x" * 100 + f" {i}\n".encode()
+
+        stream = LogStream(flood(), lambda: None, on_update=lambda: updates.append(1), max_lines=50, max_fps=20)
+        stream.start()
+        wait_for(lambda: stream.ended)
+        time.sleep(0.1)  # let the coalesced final update fire
+
+        assert len(stream.buffer.lines) == 50
+        assert stream.tail(1)[0].endswith(" 1999")
+        assert 1 <= len(updates) < 20
+
+    def test_last_burst_is_delivered(self):
+        updates = []
+        release = threading.Event()
+
+        def chunks():
+            yield b"first\n"
+            yield b"second\n"  # arrives inside the throttle interval
+            release.wait()
+
+        stream = LogStream(chunks(), release.set, on_update=lambda: updates.append(stream.tail(1)), max_fps=10)
+        stream.start()
+        wait_for(lambda: len(updates) >= 2)
+        assert updates[-1] == ["second"]
+        stream.close()
+
+    def test_close_stops_the_source(self):
+        release = threading.Event()
+
+        def chunks():
+            yield b"line\n"
+            release.wait()
+
+        stream = LogStream(chunks(), release.set).start()
+        wait_for(lambda: stream.tail(1) == ["line"])
+        stream.close()
+        stream.close()
+        wait_for(lambda: stream.ended)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
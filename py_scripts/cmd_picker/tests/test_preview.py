@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import pytest
+import threading
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.preview import PreviewCache, PreviewEngine
+from py_scripts.cmd_picker.runner import run_command
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPreviewCache:
+    def test_get_and_put(self):
+        cache = PreviewCache()
+        assert cache.get("a") is None
+
+        cache.put("a", "preview a")
+        assert cache.get("a") == "preview a"
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = PreviewCache(ttl=5.0, clock=clock)
+        cache.put("a", "preview a")
+
+        clock.now = 4.0
+        assert cache.get("a") == "preview a"
+
+        clock.now = 6.0
+        assert cache.get("a") is None
+        assert cache.get("a", allow_stale=True) == "preview a"
+
+    def test_lru_eviction(self):
+        cache = PreviewCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")  # a is now most recently used
+        cache.put("c", "3")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+        assert len(cache) == 2
+
+    def test_invalidate(self):
+        cache = PreviewCache()
+        cache.put("a", "1")
+        cache.put("b", "2")
+
+        cache.invalidate("a")
+        assert cache.get("a") is None
+        assert cache.get("b") == "2"
+
+        cache.invalidate()
+        assert len(cache) == 0
+
+
+class TestPreviewEngine:
+    def make_engine(self, compute, **kwargs):
+        ready = threading.Event()
+        engine = PreviewEngine(compute, key=lambda item: item["name"], on_ready=ready.set, **kwargs)
+        return engine, ready
+
+    def test_miss_then_hit(self):
+        engine, ready = self.make_engine(lambda item: f"preview {item['name']}")
+        item = {"name": "a"}
+
+        assert engine.get(item) is None
+        assert ready.wait(2)
+        assert engine.get(item) == "preview a"
+        engine.shutdown()
+
+    def test_compute_error_is_reported(self):
+        def compute(item):
+            raise RuntimeError("boom")
+
+        engine, ready = self.make_engine(compute)
+        engine.get({"name": "a"})
+
+        assert ready.wait(2)
+        assert "boom" in engine.get({"name": "a"})
+        engine.shutdown()
+
+    def test_stale_value_served_while_refreshing(self):
+        clock = FakeClock()
+        calls = []
+
+        def compute(item):
+            calls.append(item["name"])
+            return f"preview {len(calls)}"
+
+        engine, ready = self.make_engine(compute, cache=PreviewCache(ttl=1.0, clock=clock))
+        engine.get({"name": "a"})
+        assert ready.wait(2)
+        ready.clear()
+
+        clock.now = 5.0
+        assert engine.get({"name": "a"}) == "preview 1"
+        assert ready.wait(2)
+        assert engine.get({"name": "a"}) == "preview 2"
+        engine.shutdown()
+
+    def test_prefetch_fills_cache(self):
+        done = threading.Semaphore(0)
+        engine = PreviewEngine(lambda item: item["name"], key=lambda item: item["name"], on_ready=done.release)
+
+        engine.prefetch([{"name": "b"}, {"name": "c"}])
+        for _ in range(2):
+            assert done.acquire(timeout=2)
+
+        assert engine.cache.get("b") == "b"
+        assert engine.cache.get("c") == "c"
+        engine.shutdown()
+
+    def test_selected_item_served_before_prefetches(self):
+        gate = threading.Event()
+        started = threading.Event()
+        order = []
+
+        def compute(item):
+            started.set()
+            gate.wait(2)
+            order.append(item["name"])
+            return item["name"]
+
+        done = threading.Semaphore(0)
+        engine = PreviewEngine(compute, key=lambda item: item["name"], on_ready=done.release, workers=1)
+
+        engine.get({"name": "first"})  # occupies the only worker
+        assert started.wait(2)
+        engine.prefetch([{"name": "p1"}, {"name": "p2"}])
+        engine.get({"name": "selected"})
+        gate.set()
+        for _ in range(4):
+            assert done.acquire(timeout=2)
+
+        assert order == ["first", "selected", "p1", "p2"]
+        engine.shutdown()
+
+    def test_moving_the_selection_cancels_the_previous_preview(self):
+        started = threading.Event()
+
+        def compute(item):
+            if item["name"] == "slow":
+                started.set()
+                run_command(["sleep", "30"])
+            return item["name"]
+
+        engine, ready = self.make_engine(compute, workers=1)
+        engine.get({"name": "slow"})
+        assert started.wait(2)
+
+        engine.get({"name": "next"})  # the only worker is freed for it
+
+        assert ready.wait(2)
+        assert engine.get({"name": "next"}) == "next"
+        assert engine.cache.get("slow") is None
+        engine.shutdown()
+
+    def test_queue_is_bounded(self):
+        gate = threading.Event()
+        engine = PreviewEngine(
+            lambda item: gate.wait(2) and "", key=lambda item: item["name"], workers=1, max_pending=2
+        )
+
+        engine.get({"name": "busy"})
+        engine.prefetch([{"name": str(i)} for i in range(10)])
+
+        assert len(engine._prefetch) <= 2
+        gate.set()
+        engine.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker import cmd_picker as cmd_picker_module
+from py_scripts.cmd_picker.cmd_picker import CmdPicker, TmuxTool
+from py_scripts.cmd_picker.profiler import FrameProfiler, percentile
+from py_scripts.cmd_picker.render import ScreenRenderer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def make_profiler(commands=None):
+    clock = FakeClock()
+    commands = commands if commands is not None else [0]
+    return FrameProfiler(clock=clock, count_commands=lambda: commands[0]), clock
+
+
+class TestFrameProfiler:
+    def test_nested_phases_are_charged_their_own_time(self):
+        profiler, clock = make_profiler()
+        with profiler.phase("format"):
+            clock.advance(0.002)
+            with profiler.phase("preview"):
+                clock.advance(0.005)
+            clock.advance(0.001)
+        profiler.end_frame(bytes_written=10)
+
+        frame = profiler.frames[0]
+        assert frame["phases"] == {"preview": pytest.approx(0.005), "format": pytest.approx(0.003)}
+        assert frame["total"] == pytest.approx(0.008)
+
+    def test_frames_count_commands_and_bytes(self):
+        commands = [3]
+        profiler, clock = make_profiler(commands)
+        commands[0] = 5
+        profiler.end_frame(bytes_written=100)
+        profiler.end_frame(bytes_written=7)
+
+        assert [(f["commands"], f["bytes"]) for f in profiler.frames] == [(2, 100), (0, 7)]
+
+    def test_other_threads_record_background_samples(self):
+        profiler, clock = make_profiler()
+
+        def work():
+            with profiler.phase("fetch"):
+                clock.advance(0.5)
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        profiler.end_frame(bytes_written=0)
+
+        assert profiler.frames[0]["phases"] == {}
+        assert profiler.background == {"fetch": [pytest.approx(0.5)]}
+
+    def test_summary_has_phase_rows_and_histogram(self):
+        profiler, clock = make_profiler()
+        for ms in (0.5, 3, 3, 40):
+            with profiler.phase("write"):
+                clock.advance(ms / 1000)
+            profiler.end_frame(bytes_written=1)
+
+        summary = profiler.summary()
+
+        assert summary.startswith("cmd-picker profile: 4 frames, 0 commands, 4 bytes written")
+        write_row = next(line for line in summary.splitlines() if line.startswith("write"))
+        assert write_row.split()[1:] == ["46.5", "11.62", "3.00", "40.00", "40.00", "40.00"]
+        assert "    2-4 ms      2 " in summary
+        assert FrameProfiler().summary() == "cmd-picker profile: no frames drawn"
+
+    def test_report_writes_json_trace(self, tmp_path):
+        profiler, clock = make_profiler()
+        profiler.trace_path = str(tmp_path / "trace.json")
+        with profiler.phase("input"):
+            clock.advance(0.001)
+        profiler.end_frame(bytes_written=42)
+        out = io.StringIO()
+
+        profiler.report(out)
+
+        trace = json.loads((tmp_path / "trace.json").read_text())
+        assert trace["frames"] == [{"start": 0.0, "total": 1.0, "phases": {"input": 1.0}, "commands": 0, "bytes": 42}]
+        assert "trace written to" in out.getvalue()
+
+    def test_percentile(self):
+        assert percentile([], 0.9) == 0.0
+        assert percentile([5, 1, 3], 0.5) == 3
+        assert percentile(list(range(100)), 0.99) == 99
+
+
+class TestCmdPickerProfiling:
+    @patch.object(TmuxTool, "is_available", return_value=True)
+    def test_run_profiles_every_frame(self, mock_is_available, capsys):
+        profiler = FrameProfiler()
+        picker = CmdPicker(TmuxTool(), profiler=profiler)
+        picker.renderer = ScreenRenderer(out=io.StringIO(), size=(120, 40))
+        items = [{"name": f"s{i}", "windows": "1", "created": "0"} for i in range(5)]
+        with (
+            patch.object(TmuxTool, "get_items", return_value=items),
+            patch.object(TmuxTool, "get_item_preview", return_value="preview"),
+            patch.object(picker, "get_key", side_effect=["j", "j", "q"]),
+        ):
+            picker.run()
+
+        assert len(profiler.frames) == 3
+        assert profiler.frames[0]["phases"].keys() >= {"fetch", "format", "preview", "write"}
+        assert "input" in profiler.frames[1]["phases"]
+        assert all(frame["bytes"] > 0 for frame in profiler.frames)
+        assert "cmd-picker profile: 3 frames" in capsys.readouterr().err
+
+    def test_without_profiler_nothing_is_recorded(self):
+        picker = CmdPicker(TmuxTool())
+        picker.renderer = ScreenRenderer(out=io.StringIO(), size=(120, 40))
+        picker.set_items([{"name": "a", "windows": "1", "created": "0"}])
+        with patch.object(picker.previews, "get", return_value="preview"):
+            picker.display_interface()
+        assert picker.profiler is None
+
+    @pytest.mark.parametrize(
+        "argv, env, trace_path",
+        [
+            (["--profile", "docker"], "", None),
+            (["docker", "--profile-trace", "trace.json"], "", "trace.json"),
+            (["docker"], "1", None),
+            (["docker"], "trace.json", "trace.json"),
+        ],
+    )
+    def test_command_line(self, argv, env, trace_path):
+        with (
+            patch.dict(os.environ, {"CMD_PICKER_PROFILE": env}),
+            patch("sys.argv", ["cmd_picker", "--no-daemon", *argv]),
+            patch.object(cmd_picker_module, "CmdPicker") as mock_picker,
+        ):
+            cmd_picker_module.main()
+
+        tool = mock_picker.call_args.args[0]
+        profiler = mock_picker.call_args.kwargs["profiler"]
+        assert tool.name == "docker"
+        assert profiler.trace_path == trace_path
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
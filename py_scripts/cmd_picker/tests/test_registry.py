@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from importlib.metadata import EntryPoint
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker import cmd_picker
+from py_scripts.cmd_picker.cmd_picker import AllTool, Tool
+from py_scripts.cmd_picker.registry import ToolLoadError, ToolRegistry
+
+GROUP = "cmd_picker.tools"
+
+
+class PluginTool(Tool):
+    """Stands in for a tool shipped by another package"""
+
+    probes = 0
+
+    @property
+    def name(self):
+        return "pods"
+
+    @property
+    def description(self):
+        return "Kubernetes pods"
+
+    def is_available(self):
+        PluginTool.probes += 1
+        return True
+
+    def get_items(self):
+        return []
+
+    def get_item_display(self, item, selected):
+        return ""
+
+    def get_item_preview(self, item):
+        return ""
+
+    def execute_action(self, item):
+        pass
+
+
+def entry_points_with(*entries):
+    """importlib.metadata.entry_points stand-in offering entries as (name, value)"""
+    found = [EntryPoint(name, value, GROUP) for name, value in entries]
+    return Mock(side_effect=lambda group: found if group == GROUP else [])
+
+
+PLUGIN = ("pods", f"{__name__}:PluginTool")
+
+
+class TestToolRegistry:
+    def test_tools_are_built_on_first_use_only(self):
+        factory = Mock(return_value=PluginTool())
+        registry = ToolRegistry(group=None)
+        registry.register("pods", factory)
+
+        factory.assert_not_called()
+        assert registry["pods"] is registry["pods"]
+        assert factory.call_count == 1
+        assert set(registry.loaded()) == {"pods"}
+
+    def test_builtin_lookup_does_not_scan_installed_packages(self):
+        registry = ToolRegistry()
+        registry.register("tmux", PluginTool)
+        with patch("importlib.metadata.entry_points", entry_points_with(PLUGIN)) as mock_entry_points:
+            assert "tmux" in registry
+            registry["tmux"]
+        mock_entry_points.assert_not_called()
+
+    def test_entry_point_tools_are_discovered(self):
+        registry = ToolRegistry()
+        registry.register("tmux", PluginTool)
+        with patch("importlib.metadata.entry_points", entry_points_with(PLUGIN)):
+            assert list(registry) == ["tmux", "pods"]
+            assert isinstance(registry["pods"], PluginTool)
+
+    def test_registered_name_wins_over_entry_point(self):
+        builtin = Mock(return_value=PluginTool())
+        registry = ToolRegistry()
+        registry.register("pods", builtin)
+        with patch("importlib.metadata.entry_points", entry_points_with(("pods", "no.such.module:Tool"))):
+            assert len(registry) == 1
+            registry["pods"]
+        builtin.assert_called_once()
+
+    def test_broken_plugin(self):
+        registry = ToolRegistry()
+        with patch("importlib.metadata.entry_points", entry_points_with(("broken", "no.such.module:Tool"))):
+            with pytest.raises(ToolLoadError, match="broken"):
+                registry["broken"]
+            assert not registry.is_available("broken")
+        with pytest.raises(KeyError):
+            registry["missing"]
+
+    def test_availability_is_cached_per_path(self):
+        registry = ToolRegistry(group=None)
+        registry.register("pods", PluginTool)
+        PluginTool.probes = 0
+
+        with patch.dict(os.environ, {"PATH": "/usr/bin"}):
+            assert registry.is_available("pods")
+            assert registry.is_available("pods")
+            assert PluginTool.probes == 1
+        with patch.dict(os.environ, {"PATH": "/opt/bin:/usr/bin"}):
+            assert registry.is_available("pods")
+        assert PluginTool.probes == 2
+
+
+class TestAllToolFromRegistry:
+    def test_includes_installed_tools_and_skips_broken_ones(self):
+        registry = ToolRegistry()
+        registry.register("tmux", PluginTool)
+        registry.register("all", cmd_picker.all_tool)
+        entries = entry_points_with(PLUGIN, ("broken", "no.such.module:Tool"))
+        with patch("importlib.metadata.entry_points", entries), patch.object(cmd_picker, "TOOLS", registry):
+            tool = registry["all"]
+
+        assert isinstance(tool, AllTool)
+        assert list(tool.tools) == ["tmux", "pods"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
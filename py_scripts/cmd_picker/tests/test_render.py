@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import pytest
+import io
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.render import CLEAR_SCREEN, ScreenRenderer, fit_width
+
+
+class TestFitWidth:
+    def test_short_line_unchanged(self):
+        assert fit_width("hello", 10) == "hello"
+
+    def test_truncates_visible_characters(self):
+        assert fit_width("hello world", 5) == "hello\x1b[0m"
+
+    def test_escape_sequences_do_not_count(self):
+        line = "\x1b[31mred\x1b[0m text"
+        assert fit_width(line, 5) == "\x1b[31mred\x1b[0m t\x1b[0m"
+
+    def test_wide_characters(self):
+        # Emoji take two columns, so only two of them fit in five columns
+        assert fit_width("📺📺📺", 5) == "📺📺\x1b[0m"
+
+    def test_control_characters_dropped(self):
+        assert fit_width("a\rb\x07c", 10) == "abc"
+
+
+class TestScreenRenderer:
+    def make_renderer(self, size=(40, 10)):
+        out = io.StringIO()
+        return ScreenRenderer(out=out, size=size), out
+
+    def test_first_render_clears_screen(self):
+        renderer, out = self.make_renderer()
+        renderer.render(["a", "b"])
+
+        assert out.getvalue().startswith(CLEAR_SCREEN)
+        assert "\x1b[1;1Ha" in out.getvalue()
+        assert "\x1b[2;1Hb" in out.getvalue()
+
+    def test_only_changed_rows_rewritten(self):
+        renderer, out = self.make_renderer()
+        renderer.render(["a", "b", "c"])
+        out.seek(0)
+        out.truncate()
+
+        renderer.render(["a", "B", "c"])
+
+        assert out.getvalue() == "\x1b[2;1HB\x1b[0m\x1b[K"
+
+    def test_identical_frame_writes_nothing(self):
+        renderer, out = self.make_renderer()
+        renderer.render(["a", "b"])
+
+        assert renderer.render(["a", "b"]) == 0
+
+    def test_shorter_frame_clears_leftover_rows(self):
+        renderer, out = self.make_renderer()
+        renderer.render(["a", "b", "c"])
+        out.seek(0)
+        out.truncate()
+
+        renderer.render(["a"])
+
+        assert out.getvalue() == "\x1b[2;1H\x1b[K\x1b[3;1H\x1b[K"
+
+    def test_invalidate_forces_full_redraw(self):
+        renderer, out = self.make_renderer()
+        renderer.render(["a", "b"])
+        renderer.invalidate()
+        out.seek(0)
+        out.truncate()
+
+        renderer.render(["a", "b"])
+
+        assert out.getvalue().startswith(CLEAR_SCREEN)
+
+    def test_resize_forces_full_redraw(self):
+        renderer, out = self.make_renderer()
+        renderer.render(["a", "b"])
+        renderer.fixed_size = (80, 24)
+        out.seek(0)
+        out.truncate()
+
+        renderer.render(["a", "b"])
+
+        assert out.getvalue().startswith(CLEAR_SCREEN)
+
+    def test_frame_clipped_to_terminal_rows(self):
+        renderer, out = self.make_renderer(size=(40, 2))
+        renderer.render(["a", "b", "c"])
+
+        assert "\x1b[3;1H" not in out.getvalue()
+
+    def test_single_write_per_frame(self):
+        out = io.StringIO()
+        writes = []
+        out.write = writes.append
+        renderer = ScreenRenderer(out=out, size=(40, 10))
+
+        renderer.render(["a", "b", "c"])
+
+        assert len(writes) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.runner import CancelToken, CommandCancelled, CommandRunner, cancel_scope
+
+
+class TestCommandRunner:
+    def test_returns_output_like_subprocess_run(self):
+        result = CommandRunner().run(["sh", "-c", "echo out; echo err >&2; exit 3"])
+
+        assert (result.stdout, result.stderr, result.returncode) == ("out\n", "err\n", 3)
+
+    def test_check_raises_on_failure(self):
+        with pytest.raises(subprocess.CalledProcessError) as excinfo:
+            CommandRunner().run(["sh", "-c", "echo nope >&2; exit 1"], check=True)
+        assert excinfo.value.stderr == "nope\n"
+
+    def test_counts_started_commands(self):
+        runner = CommandRunner()
+        runner.run(["true"])
+        runner.run(["true"])
+        assert runner.started == 2
+
+    def test_stdin_is_closed(self):
+        assert CommandRunner().run(["cat"], timeout=2).stdout == ""
+
+    def test_timeout_kills_the_command(self):
+        started = time.monotonic()
+        with pytest.raises(subprocess.TimeoutExpired):
+            CommandRunner().run(["sleep", "30"], timeout=0.2)
+        assert time.monotonic() - started < 2
+
+    def test_timeout_kills_what_the_command_started(self):
+        # The backgrounded sleep keeps stdout open; only killing the process group ends it
+        started = time.monotonic()
+        with pytest.raises(subprocess.TimeoutExpired):
+            CommandRunner().run(["sh", "-c", "sleep 30 & wait"], timeout=0.2)
+        assert time.monotonic() - started < 2
+
+    def test_cancelled_from_another_thread(self):
+        token = CancelToken()
+        threading.Timer(0.1, token.cancel).start()
+
+        started = time.monotonic()
+        with pytest.raises(CommandCancelled):
+            CommandRunner().run(["sleep", "30"], token=token)
+        assert time.monotonic() - started < 2
+
+    def test_cancel_scope_applies_to_the_thread(self):
+        token = CancelToken()
+        token.cancel()
+        runner = CommandRunner()
+
+        with cancel_scope(token):
+            with pytest.raises(CommandCancelled):
+                runner.run(["true"])
+        assert runner.run(["true"]).returncode == 0
+
+    def test_concurrency_cap(self):
+        runner = CommandRunner(max_concurrent=1)
+        threading.Thread(target=runner.run, args=(["sleep", "0.5"],), daemon=True).start()
+        time.sleep(0.1)
+
+        # Waiting for the busy slot counts against the timeout
+        with pytest.raises(subprocess.TimeoutExpired):
+            runner.run(["true"], timeout=0.1)
+        assert runner.run(["true"], timeout=2).returncode == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
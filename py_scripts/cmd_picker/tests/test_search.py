@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import pytest
+import random
+import re
+import time
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.search import SearchIndex, fuzzy_pattern
+
+
+class TestFuzzyPattern:
+    def test_matches_subsequence(self):
+        pattern = re.compile(fuzzy_pattern("wsv"))
+        assert pattern.search("web-server")
+        assert not pattern.search("server-web")
+
+    def test_special_characters_escaped(self):
+        pattern = re.compile(fuzzy_pattern("a.]"))
+        assert pattern.search("a.b]")
+        assert not pattern.search("axb]")
+
+
+class TestSearchIndex:
+    def test_empty_query_returns_everything(self):
+        index = SearchIndex(["a", "b", "c"])
+        assert index.filter("") == [0, 1, 2]
+
+    def test_case_insensitive(self):
+        index = SearchIndex(["Redis", "nginx"])
+        assert index.filter("REd") == [0]
+
+    def test_ranks_tight_matches_first(self):
+        index = SearchIndex(["w-e-b-s", "website", "web"])
+        assert index.filter("web") == [1, 2, 0]
+
+    def test_contiguous_match_beats_earlier_scattered_one(self):
+        index = SearchIndex(["a-p-i gateway api", "xx api"])
+        # Both contain "api" contiguously; the earlier occurrence wins
+        assert index.filter("api") == [1, 0]
+
+    def test_refinement_only_rescans_previous_matches(self):
+        index = SearchIndex(["alpha", "beta", "alphabet"])
+        assert index.filter("al") == [0, 2]
+
+        with pytest.MonkeyPatch.context() as mp:
+            scanned = []
+            original = index._score
+
+            def spy(query, candidates):
+                scanned.append(list(candidates))
+                return original(query, candidates)
+
+            mp.setattr(index, "_score", spy)
+            assert index.filter("alb") == [2]
+
+        assert scanned == [[0, 2]]
+
+    def test_backspace_reuses_previous_results(self):
+        index = SearchIndex(["alpha", "beta", "alphabet"])
+        index.filter("a")
+        index.filter("al")
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(index, "_score", lambda *args: pytest.fail("should not rescan"))
+            assert index.filter("a") == [0, 2, 1]
+
+    def test_unrelated_query_starts_over(self):
+        index = SearchIndex(["alpha", "beta"])
+        assert index.filter("al") == [0]
+        assert index.filter("be") == [1]
+
+
+def make_items(count):
+    rng = random.Random(42)
+    words = ["web", "api", "worker", "redis", "postgres", "nginx", "frontend", "backend", "cache", "queue", "auth"]
+    texts = []
+    for i in range(count):
+        name = f"{rng.choice(words)}-{rng.choice(words)}-{i}"
+        image = f"{rng.choice(words)}:{rng.randint(1, 20)}.{rng.randint(0, 9)}"
+        container_id = "".join(rng.choices("0123456789abcdef", k=12))
+        texts.append(f"{name} {image} {container_id}")
+    return texts
+
+
+class TestSearchBenchmark:
+    @pytest.mark.parametrize("query", ["webserver", "redisauth", "nginx", "e", "zzz"])
+    def test_5000_items_filter_under_5ms_per_keystroke(self, query):
+        texts = make_items(5000)
+
+        # Best of several runs, so scheduler noise does not fail the build
+        best = [float("inf")] * len(query)
+        for _ in range(5):
+            index = SearchIndex(texts)
+            for size in range(1, len(query) + 1):
+                start = time.perf_counter()
+                index.filter(query[:size])
+                best[size - 1] = min(best[size - 1], time.perf_counter() - start)
+
+        assert max(best) < 0.005, [f"{t * 1000:.2f}ms" for t in best]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.cmd_picker import CmdPicker, TmuxTool
+from py_scripts.cmd_picker.snapshot import SnapshotStore
+
+SAVED = [{"name": "saved", "windows": "1", "attached": "0", "created": "1"}]
+FRESH = [{"name": "fresh", "windows": "2", "attached": "1", "created": "2"}]
+
+
+@pytest.fixture
+def store():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield SnapshotStore(Path(tmp))
+
+
+class SlowTmuxTool(TmuxTool):
+    """get_items blocks until released, like a backend on a slow network"""
+
+    def __init__(self):
+        super().__init__(socket_name="snapshot-test")
+        self.release = threading.Event()
+        self.items = FRESH
+
+    def is_available(self):
+        return True
+
+    def get_items(self):
+        self.release.wait(5)
+        return self.items
+
+    def get_item_preview(self, item):
+        return "preview"
+
+
+class TestSnapshotStore:
+    def test_round_trip(self, store):
+        store.save("tmux", "/tmp/tmux-1000/default", SAVED)
+        assert store.load("tmux", "/tmp/tmux-1000/default") == SAVED
+
+    def test_separate_contexts(self, store):
+        store.save("docker", "unix:///a.sock", SAVED)
+        store.save("docker", "unix:///b.sock", FRESH)
+        assert store.load("docker", "unix:///a.sock") == SAVED
+        assert store.load("docker", "unix:///b.sock") == FRESH
+        assert store.load("gh", "unix:///a.sock") is None
+
+    def test_empty_list_removes_snapshot(self, store):
+        store.save("gh", "github.com/octo/repo", SAVED)
+        store.save("gh", "github.com/octo/repo", [])
+        assert store.load("gh", "github.com/octo/repo") is None
+        assert list(store.cache_dir.iterdir()) == []
+
+    def test_corrupt_snapshot_is_ignored(self, store):
+        store.save("tmux", "default", SAVED)
+        store.path("tmux", "default").write_bytes(b"not zlib")
+        assert store.load("tmux", "default") is None
+
+    def test_compact_on_disk(self, store):
+        items = [{"name": f"session-{i}", "windows": "3", "attached": "0", "created": "1700000000"} for i in range(500)]
+        store.save("tmux", "default", items)
+        assert store.path("tmux", "default").stat().st_size < 8000
+
+
+class TestCmdPickerSnapshot:
+    def run_picker(self, picker):
+        """Run until the background refresh has landed, recording when each frame was drawn"""
+        frames = []
+
+        def display():
+            frames.append((time.perf_counter(), [item["name"] for item in picker.items], picker.refreshing))
+
+        def keys():
+            if len(frames) == 1:
+                picker.tool.release.set()
+                deadline = time.monotonic() + 5
+                while picker._refreshed is None and time.monotonic() < deadline:
+                    time.sleep(0.005)
+                return ""
+            return "q"
+
+        with (
+            patch.object(picker, "display_interface", side_effect=display),
+            patch.object(picker.renderer, "start"),
+            patch.object(picker, "get_key", side_effect=keys),
+        ):
+            started = time.perf_counter()
+            picker.run()
+        return started, frames
+
+    def test_first_frame_from_snapshot_then_fresh_items(self, store):
+        tool = SlowTmuxTool()
+        store.save("tmux", tool.get_snapshot_context(), SAVED)
+        picker = CmdPicker(tool, snapshots=store)
+
+        started, frames = self.run_picker(picker)
+
+        assert frames[0][0] - started < 0.05
+        assert frames[0][1:] == (["saved"], True)
+        assert frames[1][1:] == (["fresh"], False)
+        assert store.load("tmux", tool.get_snapshot_context()) == FRESH
+
+    def test_without_snapshot_waits_and_saves(self, store):
+        tool = SlowTmuxTool()
+        tool.release.set()
+        picker = CmdPicker(tool, snapshots=store)
+
+        with (
+            patch.object(picker, "display_interface"),
+            patch.object(picker.renderer, "start"),
+            patch.object(picker, "get_key", return_value="q"),
+        ):
+            picker.run()
+
+        assert [item["name"] for item in picker.all_items] == ["fresh"]
+        assert store.load("tmux", tool.get_snapshot_context()) == FRESH
+
+    def test_refresh_older_than_current_items_is_dropped(self, store):
+        tool = SlowTmuxTool()
+        store.save("tmux", tool.get_snapshot_context(), SAVED)
+        picker = CmdPicker(tool, snapshots=store)
+        picker.load_snapshot()
+        picker.refresh_in_background()
+
+        picker.set_items([{"name": "after-action"}])  # e.g. reloaded after killing a session
+        tool.release.set()
+        deadline = time.monotonic() + 5
+        while picker._refreshed is None and time.monotonic() < deadline:
+            time.sleep(0.005)
+        picker.apply_refreshed_items()
+
+        assert [item["name"] for item in picker.items] == ["after-action"]
+        assert not picker.refreshing
+
+    def test_failed_refresh_keeps_snapshot(self, store):
+        tool = SlowTmuxTool()
+        store.save("tmux", tool.get_snapshot_context(), SAVED)
+        picker = CmdPicker(tool, snapshots=store)
+        picker.load_snapshot()
+        with patch.object(tool, "get_items", side_effect=RuntimeError("boom")):
+            picker.refresh_in_background()
+            deadline = time.monotonic() + 5
+            while picker._refreshed is None and time.monotonic() < deadline:
+                time.sleep(0.005)
+        picker.apply_refreshed_items()
+
+        assert [item["name"] for item in picker.items] == ["saved"]
+        assert store.load("tmux", tool.get_snapshot_context()) == SAVED
+
+
+class TestSnapshotContext:
+    def test_tmux_socket(self):
+        with patch.dict(os.environ, {"TMUX": "/tmp/tmux-1000/work,123,0", "TMUX_TMPDIR": ""}):
+            assert TmuxTool().get_snapshot_context() == "/tmp/tmux-1000/work"
+            assert TmuxTool("other").get_snapshot_context() == f"/tmp/tmux-{os.getuid()}/other"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
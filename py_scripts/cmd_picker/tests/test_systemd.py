@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import subprocess
+import sys
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.cmd_picker import CmdPicker, SystemdTool
+from py_scripts.cmd_picker.systemd_units import JournalTail, format_memory, parse_show, parse_units, split_cursor
+
+# Trimmed output of systemctl --user list-units --type=service --all --output=json (systemd 255)
+LIST_UNITS = [
+    {
+        "unit": "dbus.service",
+        "load": "loaded",
+        "active": "active",
+        "sub": "running",
+        "description": "D-Bus User Message Bus",
+    },
+    {
+        "unit": "run-u12.service",
+        "load": "loaded",
+        "active": "failed",
+        "sub": "failed",
+        "description": "/usr/bin/make test",
+    },
+] + [
+    {
+        "unit": f"run-u{n}.service",
+        "load": "loaded",
+        "active": "active",
+        "sub": "running",
+        "description": f"/usr/bin/sleep {n}",
+    }
+    for n in range(100, 400)
+]
+
+SHOW_TEMPLATE = """Id={unit}
+Description=/usr/bin/sleep
+ActiveState=active
+SubState=running
+Result=success
+MainPID=4242
+ActiveEnterTimestamp=Thu 2026-10-15 09:12:03 CEST
+ExecMainStatus=0
+MemoryCurrent=1048576"""
+
+JOURNAL = """Oct 15 09:12:03 host systemd[812]: Started run-u12.service - /usr/bin/make test.
+Oct 15 09:12:04 host make[4242]: running 12 tests
+-- cursor: s=abc;i=1f2
+"""
+JOURNAL_AFTER = """Oct 15 09:12:09 host make[4242]: FAILED test_io
+-- cursor: s=abc;i=1f3
+"""
+
+
+class FakeSystemd:
+    """run_command stand-in answering systemctl and journalctl from canned output"""
+
+    def __init__(self):
+        self.calls = []
+        self.journal = [JOURNAL, JOURNAL_AFTER]
+
+    def __call__(self, args, **kwargs):
+        self.calls.append(list(args))
+        if args[0] == "systemctl" and "list-units" in args:
+            return Mock(stdout=json.dumps(LIST_UNITS), stderr="", returncode=0)
+        if args[0] == "systemctl" and "show" in args:
+            units = [arg for arg in args[2:] if not arg.startswith("--") and arg != "show"]
+            return Mock(stdout="\n\n".join(SHOW_TEMPLATE.format(unit=unit) for unit in units) + "\n", returncode=0)
+        if args[0] == "journalctl":
+            return Mock(stdout=self.journal.pop(0) if self.journal else "", stderr="", returncode=0)
+        raise AssertionError(f"unexpected command {args}")
+
+    def commands(self, name):
+        return [args for args in self.calls if name in args]
+
+
+@pytest.fixture
+def fake():
+    fake = FakeSystemd()
+    with patch("py_scripts.cmd_picker.cmd_picker.run_command", side_effect=fake):
+        yield fake
+
+
+class TestParsing:
+    def test_parse_units(self):
+        items = parse_units(json.dumps(LIST_UNITS[:2]))
+        assert items[1] == {
+            "unit": "run-u12.service",
+            "load": "loaded",
+            "active": "failed",
+            "sub": "failed",
+            "description": "/usr/bin/make test",
+            "type": "unit",
+        }
+        assert parse_units("") == []
+
+    def test_parse_show_blocks(self):
+        output = SHOW_TEMPLATE.format(unit="a.service") + "\n\n" + SHOW_TEMPLATE.format(unit="b.service") + "\n"
+        units = parse_show(output)
+        assert list(units) == ["a.service", "b.service"]
+        assert units["b.service"]["MainPID"] == "4242"
+
+    def test_split_cursor(self):
+        assert split_cursor(JOURNAL)[1] == "s=abc;i=1f2"
+        assert split_cursor("no cursor\n") == (["no cursor"], None)
+
+    @pytest.mark.parametrize(
+        "value, text",
+        [
+            ("512", "512B"),
+            ("1048576", "1.0M"),
+            ("3328599654", "3.1G"),
+            ("[not set]", None),
+            ("18446744073709551615", None),
+            ("", None),
+            (None, None),
+        ],
+    )
+    def test_format_memory(self, value, text):
+        assert format_memory(value) == text
+
+
+class TestJournalTail:
+    def test_reads_only_new_entries_after_the_cursor(self):
+        run = Mock(side_effect=[JOURNAL, JOURNAL_AFTER, ""])
+        tail = JournalTail(run, lines=2)
+
+        assert tail.get("run-u12.service")[-1].endswith("running 12 tests")
+        assert tail.get("run-u12.service") == [
+            "Oct 15 09:12:04 host make[4242]: running 12 tests",
+            "Oct 15 09:12:09 host make[4242]: FAILED test_io",
+        ]
+        assert len(tail.get("run-u12.service")) == 2  # nothing new, cursor kept
+
+        first, second, third = (call[0][0] for call in run.call_args_list)
+        assert "-n" in first and "--after-cursor" not in first
+        assert second[second.index("--after-cursor") + 1] == "s=abc;i=1f2"
+        assert third[third.index("--after-cursor") + 1] == "s=abc;i=1f3"
+
+    def test_forget_starts_over(self):
+        run = Mock(side_effect=[JOURNAL, JOURNAL])
+        tail = JournalTail(run)
+        tail.get("a.service")
+        tail.forget("a.service")
+        tail.get("a.service")
+        assert "--after-cursor" not in run.call_args[0][0]
+
+
+class TestSystemdTool:
+    def test_hundreds_of_units_in_one_call(self, fake):
+        items = SystemdTool().get_items()
+
+        assert len(items) == 302
+        assert len(fake.calls) == 1
+        assert fake.calls[0][:3] == ["systemctl", "--user", "list-units"]
+        assert "--output=json" in fake.calls[0]
+
+    def test_list_failure(self):
+        with patch("py_scripts.cmd_picker.cmd_picker.run_command", side_effect=subprocess.TimeoutExpired("x", 1)):
+            assert SystemdTool().get_items() == []
+
+    def test_preview_status_and_journal(self, fake):
+        tool = SystemdTool()
+        item = parse_units(json.dumps(LIST_UNITS))[1]
+
+        preview = tool.get_item_preview(item)
+
+        assert "State: active (running), result success" in preview
+        assert "Main PID: 4242" in preview
+        assert "Memory: 1.0M" in preview
+        assert "running 12 tests" in preview
+        assert "FAILED test_io" in tool.get_item_preview(item)
+
+    def test_one_show_call_per_page(self, fake):
+        tool = SystemdTool()
+        picker = CmdPicker(tool)
+        picker.set_items(tool.get_items())
+
+        picker.build_frame(120, 40 + picker.preview_height + 8)
+        for item in picker.items[:40]:
+            tool.get_details(item["unit"])
+        picker.previews.shutdown()
+
+        shows = fake.commands("show")
+        assert len(shows) == 1
+        assert len([arg for arg in shows[0] if arg.endswith(".service")]) == 40
+
+    def test_stop_and_restart(self):
+        tool = SystemdTool()
+        item = {"unit": "run-u12.service"}
+        with patch("subprocess.run") as mock_run:
+            assert tool.handle_additional_action("r", item)
+            assert tool.handle_additional_action("s", item)
+            assert not tool.handle_additional_action("x", item)
+        assert [c[0][0] for c in mock_run.call_args_list] == [
+            ["systemctl", "--user", "restart", "run-u12.service"],
+            ["systemctl", "--user", "stop", "run-u12.service"],
+        ]
+
+    @patch("subprocess.Popen")
+    def test_follow_journal(self, mock_popen):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"line one\n")
+        os.close(write_fd)
+        mock_popen.return_value.stdout = os.fdopen(read_fd, "rb")
+
+        stream = SystemdTool().open_log_stream({"unit": "run-u12.service"}, lambda: None)
+        deadline = time.monotonic() + 2
+        while stream.tail(1) != ["line one"] and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+        assert mock_popen.call_args[0][0][:3] == ["journalctl", "--user", "-f"]
+        assert stream.tail(1) == ["line one"]
+        stream.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import Mock
+import io
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.cmd_picker import TmuxTool
+from py_scripts.cmd_picker.tmux_control import TmuxControlClient, quote
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestQuote:
+    def test_plain(self):
+        assert quote("list-panes") == "'list-panes'"
+
+    def test_single_quote(self):
+        assert quote("it's") == "'it'\"'\"'s'"
+
+
+class TestReaderProtocol:
+    def test_blocks_and_notifications(self):
+        notifications = []
+        client = TmuxControlClient(["tmux"], on_notification=lambda name, rest: notifications.append((name, rest)))
+        stream = (
+            b"%begin 1 10 0\n%end 1 10 0\n"  # the attach itself, not ours
+            b"%sessions-changed\n"
+            b"%begin 1 11 1\nalpha\n%end 1 11 1\n"
+            b"%output %0 hello\\015\\012\n"
+            b"%begin 1 12 1\ncan't find session\n%error 1 12 1\n"
+        )
+        proc = Mock(stdout=io.BytesIO(stream))
+        first, second = Mock(), Mock()
+        client._pending.extend([first, second])
+
+        client._reader(proc)
+
+        assert first.lines == ["alpha"]
+        assert first.error is False
+        assert second.lines == ["can't find session"]
+        assert second.error is True
+        assert notifications == [("%sessions-changed", ""), ("%output", "%0 hello\\015\\012"), ("%exit", "")]
+
+    def test_pending_commands_fail_on_disconnect(self):
+        client = TmuxControlClient(["tmux"])
+        reply = Mock()
+        client._pending.append(reply)
+
+        client._reader(Mock(stdout=io.BytesIO(b"")))
+
+        assert reply.error is True
+        reply.done.set.assert_called_once()
+
+    def test_command_when_not_connected(self):
+        with pytest.raises(subprocess.CalledProcessError):
+            TmuxControlClient(["tmux"]).command(["list-sessions"])
+
+
+@pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux not installed")
+class TestPrivateServer:
+    @pytest.fixture
+    def socket_name(self):
+        name = f"cmd-picker-test-{uuid.uuid4().hex[:8]}"
+        yield name
+        subprocess.run(["tmux", "-L", name, "kill-server"], capture_output=True)
+
+    def tmux(self, socket_name, *args):
+        subprocess.run(["tmux", "-L", socket_name, *args], check=True, capture_output=True)
+
+    def test_commands_over_one_connection(self, socket_name):
+        self.tmux(socket_name, "new-session", "-d", "-s", "it's", "-x", "80", "-y", "24")
+        client = TmuxControlClient(["tmux", "-L", socket_name])
+        assert client.start()
+        try:
+            output = client.command(["list-sessions", "-F", "#{session_name}\t#{session_windows}"])
+            assert output == "it's\t1\n"
+
+            with pytest.raises(subprocess.CalledProcessError):
+                client.command(["list-panes", "-t", "nosuch"])
+
+            # The connection survives errors
+            assert "it's" in client.command(["display-message", "-p", "#{session_name}"])
+        finally:
+            client.close()
+
+    def test_no_server(self, socket_name):
+        client = TmuxControlClient(["tmux", "-L", socket_name])
+        assert not client.start()
+        assert not client.connected
+
+    def test_tool_follows_sessions_created_elsewhere(self, socket_name):
+        self.tmux(socket_name, "new-session", "-d", "-s", "alpha", "-x", "80", "-y", "24")
+        tool = TmuxTool(socket_name=socket_name)
+        changed = threading.Event()
+        tool.watch(changed.set)
+        try:
+            # Once watching, nothing is run as a separate tmux process
+            tool._run_process = Mock(side_effect=AssertionError("forked tmux"))
+            assert [item["name"] for item in tool.get_items()] == ["alpha"]
+
+            self.tmux(socket_name, "new-session", "-d", "-s", "beta")
+            assert changed.wait(5)
+            assert wait_for(lambda: [item["name"] for item in tool.get_items()] == ["alpha", "beta"])
+
+            preview = tool.get_item_preview({"name": "alpha"})
+            assert "alpha: 1 windows" in preview
+        finally:
+            tool.unwatch()
+
+    def test_output_invalidates_capture(self, socket_name):
+        self.tmux(socket_name, "new-session", "-d", "-s", "alpha", "-x", "80", "-y", "24")
+        tool = TmuxTool(socket_name=socket_name)
+        tool.output_notify_interval = 0
+        changed = threading.Event()
+        tool.watch(changed.set)
+        try:
+            pane = tool.state.refresh()["alpha"].active_pane
+            tool.state.capture(pane)
+            assert pane.pane_id in tool.state._captures
+
+            changed.clear()
+            self.tmux(socket_name, "send-keys", "-t", "alpha", "echo marker", "Enter")
+            assert changed.wait(5)
+            assert wait_for(lambda: pane.pane_id not in tool.state._captures)
+        finally:
+            tool.unwatch()
+
+    def test_tool_falls_back_without_server(self, socket_name):
+        tool = TmuxTool(socket_name=socket_name)
+        tool.watch(lambda: None)
+        try:
+            assert tool.get_items() == []
+        finally:
+            tool.unwatch()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
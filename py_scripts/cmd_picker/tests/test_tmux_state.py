@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import pytest
+import shutil
+import subprocess
+import uuid
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.cmd_picker.cmd_picker import TmuxTool
+from py_scripts.cmd_picker.tmux_state import TmuxState, parse_panes
+
+
+def pane_line(session, window, pane_id, activity="100", history="0", active="1", window_name="main"):
+    return "\t".join(
+        [session, "2", "1700000000", window, window_name, active, pane_id, "1", activity, history, "0", "0"]
+    )
+
+
+class FakeTmux:
+    """Stand-in for the tmux runner that records every call"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.calls = []
+
+    def __call__(self, args):
+        self.calls.append(args[0])
+        if args[0] == "list-panes":
+            return "\n".join(self.lines) + "\n"
+        if args[0] == "capture-pane":
+            return f"content of {args[-1]}"
+        raise AssertionError(args)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestParsePanes:
+    def test_builds_tree(self):
+        output = "\n".join(
+            [
+                pane_line("work", "0", "%0", active="0"),
+                pane_line("work", "1", "%1", window_name="logs"),
+                pane_line("work", "1", "%2", window_name="logs"),
+                pane_line("play", "0", "%3"),
+            ]
+        )
+
+        sessions = parse_panes(output)
+
+        assert list(sessions) == ["work", "play"]
+        work = sessions["work"]
+        assert [w.index for w in work.windows] == ["0", "1"]
+        assert work.active_window.name == "logs"
+        assert [p.pane_id for p in work.windows[1].panes] == ["%1", "%2"]
+        assert work.active_pane.pane_id == "%1"
+
+    def test_ignores_malformed_lines(self):
+        assert parse_panes("garbage\n\n") == {}
+
+
+class TestTmuxState:
+    def test_snapshot_reused_until_max_age(self):
+        clock = FakeClock()
+        tmux = FakeTmux([pane_line("work", "0", "%0")])
+        state = TmuxState(tmux, max_age=1.0, clock=clock)
+
+        state.sessions()
+        state.sessions()
+        clock.now = 0.5
+        state.sessions()
+        assert tmux.calls == ["list-panes"]
+
+        clock.now = 2.0
+        state.sessions()
+        assert tmux.calls == ["list-panes", "list-panes"]
+
+    def test_capture_cached_until_activity(self):
+        tmux = FakeTmux([pane_line("work", "0", "%0", activity="100")])
+        state = TmuxState(tmux)
+        pane = state.refresh()["work"].active_pane
+
+        assert state.capture(pane) == "content of %0"
+        assert state.capture(pane) == "content of %0"
+        assert tmux.calls.count("capture-pane") == 1
+
+        tmux.lines = [pane_line("work", "0", "%0", activity="101")]
+        pane = state.refresh()["work"].active_pane
+        state.capture(pane)
+        assert tmux.calls.count("capture-pane") == 2
+
+    def test_captures_of_closed_panes_dropped(self):
+        tmux = FakeTmux([pane_line("work", "0", "%0"), pane_line("play", "0", "%1")])
+        state = TmuxState(tmux)
+        sessions = state.refresh()
+        state.capture(sessions["work"].active_pane)
+        state.capture(sessions["play"].active_pane)
+
+        tmux.lines = [pane_line("work", "0", "%0")]
+        state.refresh()
+
+        assert list(state._captures) == ["%0"]
+
+    def test_invalidate_forces_refresh(self):
+        tmux = FakeTmux([pane_line("work", "0", "%0")])
+        state = TmuxState(tmux)
+        state.sessions()
+        state.invalidate()
+        state.sessions()
+
+        assert tmux.calls == ["list-panes", "list-panes"]
+
+
+class TestTmuxToolForks:
+    def test_at_most_one_fork_per_preview(self):
+        tool = TmuxTool()
+        clock = FakeClock()
+        tmux = FakeTmux([pane_line(f"s{i}", "0", f"%{i}") for i in range(5)])
+        tool.state = TmuxState(tmux, clock=clock)
+        items = tool.get_items()
+        assert tmux.calls == ["list-panes"]
+
+        # Hold j across the list twice, 100ms per keystroke
+        keystrokes = 0
+        for _ in range(2):
+            for item in items:
+                clock.now += 0.1
+                tool.get_item_preview(item)
+                keystrokes += 1
+
+        forks = len(tmux.calls) - 1
+        assert forks <= keystrokes
+        # Captures are only taken once per idle pane
+        assert tmux.calls.count("capture-pane") == len(items)
+
+    def test_preview_contents(self):
+        tool = TmuxTool()
+        tool.state = TmuxState(
+            FakeTmux([pane_line("work", "0", "%0", active="0"), pane_line("work", "1", "%1", window_name="logs")])
+        )
+
+        preview = tool.get_item_preview({"name": "work"})
+
+        assert "work: 2 windows, created 1700000000" in preview
+        assert "0: main" in preview
+        assert "1: logs (active)" in preview
+        assert "content of %1" in preview
+
+    def test_preview_of_missing_session(self):
+        tool = TmuxTool()
+        tool.state = TmuxState(FakeTmux([]))
+        assert "Unable to get info" in tool.get_item_preview({"name": "gone"})
+
+
+@pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux not installed")
+class TestTmuxToolPrivateServer:
+    @pytest.fixture
+    def socket_name(self):
+        name = f"cmd-picker-test-{uuid.uuid4().hex[:8]}"
+        yield name
+        subprocess.run(["tmux", "-L", name, "kill-server"], capture_output=True)
+
+    def test_items_and_preview_from_real_server(self, socket_name):
+        subprocess.run(
+            ["tmux", "-L", socket_name, "new-session", "-d", "-s", "alpha", "-x", "80", "-y", "24"], check=True
+        )
+        subprocess.run(["tmux", "-L", socket_name, "new-window", "-d", "-t", "alpha", "-n", "second"], check=True)
+        subprocess.run(["tmux", "-L", socket_name, "new-session", "-d", "-s", "beta"], check=True)
+        tool = TmuxTool(socket_name=socket_name)
+
+        items = tool.get_items()
+
+        assert sorted(item["name"] for item in items) == ["alpha", "beta"]
+        alpha = next(item for item in items if item["name"] == "alpha")
+        assert alpha["windows"] == "2"
+        preview = tool.get_item_preview(alpha)
+        assert "second" in preview
+        assert "Preview:" in preview
+
+    def test_no_server(self, socket_name):
+        assert TmuxTool(socket_name=socket_name).get_items() == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,173 @@
+"""Persistent tmux control-mode (``tmux -C``) connection.
+
+A control client is an ordinary tmux client that speaks a line protocol on
+stdin/stdout: commands written to it are answered with a
+``%begin``/``%end`` (or ``%error``) block, and changes on the server are
+pushed as ``%``-prefixed notifications such as ``%sessions-changed`` or
+``%output``. Keeping one open lets TmuxTool query the server and follow
+changes without starting a process per request.
+"""
+
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Sequence
+
+# Client flags: never resize windows to the picker's size, never send input
+ATTACH_FLAGS = "ignore-size,read-only"
+
+
+def quote(arg: str) -> str:
+    """Quote an argument for the tmux command parser"""
+    return "'" + arg.replace("'", "'\"'\"'") + "'"
+
+
+class _Reply:
+    def __init__(self):
+        self.done = threading.Event()
+        self.lines: List[str] = []
+        self.error = False
+
+
+class TmuxControlClient:
+    """Run tmux commands over a single control-mode client
+
+    on_notification is called from the reader thread with the notification
+    name (e.g. "%window-add") and the rest of the line. "%exit" is reported
+    once the connection is actually gone.
+    """
+
+    def __init__(
+        self,
+        tmux_cmd: Sequence[str],
+        on_notification: Optional[Callable[[str, str], None]] = None,
+        retry_interval: float = 5.0,
+    ):
+        self.tmux_cmd = list(tmux_cmd)
+        self.on_notification = on_notification
+        self.retry_interval = retry_interval
+        self._proc: Optional[subprocess.Popen] = None
+        self._pending: Deque[_Reply] = deque()
+        self._write_lock = threading.Lock()
+        self._last_attempt: Optional[float] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self) -> bool:
+        """Attach a control client; returns False if the server is not reachable
+
+        Failed attempts are not retried more often than retry_interval.
+        """
+        if self.connected:
+            return True
+        now = time.monotonic()
+        if self._last_attempt is not None and now - self._last_attempt < self.retry_interval:
+            return False
+        self._last_attempt = now
+
+        try:
+            proc = subprocess.Popen(
+                [*self.tmux_cmd, "-C", "attach-session", "-f", ATTACH_FLAGS],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            return False
+        self._proc = proc
+        threading.Thread(target=self._reader, args=(proc,), name="tmux-control", daemon=True).start()
+        # A failed attach (e.g. no server running) exits right away
+        try:
+            proc.wait(timeout=0.05)
+        except subprocess.TimeoutExpired:
+            return True
+        return False
+
+    def command(self, args: Sequence[str], timeout: float = 5.0) -> str:
+        """Run a tmux command and return its output
+
+        Raises subprocess.CalledProcessError when tmux reports an error, the
+        connection is down or no answer arrives within timeout.
+        """
+        proc = self._proc
+        if proc is None or proc.stdin is None or not self.connected:
+            raise subprocess.CalledProcessError(1, list(args), stderr="tmux control client not connected")
+
+        reply = _Reply()
+        line = " ".join(quote(arg) for arg in args) + "\n"
+        with self._write_lock:
+            self._pending.append(reply)
+            try:
+                proc.stdin.write(line.encode())
+                proc.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                self._pending.remove(reply)
+                raise subprocess.CalledProcessError(1, list(args), stderr="tmux control client disconnected")
+
+        if not reply.done.wait(timeout):
+            raise subprocess.CalledProcessError(1, list(args), stderr="tmux control command timed out")
+        output = "\n".join(reply.lines) + "\n" if reply.lines else ""
+        if reply.error:
+            raise subprocess.CalledProcessError(1, list(args), output=output, stderr=output)
+        return output
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin is not None:
+                proc.stdin.close()  # closing stdin detaches the client
+            proc.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+    def _reader(self, proc: subprocess.Popen) -> None:
+        assert proc.stdout is not None
+        block: Optional[List[str]] = None
+        block_id: List[str] = []
+        ours = False
+        for raw in proc.stdout:
+            line = raw.decode(errors="replace").rstrip("\n")
+            if block is not None:
+                word, _, rest = line.partition(" ")
+                if word in ("%end", "%error") and rest.split()[:2] == block_id:
+                    if ours:
+                        self._finish(block, error=word == "%error")
+                    block = None
+                else:
+                    block.append(line)
+                continue
+
+            if line.startswith("%begin "):
+                fields = line.split()
+                block, block_id, ours = [], fields[1:3], fields[3:4] == ["1"]
+            elif line.startswith("%") and not line.startswith("%exit"):
+                name, _, rest = line.partition(" ")
+                self._notify(name, rest)
+
+        # The client went away: fail whoever is still waiting
+        with self._write_lock:
+            while self._pending:
+                reply = self._pending.popleft()
+                reply.error = True
+                reply.done.set()
+        if self._proc is proc:
+            self._proc = None
+        self._notify("%exit", "")
+
+    def _finish(self, lines: List[str], error: bool) -> None:
+        with self._write_lock:
+            if not self._pending:
+                return
+            reply = self._pending.popleft()
+        reply.lines = lines
+        reply.error = error
+        reply.done.set()
+
+    def _notify(self, name: str, rest: str) -> None:
+        if self.on_notification is not None:
+            self.on_notification(name, rest)
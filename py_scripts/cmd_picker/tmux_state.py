@@ -0,0 +1,167 @@
+"""In-memory model of a tmux server for TmuxTool.
+
+One ``tmux list-panes -a`` call with a combined format string returns every
+session, window and pane at once; the parsed snapshot is reused until it is
+older than ``max_age``. Pane captures are cached per pane and only re-taken
+when the pane's activity markers (window activity time, history size or
+cursor position) change, so previewing an idle session costs no process.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from py_scripts.cmd_picker.runner import run_command
+
+FIELDS = (
+    "session_name",
+    "session_windows",
+    "session_created",
+    "window_index",
+    "window_name",
+    "window_active",
+    "pane_id",
+    "pane_active",
+    "window_activity",
+    "history_size",
+    "cursor_x",
+    "cursor_y",
+)
+PANE_FORMAT = "\t".join(f"#{{{name}}}" for name in FIELDS)
+
+
+@dataclass
+class TmuxPane:
+    pane_id: str
+    active: bool
+    # Changes whenever the pane produced output, used to invalidate captures
+    activity_key: Tuple[str, ...]
+
+
+@dataclass
+class TmuxWindow:
+    index: str
+    name: str
+    active: bool
+    panes: List[TmuxPane] = field(default_factory=list)
+
+    @property
+    def active_pane(self) -> Optional[TmuxPane]:
+        return next((pane for pane in self.panes if pane.active), self.panes[0] if self.panes else None)
+
+
+@dataclass
+class TmuxSession:
+    name: str
+    windows_count: str
+    created: str
+    windows: List[TmuxWindow] = field(default_factory=list)
+
+    @property
+    def active_window(self) -> Optional[TmuxWindow]:
+        return next((window for window in self.windows if window.active), self.windows[0] if self.windows else None)
+
+    @property
+    def active_pane(self) -> Optional[TmuxPane]:
+        window = self.active_window
+        return window.active_pane if window else None
+
+
+def parse_panes(output: str) -> Dict[str, TmuxSession]:
+    """Build the session/window/pane tree from list-panes -F PANE_FORMAT output"""
+    sessions: Dict[str, TmuxSession] = {}
+    windows: Dict[Tuple[str, str], TmuxWindow] = {}
+    for line in output.splitlines():
+        parts = line.split("\t")
+        if len(parts) != len(FIELDS):
+            continue
+        row = dict(zip(FIELDS, parts))
+
+        session = sessions.get(row["session_name"])
+        if session is None:
+            session = TmuxSession(row["session_name"], row["session_windows"], row["session_created"])
+            sessions[session.name] = session
+
+        window_key = (session.name, row["window_index"])
+        window = windows.get(window_key)
+        if window is None:
+            window = TmuxWindow(row["window_index"], row["window_name"], row["window_active"] == "1")
+            windows[window_key] = window
+            session.windows.append(window)
+
+        activity_key = (row["window_activity"], row["history_size"], row["cursor_x"], row["cursor_y"])
+        window.panes.append(TmuxPane(row["pane_id"], row["pane_active"] == "1", activity_key))
+    return sessions
+
+
+def run_tmux(tmux_cmd: Sequence[str]) -> Callable[[Sequence[str]], str]:
+    """Return a runner executing tmux subcommands as separate processes"""
+
+    def run(args: Sequence[str]) -> str:
+        return run_command([*tmux_cmd, *args], check=True).stdout
+
+    return run
+
+
+class TmuxState:
+    """Cached snapshot of sessions, windows and panes plus per-pane captures
+
+    ``run`` executes a tmux subcommand and returns its stdout, raising
+    subprocess.CalledProcessError on failure.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Sequence[str]], str],
+        max_age: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.run = run
+        self.max_age = max_age
+        self._clock = clock
+        self._sessions: Dict[str, TmuxSession] = {}
+        self._fetched_at: Optional[float] = None
+        self._captures: Dict[str, Tuple[Tuple[str, ...], str]] = {}
+        self._lock = threading.Lock()
+        # Serialises refreshes so concurrent preview workers share one tmux call
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self) -> Dict[str, TmuxSession]:
+        """Re-read every session, window and pane in a single tmux call"""
+        sessions = parse_panes(self.run(["list-panes", "-a", "-F", PANE_FORMAT]))
+        with self._lock:
+            self._sessions = sessions
+            self._fetched_at = self._clock()
+            live = {pane.pane_id for s in sessions.values() for w in s.windows for pane in w.panes}
+            self._captures = {pane_id: entry for pane_id, entry in self._captures.items() if pane_id in live}
+        return sessions
+
+    def invalidate(self) -> None:
+        """Force the next lookup to re-read the server, e.g. after killing a session"""
+        with self._lock:
+            self._fetched_at = None
+
+    def sessions(self) -> Dict[str, TmuxSession]:
+        """Return the snapshot, refreshing it when older than max_age"""
+        with self._refresh_lock:
+            with self._lock:
+                if self._fetched_at is not None and self._clock() - self._fetched_at <= self.max_age:
+                    return self._sessions
+            return self.refresh()
+
+    def forget_capture(self, pane_id: str) -> None:
+        """Drop the cached capture of a pane known to have new output"""
+        with self._lock:
+            self._captures.pop(pane_id, None)
+
+    def capture(self, pane: TmuxPane) -> str:
+        """Return the visible content of pane, re-captured only if it changed"""
+        with self._lock:
+            cached = self._captures.get(pane.pane_id)
+        if cached is not None and cached[0] == pane.activity_key:
+            return cached[1]
+        content = self.run(["capture-pane", "-p", "-t", pane.pane_id])
+        with self._lock:
+            self._captures[pane.pane_id] = (pane.activity_key, content)
+        return content
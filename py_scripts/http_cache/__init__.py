@@ -0,0 +1 @@
+"""Shared on-disk HTTP cache and GitHub REST client."""
@@ -0,0 +1,173 @@
+"""GitHub REST access through the shared HTTP cache, and a GraphQL client.
+
+Used by cmd-picker and action-checker so both revalidate the same cached
+responses instead of each spending rate limit on full requests. The
+repository and token are found the way ``gh`` finds them, without network
+calls.
+"""
+
+import json
+import os
+import re
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from py_scripts.http_cache.http_cache import HTTPCache, HTTPCacheError
+
+API_URL = "https://api.github.com"
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Seconds a response is trusted without asking GitHub; anything older is
+# revalidated with its ETag, which costs no rate limit when unchanged
+GITHUB_TTLS = (
+    (r"/check-runs(\?|$)", 0.0),
+    (r"/status(\?|$)", 0.0),
+    (r"/pulls(\?|$)", 10.0),
+)
+DEFAULT_TTL = 60.0
+
+# git@github.com:owner/name.git, https://github.com/owner/name(.git), ssh://git@github.com/owner/name
+REMOTE_URL = re.compile(r"^(?:[\w.+-]+://)?(?:[^@/]+@)?[^:/]+[:/](?P<owner>[^/]+)/(?P<name>[^/]+?)(?:\.git)?/?$")
+
+
+class GitHubAPIError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class GitHubGraphQLError(Exception):
+    """The query could not be sent or GitHub answered with errors
+
+    When GitHub answered, errors are the entries of its "errors" list and
+    data is whatever data came with them, None when there was none.
+    """
+
+    def __init__(self, message: str, data: Optional[Dict[str, Any]] = None, errors: Optional[List[Dict]] = None):
+        super().__init__(message)
+        self.data = data
+        self.errors = errors or []
+
+
+def parse_remote(url: str) -> Optional[Tuple[str, str]]:
+    """Return (owner, name) of a GitHub remote URL"""
+    match = REMOTE_URL.match(url.strip())
+    if not match:
+        return None
+    return match.group("owner"), match.group("name")
+
+
+def current_repo() -> Optional[Tuple[str, str]]:
+    """Repository gh would use here: $GH_REPO, else the origin remote (read locally, no network)"""
+    gh_repo = os.environ.get("GH_REPO", "")
+    if gh_repo.count("/") >= 1:
+        owner, name = gh_repo.split("/")[-2:]
+        return owner, name
+    try:
+        result = subprocess.run(
+            ["git", "config", "--get", "remote.origin.url"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return parse_remote(result.stdout)
+
+
+def gh_token() -> Optional[str]:
+    """Token from $GH_TOKEN/$GITHUB_TOKEN, else the one gh is logged in with"""
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
+    try:
+        result = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def default_api_url() -> str:
+    host = os.environ.get("GH_HOST", "github.com")
+    return API_URL if host == "github.com" else f"https://{host}/api/v3"
+
+
+def default_graphql_url() -> str:
+    host = os.environ.get("GH_HOST", "github.com")
+    return GRAPHQL_URL if host == "github.com" else f"https://{host}/api/graphql"
+
+
+class GitHubAPI:
+    """GET GitHub REST endpoints, revalidating cached responses with their ETags"""
+
+    def __init__(self, cache: Optional[HTTPCache] = None, token: Optional[str] = None, api_url: Optional[str] = None):
+        self.cache = cache if cache is not None else HTTPCache(ttls=GITHUB_TTLS, default_ttl=DEFAULT_TTL)
+        self._token = token
+        self.api_url = (api_url or default_api_url()).rstrip("/")
+
+    @property
+    def token(self) -> Optional[str]:
+        if self._token is None:
+            self._token = gh_token()
+        return self._token
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET path (e.g. "/repos/o/r/pulls") and return the decoded body
+
+        Raises GitHubAPIError for error statuses or when GitHub is unreachable
+        and nothing is cached.
+        """
+        url = self.api_url + path + ("?" + urlencode(params) if params else "")
+        headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        try:
+            response = self.cache.get(url, headers)
+        except HTTPCacheError as e:
+            raise GitHubAPIError(str(e)) from e
+        if response.status >= 400:
+            raise GitHubAPIError(f"GET {path}: HTTP {response.status}", status=response.status)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise GitHubAPIError(f"GET {path}: invalid JSON") from e
+
+
+class GitHubGraphQL:
+    """Run GitHub GraphQL queries; not cached, as GraphQL answers carry no ETags"""
+
+    def __init__(self, endpoint: Optional[str] = None, token: Optional[str] = None, timeout: float = 10.0):
+        self.endpoint = endpoint or default_graphql_url()
+        self._token = token
+        self.timeout = timeout
+
+    @property
+    def token(self) -> Optional[str]:
+        if self._token is None:
+            self._token = gh_token()
+        return self._token
+
+    def query(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a query and return its data
+
+        Raises GitHubGraphQLError when the request fails or GitHub reports
+        any error, with the partial data GitHub sent alongside them.
+        """
+        import http.client
+        import urllib.request
+
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"bearer {self.token}"
+        body = json.dumps({"query": query, "variables": variables}).encode()
+        request = urllib.request.Request(self.endpoint, data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except (OSError, http.client.HTTPException, json.JSONDecodeError) as e:
+            raise GitHubGraphQLError(f"GraphQL request to {self.endpoint} failed: {e}") from e
+        if payload.get("errors"):
+            raise GitHubGraphQLError(
+                "; ".join(error.get("message", "?") for error in payload["errors"]),
+                data=payload.get("data"),
+                errors=payload["errors"],
+            )
+        return payload.get("data") or {}
@@ -0,0 +1,234 @@
+"""On-disk HTTP response cache with conditional revalidation.
+
+Responses are stored one file per request, keyed by method, URL and the
+request headers that change the answer. A stored response is served without
+contacting the server while younger than the TTL configured for its
+endpoint; after that it is revalidated with If-None-Match/If-Modified-Since
+and a 304 answer is served from disk. For GitHub a 304 does not count
+against the rate limit, so polling an unchanged resource is free.
+
+The cache directory is kept under ``max_bytes`` by evicting the least
+recently used entries. Entries are written atomically, so several processes
+may share one directory.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Pattern, Sequence, Tuple, Union
+
+# Request headers that select a different representation, part of the cache key
+KEY_HEADERS = ("accept", "authorization")
+# Request headers that let the server answer 304 Not Modified
+CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since")
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "py-scripts" / "http"
+
+
+class HTTPCacheError(Exception):
+    """The server could not be reached and nothing usable was cached"""
+
+
+@dataclass
+class Response:
+    status: int
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    # Served from disk: fresh by TTL, revalidated by a 304, or stale after a network error
+    from_cache: bool = False
+    revalidated: bool = False
+    stale: bool = False
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class HTTPCache:
+    """GET requests through an on-disk, ETag/Last-Modified aware cache
+
+    ttls maps URL regexes to the seconds a response is used without
+    revalidation; the first pattern found in the URL wins, default_ttl
+    applies otherwise.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_bytes: int = 50 * 1024 * 1024,
+        ttls: Sequence[Tuple[Union[str, Pattern[str]], float]] = (),
+        default_ttl: float = 0.0,
+        timeout: float = 10.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.ttls: List[Tuple[Pattern[str], float]] = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self._clock = clock
+        self.network_requests = 0
+
+    def ttl_for(self, url: str) -> float:
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def key(self, url: str, headers: Dict[str, str]) -> str:
+        lowered = {name.lower(): value for name, value in headers.items()}
+        parts = ["GET", url] + [f"{name}:{lowered.get(name, '')}" for name in KEY_HEADERS]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Fetch url, answering from the cache whenever the server allows it
+
+        Error statuses are returned, not raised, and never cached. Raises
+        HTTPCacheError when the server is unreachable and nothing is cached.
+        """
+        headers = dict(headers or {})
+        path = self.cache_dir / self.key(url, headers)
+        cached = self._read(path)
+
+        if cached is not None:
+            meta, body = cached
+            if self._clock() - meta["checked_at"] < self.ttl_for(url):
+                self._touch(path)
+                return Response(meta["status"], body, meta["headers"], from_cache=True)
+            if meta["headers"].get("etag"):
+                headers["If-None-Match"] = meta["headers"]["etag"]
+            if meta["headers"].get("last-modified"):
+                headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+
+        try:
+            status, response_headers, response_body = self._fetch(url, headers)
+        except HTTPCacheError:
+            if cached is None:
+                raise
+            meta, body = cached
+            return Response(meta["status"], body, meta["headers"], from_cache=True, stale=True)
+
+        if status == 304 and cached is None:
+            # Conditional headers of the caller, or a server that ignores them: no body to serve, ask for one
+            headers = {name: value for name, value in headers.items() if name.lower() not in CONDITIONAL_HEADERS}
+            status, response_headers, response_body = self._fetch(url, headers)
+            if status == 304:
+                raise HTTPCacheError(f"GET {url}: 304 Not Modified, but nothing is cached")
+
+        if status == 304 and cached is not None:
+            meta, body = cached
+            meta["checked_at"] = self._clock()
+            meta["headers"].update(
+                {name: value for name, value in response_headers.items() if name in ("etag", "date")}
+            )
+            self._write(path, meta, body)
+            return Response(meta["status"], body, meta["headers"], from_cache=True, revalidated=True)
+
+        response = Response(status, response_body, response_headers)
+        if status == 200 and self._cacheable(url, response_headers):
+            meta = {"url": url, "status": status, "headers": response_headers, "checked_at": self._clock()}
+            self._write(path, meta, response_body)
+            self._evict()
+        return response
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            self._remove(entry)
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _cacheable(self, url: str, headers: Dict[str, str]) -> bool:
+        if "no-store" in headers.get("cache-control", ""):
+            return False
+        return bool(headers.get("etag") or headers.get("last-modified") or self.ttl_for(url) > 0)
+
+    def _fetch(self, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        # urllib pulls in http.client and email (~30 ms); only pay for it when a request is sent
+        import http.client
+        import urllib.error
+        import urllib.request
+
+        self.network_requests += 1
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, self._headers(response.headers), response.read()
+        except urllib.error.HTTPError as e:  # also raised for 304
+            with e:
+                return e.code, self._headers(e.headers), e.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise HTTPCacheError(f"GET {url} failed: {e}") from e
+
+    @staticmethod
+    def _headers(headers) -> Dict[str, str]:
+        return {name.lower(): value for name, value in headers.items()} if headers is not None else {}
+
+    def _read(self, path: Path) -> Optional[Tuple[dict, bytes]]:
+        """Entry files hold a JSON metadata line followed by the raw body; a malformed one is a miss"""
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if not (
+            isinstance(meta, dict)
+            and isinstance(meta.get("status"), int)
+            and isinstance(meta.get("headers"), dict)
+            and isinstance(meta.get("checked_at"), (int, float))
+        ):
+            return None
+        return meta, body
+
+    def _write(self, path: Path, meta: dict, body: bytes) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(json.dumps(meta, separators=(",", ":")).encode() + b"\n")
+                f.write(body)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # a cache that cannot be written is just a slower cache
+
+    def _touch(self, path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _entries(self) -> List[Path]:
+        try:
+            return [entry for entry in self.cache_dir.iterdir() if entry.is_file() and not entry.name.endswith(".tmp")]
+        except OSError:
+            return []
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            self._remove(entry)
+            total -= size
+
+    @staticmethod
+    def _remove(entry: Path) -> None:
+        try:
+            entry.unlink()
+        except OSError:
+            pass
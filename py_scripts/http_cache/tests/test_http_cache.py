@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.http_cache.github import GitHubAPI, GitHubAPIError, parse_remote
+from py_scripts.http_cache.http_cache import HTTPCache, HTTPCacheError
+
+
+class ConditionalHandler(BaseHTTPRequestHandler):
+    """Serves server.resources[path] with an ETag (or Last-Modified) and answers 304 when unchanged"""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        path = self.path.split("?")[0]
+        if path not in self.server.resources:
+            return self.reply(404, b'{"message": "Not Found"}', {})
+        body = self.server.resources[path]
+        if path.startswith("/dated"):
+            validator = {"Last-Modified": "Wed, 01 May 2024 10:00:00 GMT"}
+            unchanged = self.headers.get("If-Modified-Since") == validator["Last-Modified"]
+        else:
+            validator = {"ETag": '"' + hashlib.sha1(body).hexdigest() + '"'}
+            unchanged = self.headers.get("If-None-Match") == validator["ETag"]
+        if unchanged:
+            return self.reply(304, b"", validator)
+        self.reply(200, body, validator)
+
+    def reply(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ConditionalHandler)
+    server.requests = []
+    server.resources = {"/items": b'{"items": [1, 2, 3]}', "/dated": b'{"dated": true}'}
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache_dir():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield Path(tmp)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHTTPCache:
+    def test_revalidates_with_etag_and_serves_304_from_disk(self, server, cache_dir):
+        cache = HTTPCache(cache_dir)
+        first = cache.get(server.url + "/items")
+        second = cache.get(server.url + "/items")
+
+        assert first.status == second.status == 200
+        assert second.json() == {"items": [1, 2, 3]}
+        assert not first.from_cache
+        assert second.from_cache and second.revalidated
+        assert server.requests[1][1]["If-None-Match"] == first.headers["etag"]
+
+    def test_last_modified(self, server, cache_dir):
+        cache = HTTPCache(cache_dir)
+        cache.get(server.url + "/dated")
+        response = cache.get(server.url + "/dated")
+
+        assert response.revalidated
+        assert server.requests[1][1]["If-Modified-Since"] == "Wed, 01 May 2024 10:00:00 GMT"
+
+    def test_changed_resource_is_refetched(self, server, cache_dir):
+        cache = HTTPCache(cache_dir)
+        cache.get(server.url + "/items")
+        server.resources["/items"] = b'{"items": [4]}'
+
+        response = cache.get(server.url + "/items")
+
+        assert not response.from_cache
+        assert response.json() == {"items": [4]}
+        assert cache.get(server.url + "/items").revalidated
+
+    def test_per_endpoint_ttl_skips_the_request(self, server, cache_dir):
+        clock = FakeClock()
+        cache = HTTPCache(cache_dir, ttls=[(r"/items$", 30.0)], clock=clock)
+        cache.get(server.url + "/items")
+        cache.get(server.url + "/dated")
+
+        assert cache.get(server.url + "/items").from_cache
+        cache.get(server.url + "/dated")
+        assert cache.network_requests == 3
+
+        clock.now += 31
+        assert cache.get(server.url + "/items").revalidated
+        assert cache.network_requests == 4
+
+    def test_errors_are_returned_and_not_cached(self, server, cache_dir):
+        cache = HTTPCache(cache_dir, default_ttl=60)
+        assert cache.get(server.url + "/missing").status == 404
+        assert cache.get(server.url + "/missing").status == 404
+        assert cache.network_requests == 2
+        assert cache.size() == 0
+
+    def test_stale_copy_when_server_is_down(self, server, cache_dir):
+        cache = HTTPCache(cache_dir, timeout=1)
+        url = server.url + "/items"
+        cache.get(url)
+        server.shutdown()
+        server.server_close()
+
+        response = cache.get(url)
+        assert response.stale and response.json() == {"items": [1, 2, 3]}
+        with pytest.raises(HTTPCacheError):
+            cache.get(server.url + "/dated")
+
+    def test_shared_between_instances(self, server, cache_dir):
+        HTTPCache(cache_dir).get(server.url + "/items")
+        assert HTTPCache(cache_dir).get(server.url + "/items").revalidated
+
+    def test_authorization_is_part_of_the_key(self, server, cache_dir):
+        cache = HTTPCache(cache_dir)
+        cache.get(server.url + "/items", {"Authorization": "Bearer a"})
+        response = cache.get(server.url + "/items", {"Authorization": "Bearer b"})
+        assert not response.from_cache
+        assert "If-None-Match" not in server.requests[1][1]
+
+    def test_evicts_least_recently_used(self, server, cache_dir):
+        for i in range(5):
+            server.resources[f"/r{i}"] = json.dumps({"payload": "x" * 1000, "i": i}).encode()
+        cache = HTTPCache(cache_dir, max_bytes=4000)
+        for i in range(3):
+            cache.get(f"{server.url}/r{i}")
+            os.utime(cache_dir / cache.key(f"{server.url}/r{i}", {}), (i, i))
+
+        cache.get(f"{server.url}/r0")  # revalidated: now the most recently used
+        cache.get(f"{server.url}/r3")
+
+        kept = {i for i in range(4) if (cache_dir / cache.key(f"{server.url}/r{i}", {})).exists()}
+        assert kept == {0, 2, 3}
+        assert cache.size() <= 4000
+
+    def test_no_store(self, server, cache_dir):
+        cache = HTTPCache(cache_dir, default_ttl=60)
+        assert not cache._cacheable("http://x/y", {"cache-control": "no-store", "etag": '"1"'})
+        assert cache._cacheable("http://x/y", {})
+
+    def test_corrupt_entry_is_ignored(self, server, cache_dir):
+        cache = HTTPCache(cache_dir)
+        (cache_dir / cache.key(server.url + "/items", {})).write_bytes(b"not json")
+        assert cache.get(server.url + "/items").json() == {"items": [1, 2, 3]}
+
+    @pytest.mark.parametrize("meta", [{"status": 200, "headers": {}}, {"checked_at": 1.0}, [1, 2], "x"])
+    def test_entry_with_incomplete_metadata_is_a_miss(self, server, cache_dir, meta):
+        cache = HTTPCache(cache_dir, default_ttl=60)
+        (cache_dir / cache.key(server.url + "/items", {})).write_bytes(json.dumps(meta).encode() + b"\n{}")
+        assert cache.get(server.url + "/items").json() == {"items": [1, 2, 3]}
+
+    def test_304_without_a_cached_entry_asks_for_the_body(self, server, cache_dir):
+        cache = HTTPCache(cache_dir)
+        etag = cache.get(server.url + "/items").headers["etag"]
+        cache.clear()
+
+        response = cache.get(server.url + "/items", {"If-None-Match": etag})
+
+        assert response.status == 200
+        assert response.json() == {"items": [1, 2, 3]}
+        assert "If-None-Match" not in server.requests[-1][1]
+
+    def test_304_that_never_comes_with_a_body(self, server, cache_dir):
+        class NotModified(HTTPCache):
+            def _fetch(self, url, headers):
+                return 304, {}, b""
+
+        with pytest.raises(HTTPCacheError, match="304"):
+            NotModified(cache_dir).get(server.url + "/items")
+
+
+class TestGitHubAPI:
+    def test_get_json_sends_token_and_revalidates(self, server, cache_dir):
+        server.resources["/repos/octo/repo/pulls"] = b'[{"number": 1}]'
+        api = GitHubAPI(HTTPCache(cache_dir), token="secret", api_url=server.url)
+
+        assert api.get_json("/repos/octo/repo/pulls", {"state": "open"}) == [{"number": 1}]
+        assert api.get_json("/repos/octo/repo/pulls", {"state": "open"}) == [{"number": 1}]
+
+        path, headers = server.requests[1]
+        assert path == "/repos/octo/repo/pulls?state=open"
+        assert headers["Authorization"] == "Bearer secret"
+        assert "If-None-Match" in headers
+
+    def test_error_status(self, server, cache_dir):
+        api = GitHubAPI(HTTPCache(cache_dir), token="secret", api_url=server.url)
+        with pytest.raises(GitHubAPIError) as excinfo:
+            api.get_json("/repos/octo/missing")
+        assert excinfo.value.status == 404
+
+    def test_unreachable(self, cache_dir):
+        api = GitHubAPI(HTTPCache(cache_dir, timeout=0.5), token="secret", api_url="http://127.0.0.1:9")
+        with pytest.raises(GitHubAPIError):
+            api.get_json("/rate_limit")
+
+
+class TestParseRemote:
+    def test_remote_formats(self):
+        assert parse_remote("git@github.com:octo/repo.git\n") == ("octo", "repo")
+        assert parse_remote("https://github.com/octo/repo") == ("octo", "repo")
+        assert parse_remote("https://github.com/octo/repo.git") == ("octo", "repo")
+        assert parse_remote("ssh://git@github.com/octo/my.repo.git") == ("octo", "my.repo")
+
+    def test_not_a_remote(self):
+        assert parse_remote("") is None
+        assert parse_remote("/srv/git/repo") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
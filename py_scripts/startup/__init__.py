@@ -0,0 +1 @@
+"""Startup-time tooling: deferred imports and the per-entry-point import budget."""
@@ -0,0 +1,35 @@
+"""Deferred imports for modules that only some code paths need.
+
+``lazy_import`` returns a module object right away and runs the module the
+first time one of its attributes is used. Entry points bind heavy
+dependencies (HTTP clients, image libraries) this way so ``--help`` or a
+tmux-only run never pays for importing them.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return module name, loaded on first attribute access
+
+    A module that is already imported is returned as is. Raises
+    ModuleNotFoundError straight away if the module does not exist.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        # Like a regular import, so `import a.b` followed by `a.b.attr` finds it
+        setattr(sys.modules[parent], child, module)
+    return module
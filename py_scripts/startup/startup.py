@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Import-time budget for the console entry points.
+
+Each module named in ``[project.scripts]`` is imported in a fresh
+interpreter started with ``python -X importtime``; the time spent importing
+it and everything it pulls in is compared with its budget. Modules the
+interpreter loads before running any script (``site`` and friends) are not
+counted, so the numbers are what the script itself adds to a cold start.
+
+Run ``python -m py_scripts.startup.startup`` for a report; it exits with 1
+when an entry point is over budget.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import tomllib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PYPROJECT = Path(__file__).resolve().parents[2] / "pyproject.toml"
+
+# Milliseconds each entry point module may spend being imported
+BUDGETS_MS: Dict[str, float] = {
+    "py_scripts.cmd_picker.cmd_picker": 30.0,
+    "py_scripts.action_checker.action_checker": 25.0,
+    "py_scripts.webp_converter.webp_converter": 10.0,
+    "py_scripts.durable_run.durable_run": 10.0,
+}
+DEFAULT_BUDGET_MS = 20.0
+
+# Written to stderr right before the measured import, separating it from interpreter startup
+MARKER = "-- startup-budget --"
+
+# "import time:       237 |       1773 |   json"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent> *)(?P<name>\S+)")
+
+
+@dataclass
+class Measurement:
+    module: str
+    milliseconds: float
+    budget: float
+    # Slowest modules imported directly by the entry point, (name, ms)
+    heaviest: List[Tuple[str, float]]
+
+    @property
+    def over_budget(self) -> bool:
+        return self.milliseconds > self.budget
+
+
+def entry_point_modules(pyproject: Path = PYPROJECT) -> List[str]:
+    """Modules of the console scripts declared in pyproject.toml"""
+    with open(pyproject, "rb") as f:
+        scripts = tomllib.load(f).get("project", {}).get("scripts", {})
+    return list(dict.fromkeys(target.split(":")[0] for target in scripts.values()))
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Cumulative microseconds of each top-level import after MARKER
+
+    Nested imports are part of their importer's cumulative time; the
+    result also holds the modules one level down under "name>child" keys.
+    """
+    _, _, measured = stderr.partition(MARKER)
+    times: Dict[str, float] = {}
+    # importtime prints children before their parent, so collect them until the parent line shows up
+    pending: Dict[int, List[Tuple[str, float]]] = {}
+    for line in measured.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        depth = (len(match.group("indent")) - 1) // 2
+        name = match.group("name")
+        cumulative = float(match.group("cumulative"))
+        children = pending.pop(depth + 1, [])
+        if depth == 0:
+            times[name] = cumulative
+            for child, child_time in children:
+                times[f"{name}>{child}"] = child_time
+        else:
+            pending.setdefault(depth, []).append((name, cumulative))
+    return times
+
+
+def measure(module: str, runs: int = 3, python: Optional[str] = None) -> Measurement:
+    """Best of runs import times of module, in a fresh interpreter each time"""
+    code = f"import sys; sys.stderr.write({MARKER!r} + '\\n'); import {module}"
+    env = dict(
+        os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PYPROJECT.parent), os.environ.get("PYTHONPATH")]))
+    )
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    # Let the first run write bytecode, so the best run is the warm start an installed tool has
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    best: Optional[Dict[str, float]] = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [python or sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+        times = parse_importtime(result.stderr)
+        if best is None or total(times) < total(best):
+            best = times
+    assert best is not None
+    heaviest = sorted(
+        ((key.split(">", 1)[1], value / 1000) for key, value in best.items() if ">" in key),
+        key=lambda entry: -entry[1],
+    )
+    return Measurement(module, total(best) / 1000, BUDGETS_MS.get(module, DEFAULT_BUDGET_MS), heaviest[:5])
+
+
+def total(times: Dict[str, float]) -> float:
+    return sum(value for key, value in times.items() if ">" not in key)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check the import time of every console entry point")
+    parser.add_argument("modules", nargs="*", help="Modules to measure (default: all [project.scripts])")
+    parser.add_argument("--runs", type=int, default=3, help="Measure each module this many times, keep the best")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules or entry_point_modules():
+        result = measure(module, runs=args.runs)
+        status = "OVER" if result.over_budget else "ok"
+        failed |= result.over_budget
+        print(f"{status:>4}  {result.milliseconds:6.1f} ms / {result.budget:4.0f} ms  {module}")
+        if result.over_budget:
+            for name, milliseconds in result.heaviest:
+                print(f"        {milliseconds:6.1f} ms  {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
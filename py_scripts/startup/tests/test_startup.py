@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+from py_scripts.startup.lazy import lazy_import
+from py_scripts.startup.startup import (
+    MARKER,
+    PYPROJECT,
+    entry_point_modules,
+    measure,
+    parse_importtime,
+)
+
+# -X importtime output after the marker: json pulls in json.decoder, which pulls in json.scanner
+IMPORTTIME_OUTPUT = f"""import time: self [us] | cumulative | imported package
+import time:       900 |        900 | site
+{MARKER}
+import time:       406 |        560 |     json.scanner
+import time:       453 |       1012 |   json.decoder
+import time:       418 |        418 |   json.encoder
+import time:       193 |       1622 | json
+import time:        30 |         30 | example
+"""
+
+
+@pytest.fixture
+def module_dir():
+    """A directory on sys.path holding a module that records when it is executed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "startup_probe.py"), "w") as f:
+            f.write("import builtins\nbuiltins.startup_probe_loaded = True\nVALUE = 42\n")
+        sys.path.insert(0, tmp)
+        yield tmp
+        sys.path.remove(tmp)
+        sys.modules.pop("startup_probe", None)
+        import builtins
+
+        builtins.__dict__.pop("startup_probe_loaded", None)
+
+
+class TestLazyImport:
+    def test_module_runs_on_first_attribute_access(self, module_dir):
+        import builtins
+
+        module = lazy_import("startup_probe")
+        assert not hasattr(builtins, "startup_probe_loaded")
+
+        assert module.VALUE == 42
+        assert builtins.startup_probe_loaded
+        import startup_probe
+
+        assert startup_probe is module
+
+    def test_already_imported_module_is_returned(self):
+        assert lazy_import("os") is os
+
+    def test_missing_module(self):
+        with pytest.raises(ModuleNotFoundError):
+            lazy_import("py_scripts.startup.no_such_module")
+
+
+class TestParseImporttime:
+    def test_counts_only_imports_after_marker(self):
+        times = parse_importtime(IMPORTTIME_OUTPUT)
+
+        assert times == {
+            "json": 1622.0,
+            "json>json.decoder": 1012.0,
+            "json>json.encoder": 418.0,
+            "example": 30.0,
+        }
+
+
+class TestEntryPoints:
+    def test_reads_project_scripts(self):
+        modules = entry_point_modules(PYPROJECT)
+        assert "py_scripts.cmd_picker.cmd_picker" in modules
+        assert "py_scripts.webp_converter.webp_converter" in modules
+
+    @pytest.mark.parametrize(
+        "module, deferred",
+        [
+            ("py_scripts.cmd_picker.cmd_picker", ["http.client", "urllib.request", "argparse", "webbrowser"]),
+            ("py_scripts.action_checker.action_checker", ["http.client", "urllib.request"]),
+            ("py_scripts.webp_converter.webp_converter", ["PIL"]),
+        ],
+    )
+    def test_heavy_modules_are_not_imported(self, module, deferred):
+        code = f"import sys, {module}; print(' '.join(m for m in {deferred!r} if m in sys.modules))"
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=PYPROJECT.parent
+        )
+        assert result.stdout.strip() == ""
+
+    @pytest.mark.parametrize("module", entry_point_modules())
+    def test_within_budget(self, module):
+        result = measure(module)
+        assert not result.over_budget, (
+            f"importing {module} took {result.milliseconds:.1f} ms (budget {result.budget:.0f} ms); "
+            f"slowest: {result.heaviest}"
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -5,7 +5,6 @@
 # ]
 # ///
 
-from PIL import Image
 import os
 import argparse
 
@@ -35,6 +34,9 @@ def convert_webp_to_jpg(input_path: str, output_path: str | None = None) -> None
         # Save to current directory
         output_path = os.path.join(os.getcwd(), jpg_filename)
 
+    # Pillow is only imported when there is an image to convert, keeping --help instant
+    from PIL import Image
+
     # Open and convert the image
     try:
         img = Image.open(input_path)